@@ -192,6 +192,7 @@ def hydrogram_api():
             search_global_count
             download_media
             stream_media
+            open_media
             get_discussion_message
             get_discussion_replies
             get_discussion_replies_count
@@ -332,6 +333,7 @@ def hydrogram_api():
             invoke
             resolve_peer
             save_file
+            save_files
         """,
     }
 
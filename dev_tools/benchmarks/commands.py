@@ -0,0 +1,150 @@
+#!/bin/env python
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure how fast command filters match messages when there are many commands.
+
+Two setups are measured: a single filters.command() with all the commands, and one handler per
+command checked in order (through the handler index, or one by one with ``--no-index``).
+``--legacy`` uses the previous implementation, which built two regular expressions per command
+and message.
+
+Usage: python dev_tools/benchmarks/commands.py [--commands 1000] [--messages 2000] [--legacy]
+       [--no-index]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+from types import SimpleNamespace
+
+from hydrogram import filters
+from hydrogram.handlers import MessageHandler
+from hydrogram.routing import HandlerIndex
+
+
+def legacy_command(commands: list[str], prefixes: str = "/") -> filters.Filter:
+    command_re = re.compile(r"([\"'])(.*?)(?<!\\)\1|(\S+)")
+
+    def func(flt, client, message):
+        username = client.me.username or ""
+        text = message.text or message.caption
+        message.command = None
+
+        if not text:
+            return False
+
+        for prefix in flt.prefixes:
+            if not text.startswith(prefix):
+                continue
+
+            without_prefix = text[len(prefix) :]
+
+            for cmd in flt.commands:
+                if not re.match(
+                    rf"^(?:{cmd}(?:@?{username})?)(?:\s|$)", without_prefix, flags=re.IGNORECASE
+                ):
+                    continue
+
+                without_command = re.sub(
+                    rf"{cmd}(?:@?{username})?\s?",
+                    "",
+                    without_prefix,
+                    count=1,
+                    flags=re.IGNORECASE,
+                )
+
+                message.command = [cmd] + [
+                    re.sub(r"\\([\"'])", r"\1", m.group(2) or m.group(3) or "")
+                    for m in command_re.finditer(without_command)
+                ]
+
+                return True
+
+        return False
+
+    return filters.create(func, commands={c.lower() for c in commands}, prefixes={prefixes})
+
+
+def make_message(text: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        text=text, caption=None, command=None, chat=None, from_user=None, matches=None
+    )
+
+
+def measure(name: str, messages: int, run) -> None:
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+
+    print(f"{name}: {elapsed:.3f}s, {elapsed / messages * 1e6:.1f}us/message")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--legacy", action="store_true")
+    parser.add_argument("--no-index", action="store_true")
+    args = parser.parse_args()
+
+    client = SimpleNamespace(me=SimpleNamespace(username="benchmark_bot"))
+    names = [f"command{i}" for i in range(args.commands)]
+    factory = legacy_command if args.legacy else filters.command
+
+    rng = random.Random(0)
+    texts = [
+        f"/{rng.choice(names)}@benchmark_bot some 'quoted args' here"
+        if i % 2
+        else "just a plain message"
+        for i in range(args.messages)
+    ]
+
+    single = factory(names)
+
+    def run_single():
+        for text in texts:
+            single(client, make_message(text))
+
+    handlers = [MessageHandler(lambda _, __: None, factory([name])) for name in names]
+    index = HandlerIndex(handlers)
+
+    def run_handlers():
+        for text in texts:
+            message = make_message(text)
+            candidates = handlers if args.no_index else index.candidates(client, message, False)
+
+            for handler in candidates:
+                if handler.filters(client, message):
+                    break
+
+    label = "legacy" if args.legacy else "precompiled"
+    measure(f"1 filter x {args.commands} commands ({label})", args.messages, run_single)
+    measure(
+        f"{args.commands} handlers x 1 command ({label}, "
+        f"{'no index' if args.no_index else 'indexed'})",
+        args.messages,
+        run_handlers,
+    )
+
+
+if __name__ == "__main__":
+    main()
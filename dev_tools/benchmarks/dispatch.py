@@ -0,0 +1,116 @@
+#!/bin/env python
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure how fast updates go through the filters of many handlers.
+
+Every message is checked against ``--handlers`` message handlers, the last one being the only
+one that matches, the way the dispatcher does. ``--blocking`` marks every filter as blocking,
+which runs synchronous filters in the executor as it used to happen for all of them, and
+``--no-index`` checks every handler instead of the candidates given by the handler index.
+
+Usage: python dev_tools/benchmarks/dispatch.py [--handlers 50] [--updates 2000] [--blocking]
+       [--no-index]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from hydrogram import Client, enums, filters
+from hydrogram.filters import Filter
+from hydrogram.handlers import MessageHandler
+from hydrogram.routing import HandlerIndex
+from hydrogram.types import Chat, Message, User
+
+
+async def callback(_, __):
+    pass
+
+
+def make_handlers(count: int) -> list[MessageHandler]:
+    handlers = [
+        MessageHandler(
+            callback,
+            filters.text & filters.private & ~filters.bot & filters.command(f"command{i}"),
+        )
+        for i in range(count - 1)
+    ]
+    handlers.append(MessageHandler(callback, filters.text & filters.private & ~filters.bot))
+
+    return handlers
+
+
+def make_message(client: Client, message_id: int) -> Message:
+    user = User(id=1, first_name="User", is_bot=False, client=client)
+    chat = Chat(id=1, type=enums.ChatType.PRIVATE, first_name="User", client=client)
+
+    return Message(
+        id=message_id, from_user=user, chat=chat, text="hello there", outgoing=False, client=client
+    )
+
+
+async def run(handlers: list[MessageHandler], updates: int, use_index: bool) -> float:
+    client = Client("benchmark", in_memory=True)
+    client.me = User(id=2, first_name="Bot", is_bot=True, username="benchmark_bot")
+    messages = [make_message(client, i) for i in range(updates)]
+    index = HandlerIndex(handlers)
+
+    start = time.perf_counter()
+
+    for message in messages:
+        candidates = index.candidates(client, message, False) if use_index else handlers
+
+        for handler in candidates:
+            if await handler.check(client, message):
+                await handler.callback(client, message)
+                break
+
+    elapsed = time.perf_counter() - start
+
+    client.executor.shutdown()
+    client.internal_executor.shutdown()
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--handlers", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--blocking", action="store_true")
+    parser.add_argument("--no-index", action="store_true")
+    args = parser.parse_args()
+
+    Filter.blocking = args.blocking
+
+    elapsed = asyncio.run(run(make_handlers(args.handlers), args.updates, not args.no_index))
+
+    print(
+        f"{args.updates} updates x {args.handlers} handlers "
+        f"({'blocking' if args.blocking else 'inline'} sync filters, "
+        f"{'no index' if args.no_index else 'indexed'}): "
+        f"{elapsed:.3f}s, {args.updates / elapsed:.0f} updates/s, "
+        f"{elapsed / args.updates * 1e6:.0f}us/update"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure the download throughput from a fake DC with a given latency and bandwidth.
+
+The fake DC answers ``upload.GetFile`` after ``--rtt`` milliseconds, plus the time it takes to
+send the chunk over a connection limited to ``--bandwidth`` MB/s. Responses on the same
+connection are sent one after the other, like on a real connection. The file is downloaded one
+chunk at a time, as it used to happen, and then with up to ``--window`` chunks in flight over
+``--connections`` connections.
+
+Usage: python dev_tools/benchmarks/download.py [--size 64] [--rtt 100] [--bandwidth 20]
+       [--window 8] [--connections 1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from hydrogram import raw
+from hydrogram.downloader import Downloader
+
+
+class FakeConnection:
+    def __init__(self, rtt: float, bandwidth: float):
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        self.link = asyncio.Lock()
+
+    async def invoke(self, query: raw.functions.upload.GetFile, sleep_threshold=None):
+        await asyncio.sleep(self.rtt / 2)
+
+        async with self.link:
+            await asyncio.sleep(query.limit / self.bandwidth)
+
+        await asyncio.sleep(self.rtt / 2)
+
+        return raw.types.upload.File(
+            type=raw.types.storage.FilePartial(), mtime=0, bytes=bytes(query.limit)
+        )
+
+
+async def run(size: int, rtt: float, bandwidth: float, window: int, connections: int) -> float:
+    sessions = [FakeConnection(rtt, bandwidth) for _ in range(connections)]
+    location = raw.types.InputDocumentFileLocation(
+        id=1, access_hash=1, file_reference=b"", thumb_size=""
+    )
+    downloader = Downloader(sessions, location, size, max_window=window)
+
+    start = time.perf_counter()
+
+    async for _ in downloader.chunks():
+        pass
+
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=64, help="file size in MiB")
+    parser.add_argument("--rtt", type=float, default=100, help="round trip time in ms")
+    parser.add_argument("--bandwidth", type=float, default=20, help="MB/s per connection")
+    parser.add_argument("--window", type=int, default=8)
+    parser.add_argument("--connections", type=int, default=1)
+    args = parser.parse_args()
+
+    size = args.size * Downloader.CHUNK_SIZE
+    rtt = args.rtt / 1000
+    bandwidth = args.bandwidth * 1e6
+
+    for label, window, connections in (
+        ("1 chunk at a time", 1, 1),
+        (f"window {args.window}, {args.connections} connection(s)", args.window, args.connections),
+    ):
+        elapsed = asyncio.run(run(size, rtt, bandwidth, window, connections))
+        print(f"{label}: {elapsed:.2f}s, {size / elapsed / 1e6:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure the upload throughput to a fake DC with a given latency and bandwidth.
+
+The fake DC acknowledges each part ``--rtt`` milliseconds after it was sent, plus the time it
+takes to send it over a connection limited to ``--bandwidth`` MB/s. Parts on the same connection
+are sent one after the other, like on a real connection. Files of each size are uploaded with
+512 KiB parts and a fixed amount of parts in flight (1, or 4 for big files), as it used to happen,
+and then with the part size and window picked by the uploader.
+
+Usage: python dev_tools/benchmarks/upload.py [--sizes 1 8 64] [--rtt 100] [--bandwidth 20]
+       [--window 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import math
+import time
+
+from hydrogram.uploader import Uploader
+
+BIG_FILE_SIZE = 10 * 1024 * 1024
+
+
+class FakeConnection:
+    def __init__(self, rtt: float, bandwidth: float):
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        self.link = asyncio.Lock()
+
+    async def invoke(self, query):
+        async with self.link:
+            await asyncio.sleep(len(query.bytes) / self.bandwidth)
+
+        await asyncio.sleep(self.rtt)
+
+        return True
+
+
+class FixedUploader(Uploader):
+    def record(self, rtt: float):
+        pass
+
+
+async def run(
+    size: int, rtt: float, bandwidth: float, part_size: int, window: int, adaptive: bool
+) -> float:
+    total_parts = math.ceil(size / part_size)
+    data = bytes(part_size)
+
+    async def parts():
+        for part in range(total_parts):
+            await asyncio.sleep(0)
+            yield part, data[: min(part_size, size - part * part_size)]
+
+    uploader_type = Uploader if adaptive else FixedUploader
+    uploader = uploader_type(
+        [FakeConnection(rtt, bandwidth)], 1, total_parts, size > BIG_FILE_SIZE, window
+    )
+
+    if not adaptive:
+        uploader.window = window
+
+    start = time.perf_counter()
+    await uploader.upload(parts())
+
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 8, 64], help="in MiB")
+    parser.add_argument("--rtt", type=float, default=100, help="round trip time in ms")
+    parser.add_argument("--bandwidth", type=float, default=20, help="MB/s")
+    parser.add_argument("--window", type=int, default=8)
+    args = parser.parse_args()
+
+    rtt = args.rtt / 1000
+    bandwidth = args.bandwidth * 1e6
+
+    for mib in args.sizes:
+        size = int(mib * 1024 * 1024)
+        fixed_window = 4 if size > BIG_FILE_SIZE else 1
+
+        for label, part_size, window, adaptive in (
+            ("fixed", 512 * 1024, fixed_window, False),
+            ("adaptive", Uploader.get_part_size(size), args.window, True),
+        ):
+            elapsed = asyncio.run(run(size, rtt, bandwidth, part_size, window, adaptive))
+            print(
+                f"{mib:g} MiB, {label} ({part_size // 1024} KiB parts, window {window}): "
+                f"{elapsed:.2f}s, {size / elapsed / 1e6:.1f} MB/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
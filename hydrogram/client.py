@@ -31,9 +31,9 @@ import re
 import shutil
 import string
 import sys
+import time
 from concurrent.futures.thread import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from hashlib import sha256
 from importlib import import_module
 from io import BytesIO, StringIO
 from mimetypes import MimeTypes
@@ -42,14 +42,11 @@ from typing import TYPE_CHECKING, Callable
 
 import hydrogram
 from hydrogram import __license__, __version__, enums, raw, utils
-from hydrogram.crypto import aes
 from hydrogram.errors import (
     AuthBytesInvalid,
     BadRequest,
-    CDNFileHashMismatch,
     ChannelPrivate,
     SessionPasswordNeeded,
-    VolumeLocNotFound,
 )
 from hydrogram.handlers.handler import Handler
 from hydrogram.methods import Methods
@@ -61,10 +58,13 @@ from hydrogram.utils import ainput
 from .connection import Connection
 from .connection.transport import TCP, TCPAbridged
 from .dispatcher import Dispatcher
+from .downloader import CdnDownloader, CdnRedirectError, Downloader
 from .file_id import FileId, FileType, ThumbnailSource
+from .file_io import DownloadJournal, FileWriter
 from .mime_types import mime_types
 from .parser import Parser
 from .session.internals import MsgId
+from .updates_manager import COMMON, UpdatesManager
 
 if TYPE_CHECKING:
     import builtins
@@ -153,6 +153,22 @@ class Client(Methods):
             Number of maximum concurrent workers for handling incoming updates.
             Defaults to ``min(32, os.cpu_count() + 4)``.
 
+        sync_workers (``int``, *optional*):
+            Number of threads running synchronous handler callbacks.
+            Defaults to the number of *workers*.
+
+        internal_workers (``int``, *optional*):
+            Number of threads running blocking filters, synchronous progress callbacks and listener
+            handlers, kept apart from the handler callbacks so that neither can starve the other.
+            Defaults to 4.
+
+        process_workers (``int``, *optional*):
+            Number of processes running the synchronous callbacks of handlers added with
+            *in_process*, which are called without the client, see
+            :meth:`~hydrogram.Client.add_handler`. The processes are only started when first
+            needed.
+            Defaults to ``os.cpu_count()``.
+
         workdir (``str``, *optional*):
             Define a custom working directory.
             The working directory is the location in the filesystem where Hydrogram will store the session files.
@@ -178,6 +194,43 @@ class Client(Methods):
             Only available for users, bots will ignore this parameter.
             Defaults to False (normal session).
 
+        catch_up (``bool``, *optional*):
+            Pass True to receive the updates that happened while the client was offline. The update
+            state is saved in the session storage and, on the next start, whatever was missed since
+            then is fetched and dispatched before the new updates.
+            Defaults to False (updates received while offline are skipped).
+
+        max_queued_updates (``int``, *optional*):
+            Maximum amount of updates waiting to be handled. Callback and inline queries are served
+            ahead of the other updates, while channel posts, polls and user statuses are served
+            last.
+            Defaults to 0 (unbounded).
+
+        updates_overflow_policy (:obj:`~hydrogram.enums.OverflowPolicy`, *optional*):
+            What to do with incoming updates when *max_queued_updates* is reached.
+            Defaults to :obj:`~hydrogram.enums.OverflowPolicy.BLOCK` (wait for the handlers to
+            catch up).
+
+        dispatch_mode (:obj:`~hydrogram.enums.DispatchMode`, *optional*):
+            How updates are spread among the *workers*. With
+            :obj:`~hydrogram.enums.DispatchMode.PER_CHAT` the updates of a chat are handled in
+            order, one at a time, while different chats are handled in parallel.
+            Defaults to :obj:`~hydrogram.enums.DispatchMode.CONCURRENT`.
+
+        coalesce_window (``float``, *optional*):
+            Merge user status, message edit and poll updates still waiting to be handled with the
+            newer ones about the same user, message or poll, so that only the latest state is
+            handled. These updates also wait this amount of seconds before being handled, to let
+            more of them be merged; pass 0 to merge them without waiting. The merge counters are
+            found in ``app.dispatcher.updates_queue.stats``.
+            Defaults to None (no merging).
+
+        slow_handler_threshold (``float``, *optional*):
+            Log a warning for each handler callback running for longer than this amount of seconds.
+            The execution times of every handler are also collected in
+            ``app.dispatcher.handler_stats``.
+            Defaults to None (no warnings).
+
         sleep_threshold (``int``, *optional*):
             Set a sleep threshold for flood wait exceptions happening globally in this client instance, below which any
             request that raises a flood wait will be automatically invoked again after sleeping for the required amount
@@ -194,6 +247,43 @@ class Client(Methods):
             A value that is too high may result in network related issues.
             Defaults to 1.
 
+        max_concurrent_uploads (``int``, *optional*):
+            Set the maximum amount of files uploaded at the same time, e.g.: the items of a media
+            group. Uploads are bounded by this value instead of *max_concurrent_transmissions*.
+            A value that is too high may result in network related issues.
+            Defaults to *max_concurrent_transmissions*.
+
+        download_window (``int``, *optional*):
+            Maximum amount of chunks requested at the same time by each download. The actual amount
+            adapts to the response time of the server. Pass 1 to download one chunk at a time.
+            Defaults to 8.
+
+        upload_window (``int``, *optional*):
+            Maximum amount of parts sent at the same time by each upload. The actual amount adapts
+            to the time the server takes to acknowledge them. Pass 1 to upload one part at a time.
+            Defaults to 8.
+
+        media_connections (``int``, *optional*):
+            Number of connections opened to each DC for uploads and downloads, among which the
+            chunks are spread.
+            Defaults to 1.
+
+        preallocate_downloads (``bool``, *optional*):
+            Pass True to reserve the disk space of files before downloading them, where supported.
+            This avoids fragmentation and running out of space halfway through big downloads.
+            Defaults to False.
+
+        resumable_uploads (``bool``, *optional*):
+            Pass True to keep track of the parts saved while uploading big files (over 10 MB) from
+            a path, in a ".upload" file next to them. Uploading the same file again after an
+            interruption only sends the missing parts, as long as the file didn't change.
+            Defaults to False.
+
+        media_sessions_idle_timeout (``float``, *optional*):
+            Seconds after which the connections to a DC that weren't used for uploads or downloads
+            are closed. Pass None to keep them open until the client is stopped.
+            Defaults to 300 (5 minutes).
+
         connection_factory (:obj:`~hydrogram.connection.Connection`, *optional*):
             Pass a custom connection factory to the client.
 
@@ -216,12 +306,16 @@ class Client(Methods):
         r"^(?:https?://)?(?:www\.)?(?:t(?:elegram)?\.(?:org|me|dog)/(?:joinchat/|\+))([\w-]+)$"
     )
     WORKERS = min(32, (os.cpu_count() or 0) + 4)  # os.cpu_count() can be None
+    INTERNAL_WORKERS = 4
     WORKDIR = PARENT_DIR
 
     # Interval of seconds in which the updates watchdog will kick in
     UPDATES_WATCHDOG_INTERVAL = 15 * 60
 
     MAX_CONCURRENT_TRANSMISSIONS = 1
+    DOWNLOAD_WINDOW = 8
+    UPLOAD_WINDOW = 8
+    MEDIA_SESSIONS_IDLE_TIMEOUT = 5 * 60
 
     mimetypes = MimeTypes()
     mimetypes.readfp(StringIO(mime_types))
@@ -246,14 +340,30 @@ class Client(Methods):
         phone_code: str | None = None,
         password: str | None = None,
         workers: int = WORKERS,
+        sync_workers: int | None = None,
+        internal_workers: int = INTERNAL_WORKERS,
+        process_workers: int | None = None,
         workdir: str = str(WORKDIR),
         plugins: dict | None = None,
         parse_mode: enums.ParseMode = enums.ParseMode.DEFAULT,
         no_updates: bool | None = None,
         takeout: bool | None = None,
+        catch_up: bool = False,
+        max_queued_updates: int = 0,
+        updates_overflow_policy: enums.OverflowPolicy = enums.OverflowPolicy.BLOCK,
+        dispatch_mode: enums.DispatchMode = enums.DispatchMode.CONCURRENT,
+        coalesce_window: float | None = None,
+        slow_handler_threshold: float | None = None,
         sleep_threshold: int = Session.SLEEP_THRESHOLD,
         hide_password: bool = False,
         max_concurrent_transmissions: int = MAX_CONCURRENT_TRANSMISSIONS,
+        max_concurrent_uploads: int | None = None,
+        download_window: int = DOWNLOAD_WINDOW,
+        upload_window: int = UPLOAD_WINDOW,
+        media_connections: int = 1,
+        preallocate_downloads: bool = False,
+        resumable_uploads: bool = False,
+        media_sessions_idle_timeout: float | None = MEDIA_SESSIONS_IDLE_TIMEOUT,
         connection_factory: builtins.type[Connection] = Connection,
         protocol_factory: builtins.type[TCP] = TCPAbridged,
     ):
@@ -276,18 +386,41 @@ class Client(Methods):
         self.phone_code = phone_code
         self.password = password
         self.workers = workers
+        self.sync_workers = sync_workers or workers
+        self.internal_workers = internal_workers
+        self.process_workers = process_workers
         self.workdir = Path(workdir)
         self.plugins = plugins
         self.parse_mode = parse_mode
         self.no_updates = no_updates
         self.takeout = takeout
+        self.catch_up = catch_up
+        self.max_queued_updates = max_queued_updates
+        self.updates_overflow_policy = updates_overflow_policy
+        self.dispatch_mode = dispatch_mode
+        self.coalesce_window = coalesce_window
+        self.slow_handler_threshold = slow_handler_threshold
         self.sleep_threshold = sleep_threshold
         self.hide_password = hide_password
         self.max_concurrent_transmissions = max_concurrent_transmissions
+        self.max_concurrent_uploads = (
+            max_concurrent_transmissions
+            if max_concurrent_uploads is None
+            else max_concurrent_uploads
+        )
+        self.download_window = download_window
+        self.upload_window = upload_window
+        self.media_connections = media_connections
+        self.preallocate_downloads = preallocate_downloads
+        self.resumable_uploads = resumable_uploads
+        self.media_sessions_idle_timeout = media_sessions_idle_timeout
         self.connection_factory = connection_factory
         self.protocol_factory = protocol_factory
 
-        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="Handler")
+        self.executor = ThreadPoolExecutor(self.sync_workers, thread_name_prefix="Handler")
+        self.internal_executor = ThreadPoolExecutor(
+            self.internal_workers, thread_name_prefix="Internal"
+        )
 
         if self.session_string:
             self.storage = SQLiteStorage(
@@ -301,6 +434,7 @@ class Client(Methods):
             self.storage = SQLiteStorage(self.name, self.workdir)
 
         self.dispatcher = Dispatcher(self)
+        self.updates_manager = UpdatesManager(self)
 
         self.rnd_id = MsgId
 
@@ -309,10 +443,20 @@ class Client(Methods):
         self.session = None
 
         self.media_sessions = {}
+        # Additional connections to the DCs in media_sessions, see media_connections
+        self.extra_media_sessions: dict[int, list[Session]] = {}
         self.media_sessions_lock = asyncio.Lock()
+        # Transfers using the media sessions of each DC and when the last one ended, so that idle
+        # sessions can be closed by the media sessions watchdog
+        self.media_sessions_users: dict[int, int] = {}
+        self.media_sessions_last_used: dict[int, float] = {}
+        # DCs whose sessions were handed out by get_media_sessions, which are never closed when idle
+        self.kept_media_sessions: set[int] = set()
+        self.media_sessions_watchdog_task = None
+        self.media_sessions_watchdog_event = asyncio.Event()
 
         self.file_lock = asyncio.Lock()
-        self.save_file_semaphore = asyncio.Semaphore(self.max_concurrent_transmissions)
+        self.save_file_semaphore = asyncio.Semaphore(self.max_concurrent_uploads)
         self.get_file_semaphore = asyncio.Semaphore(self.max_concurrent_transmissions)
 
         self.is_connected = None
@@ -359,6 +503,22 @@ class Client(Methods):
             ):
                 await self.invoke(raw.functions.updates.GetState())
 
+    async def media_sessions_watchdog(self):
+        if self.media_sessions_idle_timeout is None:
+            return
+
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self.media_sessions_watchdog_event.wait(), self.media_sessions_idle_timeout
+                )
+            except asyncio.TimeoutError:
+                pass
+            else:
+                break
+
+            await self.expire_media_sessions()
+
     async def authorize(self) -> User:
         if self.bot_token:
             return await self.sign_in_bot(self.bot_token)
@@ -583,6 +743,8 @@ class Client(Methods):
             users = {u.id: u for u in updates.users}
             chats = {c.id: c for c in updates.chats}
 
+            self.updates_manager.check_seq(updates)
+
             for update in updates.updates:
                 channel_id = getattr(
                     getattr(getattr(update, "message", None), "peer_id", None),
@@ -593,9 +755,6 @@ class Client(Methods):
                 pts = getattr(update, "pts", None)
                 pts_count = getattr(update, "pts_count", None)
 
-                if isinstance(update, raw.types.UpdateChannelTooLong):
-                    log.info(update)
-
                 if isinstance(update, raw.types.UpdateNewChannelMessage) and is_min:
                     message = update.message
 
@@ -625,8 +784,13 @@ class Client(Methods):
                                 users.update({u.id: u for u in diff.users})
                                 chats.update({c.id: c for c in diff.chats})
 
-                self.dispatcher.updates_queue.put_nowait((update, users, chats))
+                await self.updates_manager.feed(update, users, chats)
+
+            self.updates_manager.commit_seq(updates)
         elif isinstance(updates, (raw.types.UpdateShortMessage, raw.types.UpdateShortChatMessage)):
+            if self.updates_manager.is_duplicate(updates.pts, updates.pts_count):
+                return
+
             diff = await self.invoke(
                 raw.functions.updates.GetDifference(
                     pts=updates.pts - updates.pts_count, date=updates.date, qts=-1
@@ -634,7 +798,7 @@ class Client(Methods):
             )
 
             if diff.new_messages:
-                self.dispatcher.updates_queue.put_nowait((
+                await self.updates_manager.feed(
                     raw.types.UpdateNewMessage(
                         message=diff.new_messages[0],
                         pts=updates.pts,
@@ -642,13 +806,15 @@ class Client(Methods):
                     ),
                     {u.id: u for u in diff.users},
                     {c.id: c for c in diff.chats},
-                ))
+                )
             elif diff.other_updates:  # The other_updates list can be empty
-                self.dispatcher.updates_queue.put_nowait((diff.other_updates[0], {}, {}))
+                await self.updates_manager.feed(diff.other_updates[0], {}, {})
         elif isinstance(updates, raw.types.UpdateShort):
-            self.dispatcher.updates_queue.put_nowait((updates.update, {}, {}))
+            await self.updates_manager.feed(updates.update, {}, {})
         elif isinstance(updates, raw.types.UpdatesTooLong):
             log.info(updates)
+            self.updates_manager.stats["too_long"] += 1
+            self.updates_manager.recover(COMMON)
 
     async def load_session(self):
         await self.storage.open()
@@ -863,21 +1029,71 @@ class Client(Methods):
             file_size,
             progress,
             progress_args,
+            resume,
         ) = packet
 
         None if in_memory else Path(directory).mkdir(parents=True, exist_ok=True)
         file_path = Path(directory).resolve() / file_name
+        resume = resume and not in_memory
+        offset = 0
+
+        if resume:
+            # Interrupted downloads leave these files behind, to be continued on the next attempt
+            temp_file_path = file_path.with_name(file_path.name + ".temp")
+            journal = DownloadJournal(
+                file_path.with_name(file_path.name + ".journal"), self.internal_executor
+            )
+
+            if temp_file_path.exists():
+                offset = await journal.load(file_id.media_id, file_size)
+                offset = min(offset, temp_file_path.stat().st_size)
+                offset -= offset % Downloader.CHUNK_SIZE
 
-        random_suffix = "".join(random.choices(string.ascii_letters + string.digits, k=8))
-        temp_file_path = file_path.with_name(file_path.stem + "_" + random_suffix + ".temp")
+            if offset:
+                log.info("Resuming the download of %s from byte %s", file_path, offset)
+        else:
+            random_suffix = "".join(random.choices(string.ascii_letters + string.digits, k=8))
+            temp_file_path = file_path.with_name(file_path.stem + "_" + random_suffix + ".temp")
 
-        file = BytesIO() if in_memory else Path(temp_file_path).open("wb")  # noqa: SIM115 file is closed manually
+        if in_memory:
+            file = BytesIO()
+        else:
+            # The file is closed manually
+            file = Path(temp_file_path).open("r+b" if offset else "wb")  # noqa: SIM115
+            file.truncate(offset)
+
+        writer = FileWriter(file, executor=self.internal_executor)
+
+        async def save_progress():
+            await writer.flush()
+
+            if resume:
+                await journal.save(file_id, file_size, offset)
 
         try:
-            async for chunk in self.get_file(file_id, file_size, 0, 0, progress, progress_args):
-                file.write(chunk)
+            if self.preallocate_downloads and not in_memory:
+                await writer.allocate(file_size)
+
+            async for chunk in self.get_file(
+                file_id, file_size, 0, offset // Downloader.CHUNK_SIZE, progress, progress_args
+            ):
+                await writer.write(chunk, offset)
+                offset += len(chunk)
+
+                if resume and offset - journal.saved >= journal.INTERVAL:
+                    await save_progress()
+
+            await writer.flush()
         except BaseException as e:
-            if not in_memory:
+            if resume:
+                with contextlib.suppress(Exception):
+                    await save_progress()
+
+                file.close()
+            elif not in_memory:
+                with contextlib.suppress(Exception):
+                    await writer.flush()
+
                 file.close()
                 Path(temp_file_path).unlink()
 
@@ -893,8 +1109,30 @@ class Client(Methods):
                 file.name = file_name
                 return file
 
+            # The file size may have been wrong, don't leave the extra space allocated
+            if self.preallocate_downloads and offset != file_size:
+                file.truncate(offset)
+
             file.close()
 
+            if resume:
+                # Something went wrong if the size doesn't match: continue from where the download
+                # stopped next time, or start over if the file is somehow bigger than expected
+                if file_size and offset != file_size:
+                    log.warning(
+                        "Downloaded %s bytes of %s instead of %s", offset, file_path, file_size
+                    )
+
+                    if offset < file_size:
+                        await journal.save(file_id, file_size, offset)
+                    else:
+                        Path(temp_file_path).unlink()
+                        await journal.remove()
+
+                    return None
+
+                await journal.remove()
+
             async with self.file_lock:
                 final_file_path: Path = file_path
                 counter = 1
@@ -908,6 +1146,108 @@ class Client(Methods):
 
             return final_file_path
 
+    async def get_media_sessions(self, dc_id: int, is_cdn: bool = False) -> list[Session]:
+        """Get the started media sessions to a DC, one for each of the *media_connections*.
+
+        The sessions are created on first use and kept until the client is stopped, since they can
+        be used at any time by whoever got them. Use :meth:`use_media_sessions` instead to let them
+        be closed once idle. Sessions to CDN DCs (*is_cdn*) are reused the same way, by every file
+        redirected to the same CDN DC.
+        """
+        self.kept_media_sessions.add(dc_id)
+
+        return await self.start_media_sessions(dc_id, is_cdn)
+
+    async def start_media_sessions(self, dc_id: int, is_cdn: bool = False) -> list[Session]:
+        async with self.media_sessions_lock:
+            session = self.media_sessions.get(dc_id)
+
+            if not session:
+                test_mode = await self.storage.test_mode()
+                is_home_dc = dc_id == await self.storage.dc_id()
+                auth_key = (
+                    await self.storage.auth_key()
+                    if is_home_dc
+                    else await Auth(self, dc_id, test_mode).create()
+                )
+                session = Session(self, dc_id, auth_key, test_mode, is_media=True, is_cdn=is_cdn)
+                await session.start()
+
+                # CDN DCs don't need the authorization, files are downloaded using a token
+                if not is_home_dc and not is_cdn:
+                    for _ in range(3):
+                        exported_auth = await self.invoke(
+                            raw.functions.auth.ExportAuthorization(dc_id=dc_id)
+                        )
+                        try:
+                            await session.invoke(
+                                raw.functions.auth.ImportAuthorization(
+                                    id=exported_auth.id, bytes=exported_auth.bytes
+                                )
+                            )
+                            break
+                        except AuthBytesInvalid:
+                            continue
+                    else:
+                        await session.stop()
+                        raise AuthBytesInvalid
+
+                self.media_sessions[dc_id] = session
+
+            extra_sessions = self.extra_media_sessions.setdefault(dc_id, [])
+
+            # The extra connections share the authorization of the first one
+            while len(extra_sessions) < self.media_connections - 1:
+                extra_session = Session(
+                    self, dc_id, session.auth_key, session.test_mode, is_media=True, is_cdn=is_cdn
+                )
+                await extra_session.start()
+                extra_sessions.append(extra_session)
+
+            return [session, *extra_sessions[: self.media_connections - 1]]
+
+    @contextlib.asynccontextmanager
+    async def use_media_sessions(
+        self, dc_id: int, is_cdn: bool = False
+    ) -> AsyncGenerator[list[Session], None]:
+        """Get the started media sessions to a DC for the duration of a transfer.
+
+        The sessions are shared by uploads and downloads to the same DC and kept open in between,
+        until they stay unused for *media_sessions_idle_timeout* seconds.
+        """
+        self.media_sessions_users[dc_id] = self.media_sessions_users.get(dc_id, 0) + 1
+
+        try:
+            yield await self.start_media_sessions(dc_id, is_cdn)
+        finally:
+            self.media_sessions_users[dc_id] -= 1
+            self.media_sessions_last_used[dc_id] = time.monotonic()
+
+    async def expire_media_sessions(self):
+        """Stop the media sessions that have been idle for longer than the timeout."""
+        if self.media_sessions_idle_timeout is None:
+            return
+
+        now = time.monotonic()
+
+        async with self.media_sessions_lock:
+            for dc_id, last_used in list(self.media_sessions_last_used.items()):
+                if (
+                    self.media_sessions_users[dc_id]
+                    or dc_id in self.kept_media_sessions
+                    or now - last_used < self.media_sessions_idle_timeout
+                ):
+                    continue
+
+                del self.media_sessions_last_used[dc_id]
+
+                await self.media_sessions.pop(dc_id).stop()
+
+                for session in self.extra_media_sessions.pop(dc_id, []):
+                    await session.stop()
+
+                log.debug("Closed the idle media sessions to DC%s", dc_id)
+
     async def get_file(
         self,
         file_id: FileId,
@@ -957,152 +1297,68 @@ class Client(Methods):
             offset_bytes = abs(offset) * chunk_size
             dc_id = file_id.dc_id
 
-            try:
-                session = self.media_sessions.get(dc_id)
-                if not session:
-                    auth_key = (
-                        await Auth(self, dc_id, await self.storage.test_mode()).create()
-                        if dc_id != await self.storage.dc_id()
-                        else await self.storage.auth_key()
+            async def report_progress():
+                if progress:
+                    func = functools.partial(
+                        progress,
+                        min(offset_bytes, file_size) if file_size != 0 else offset_bytes,
+                        file_size,
+                        *progress_args,
                     )
-                    session = self.media_sessions[dc_id] = Session(
-                        self, dc_id, auth_key, await self.storage.test_mode(), is_media=True
-                    )
-                    await session.start()
 
-                    if dc_id != await self.storage.dc_id():
-                        for _ in range(3):
-                            exported_auth = await self.invoke(
-                                raw.functions.auth.ExportAuthorization(dc_id=dc_id)
-                            )
-                            try:
-                                await session.invoke(
-                                    raw.functions.auth.ImportAuthorization(
-                                        id=exported_auth.id, bytes=exported_auth.bytes
-                                    )
-                                )
-                                break
-                            except AuthBytesInvalid:
-                                continue
-                        else:
-                            raise AuthBytesInvalid
+                    if inspect.iscoroutinefunction(progress):
+                        await func()
+                    else:
+                        await self.loop.run_in_executor(self.internal_executor, func)
 
-                while True:
-                    r = await session.invoke(
-                        raw.functions.upload.GetFile(
-                            location=location, offset=offset_bytes, limit=chunk_size
-                        ),
-                        sleep_threshold=30,
+            try:
+                async with self.use_media_sessions(dc_id) as sessions:
+                    session = sessions[0]
+                    downloader = Downloader(
+                        sessions, location, file_size, abs(offset), total, self.download_window
                     )
+                    chunks = downloader.chunks()
 
-                    if isinstance(r, raw.types.upload.File):
-                        chunk = r.bytes
-                        yield chunk
-
-                        current += 1
-                        offset_bytes += chunk_size
-
-                        if progress:
-                            func = functools.partial(
-                                progress,
-                                min(offset_bytes, file_size) if file_size != 0 else offset_bytes,
-                                file_size,
-                                *progress_args,
-                            )
-
-                            if inspect.iscoroutinefunction(progress):
-                                await func()
-                            else:
-                                await self.loop.run_in_executor(self.executor, func)
-
-                        if len(chunk) < chunk_size or current >= total:
-                            break
-
-                    elif isinstance(r, raw.types.upload.FileCdnRedirect):
-                        cdn_session = Session(
-                            self,
-                            r.dc_id,
-                            await Auth(self, r.dc_id, await self.storage.test_mode()).create(),
-                            await self.storage.test_mode(),
-                            is_media=True,
-                            is_cdn=True,
+                    try:
+                        async for chunk in chunks:
+                            yield chunk
+
+                            current += 1
+                            offset_bytes += chunk_size
+
+                            await report_progress()
+                    except CdnRedirectError as e:
+                        redirect = e.redirect
+                    else:
+                        return
+                    finally:
+                        await chunks.aclose()
+
+                    async with self.use_media_sessions(
+                        redirect.dc_id, is_cdn=True
+                    ) as cdn_sessions:
+                        downloader = CdnDownloader(
+                            cdn_sessions,
+                            session,
+                            redirect,
+                            file_size,
+                            abs(offset) + current,
+                            total - current,
+                            self.download_window,
+                            self.internal_executor,
                         )
+                        chunks = downloader.chunks()
 
                         try:
-                            await cdn_session.start()
-
-                            while True:
-                                r2 = await cdn_session.invoke(
-                                    raw.functions.upload.GetCdnFile(
-                                        file_token=r.file_token,
-                                        offset=offset_bytes,
-                                        limit=chunk_size,
-                                    )
-                                )
-
-                                if isinstance(r2, raw.types.upload.CdnFileReuploadNeeded):
-                                    try:
-                                        await session.invoke(
-                                            raw.functions.upload.ReuploadCdnFile(
-                                                file_token=r.file_token,
-                                                request_token=r2.request_token,
-                                            )
-                                        )
-                                    except VolumeLocNotFound:
-                                        break
-                                    else:
-                                        continue
-
-                                chunk = r2.bytes
-
-                                # https://core.telegram.org/cdn#decrypting-files
-                                decrypted_chunk = aes.ctr256_decrypt(
-                                    chunk,
-                                    r.encryption_key,
-                                    bytearray(
-                                        r.encryption_iv[:-4]
-                                        + (offset_bytes // 16).to_bytes(4, "big")
-                                    ),
-                                )
-
-                                hashes = await session.invoke(
-                                    raw.functions.upload.GetCdnFileHashes(
-                                        file_token=r.file_token, offset=offset_bytes
-                                    )
-                                )
-
-                                # https://core.telegram.org/cdn#verifying-files
-                                for i, h in enumerate(hashes):
-                                    cdn_chunk = decrypted_chunk[h.limit * i : h.limit * (i + 1)]
-                                    CDNFileHashMismatch.check(
-                                        h.hash == sha256(cdn_chunk).digest(),
-                                        "h.hash == sha256(cdn_chunk).digest()",
-                                    )
-
-                                yield decrypted_chunk
+                            async for chunk in chunks:
+                                yield chunk
 
                                 current += 1
                                 offset_bytes += chunk_size
 
-                                if progress:
-                                    func = functools.partial(
-                                        progress,
-                                        min(offset_bytes, file_size)
-                                        if file_size != 0
-                                        else offset_bytes,
-                                        file_size,
-                                        *progress_args,
-                                    )
-
-                                    if inspect.iscoroutinefunction(progress):
-                                        await func()
-                                    else:
-                                        await self.loop.run_in_executor(self.executor, func)
-
-                                if len(chunk) < chunk_size or current >= total:
-                                    break
+                                await report_progress()
                         finally:
-                            await cdn_session.stop()
+                            await chunks.aclose()
             except hydrogram.StopTransmission:
                 raise
             except hydrogram.errors.FloodWait:
@@ -20,13 +20,18 @@
 from __future__ import annotations
 
 import asyncio
+import bisect
+import contextlib
 import inspect
 import logging
-from collections import OrderedDict
-from typing import TYPE_CHECKING, Callable
+import math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, ClassVar
 
 import hydrogram
-from hydrogram import raw, types, utils
+from hydrogram import enums, filters, raw, types, utils
 from hydrogram.handlers import (
     CallbackQueryHandler,
     ChatJoinRequestHandler,
@@ -59,6 +64,8 @@ from hydrogram.raw.types import (
     UpdateNewScheduledMessage,
     UpdateUserStatus,
 )
+from hydrogram.routing import HandlerIndex, RawMessageView, build_routes
+from hydrogram.updates_queue import UpdatesQueue
 
 if TYPE_CHECKING:
     from collections.abc import Awaitable
@@ -69,6 +76,33 @@ if TYPE_CHECKING:
 log = logging.getLogger(__name__)
 
 
+class HandlerStats:
+    """Execution metrics of a handler callback."""
+
+    # Upper bounds, in seconds, of the latency histogram buckets
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, math.inf)
+
+    __slots__ = ("calls", "errors", "histogram", "max_time", "timeouts", "total_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * len(self.BUCKETS)
+
+    def record(self, elapsed: float):
+        self.calls += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.histogram[bisect.bisect_left(self.BUCKETS, elapsed)] += 1
+
+    @property
+    def average_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+
 class Dispatcher:
     NEW_MESSAGE_UPDATES = (UpdateNewMessage, UpdateNewChannelMessage, UpdateNewScheduledMessage)
     EDIT_MESSAGE_UPDATES = (UpdateEditMessage, UpdateEditChannelMessage)
@@ -81,16 +115,93 @@ class Dispatcher:
     CHOSEN_INLINE_RESULT_UPDATES = (UpdateBotInlineSend,)
     CHAT_JOIN_REQUEST_UPDATES = (UpdateBotChatInviteRequester,)
 
+    # Priority classes of the updates queue, any other update has NORMAL priority
+    # (channel posts have LOW priority)
+    UPDATE_PRIORITIES: ClassVar[dict[type[raw.core.TLObject], int]] = {
+        **dict.fromkeys(
+            CALLBACK_QUERY_UPDATES + BOT_INLINE_QUERY_UPDATES + CHOSEN_INLINE_RESULT_UPDATES,
+            UpdatesQueue.HIGH,
+        ),
+        **dict.fromkeys(USER_STATUS_UPDATES + POLL_UPDATES, UpdatesQueue.LOW),
+    }
+
+    # Updates whose candidate handlers can be found from the raw update, so that it's only parsed
+    # when at least one handler may accept it
+    LAZY_PARSE_UPDATES: ClassVar[dict[type[raw.core.TLObject], type[Handler]]] = {
+        **dict.fromkeys(NEW_MESSAGE_UPDATES, MessageHandler),
+        **dict.fromkeys(EDIT_MESSAGE_UPDATES, EditedMessageHandler),
+    }
+
     def __init__(self, client: hydrogram.Client):
         self.client = client
         self.loop = asyncio.get_event_loop()
         self.handler_worker_tasks: list[asyncio.Task] = []
-        self.locks_list: list[asyncio.Lock] = []
-        self.updates_queue = asyncio.Queue()
-        self.groups: dict[int, list[Handler]] = OrderedDict()
-        self.error_handlers: list[ErrorHandler] = []
+        self.updates_queue = UpdatesQueue(
+            client.max_queued_updates,
+            client.updates_overflow_policy,
+            self._get_priority,
+            None if client.coalesce_window is None else self._get_coalesce_key,
+            client.coalesce_window or 0,
+            self._get_ordering_key,
+        )
+        # The registered handlers, sorted by group. Like the error handlers and the handler
+        # indexes (routes), they are snapshots that are never modified but replaced as a whole
+        # when handlers are added or removed, so that the workers go through them without locking.
+        self.groups: dict[int, tuple[Handler, ...]] = {}
+        # PER_CHAT dispatch mode: packets waiting for a chat that is being handled, keyed by chat
+        # id, and the chats ready to be handled, spread among the workers (shards) by chat id.
+        self.backlogs: dict[int, deque] = {}
+        self.shards: list[deque[int]] = []
+        # Workers waiting for updates, woken up to steal chats from the other shards
+        self.idle_workers: deque[asyncio.Future] = deque()
+        self.stolen = 0
+        self.error_handlers: tuple[ErrorHandler, ...] = ()
+        # Handler indexes by handler type, rebuilt when handlers or chat/user filters change
+        self.routes: dict[type[Handler], list[HandlerIndex]] = {}
+        self.routes_version = filters.Filter.version
+        self.skipped_parses = 0
+        self.handler_stats: dict[Handler, HandlerStats] = {}
+        self.slow_handler_threshold = client.slow_handler_threshold
+        # Semaphores of the handlers with a max_concurrency, created on their first call
+        self.semaphores: dict[Handler, asyncio.Semaphore] = {}
+        self.detached_tasks: set[asyncio.Task] = set()
+        # Runs the synchronous callbacks of handlers added with in_process, started on first use
+        self.process_executor: ProcessPoolExecutor | None = None
         self._init_update_parsers()
 
+    def _get_priority(self, packet: tuple[raw.core.TLObject, dict, dict]) -> int:
+        update = packet[0]
+        priority = self.UPDATE_PRIORITIES.get(type(update))
+
+        if priority is not None:
+            return priority
+
+        if getattr(getattr(update, "message", None), "post", False):
+            return UpdatesQueue.LOW
+
+        return UpdatesQueue.NORMAL
+
+    def _get_ordering_key(self, packet: tuple[raw.core.TLObject, dict, dict]) -> int | None:
+        # Updates of the same chat are never reordered by priority
+        return self._get_chat_key(packet[0])
+
+    def _get_coalesce_key(self, packet: tuple[raw.core.TLObject, dict, dict]) -> tuple | None:
+        update = packet[0]
+
+        if isinstance(update, self.USER_STATUS_UPDATES):
+            return UpdateUserStatus, update.user_id
+
+        if isinstance(update, self.EDIT_MESSAGE_UPDATES):
+            peer = getattr(update.message, "peer_id", None)
+
+            if peer is not None:
+                return UpdateEditMessage, utils.get_peer_id(peer), update.message.id
+
+        if isinstance(update, self.POLL_UPDATES):
+            return UpdateMessagePoll, update.poll_id
+
+        return None
+
     def _init_update_parsers(self):
         update_parsers = {
             (
@@ -221,10 +332,18 @@ class Dispatcher:
 
     async def start(self):
         if not self.client.no_updates:
-            self.locks_list = [asyncio.Lock() for _ in range(self.client.workers)]
-            self.handler_worker_tasks = [
-                self.loop.create_task(self.handler_worker(lock)) for lock in self.locks_list
-            ]
+            if self.client.dispatch_mode == enums.DispatchMode.PER_CHAT:
+                self.shards = [deque() for _ in range(self.client.workers)]
+                self.handler_worker_tasks = [
+                    self.loop.create_task(self.sharded_handler_worker(shard))
+                    for shard in range(self.client.workers)
+                ]
+            else:
+                self.handler_worker_tasks = [
+                    self.loop.create_task(self.handler_worker())
+                    for _ in range(self.client.workers)
+                ]
+
             log.info("Started %s HandlerTasks", self.client.workers)
 
     async def stop(self):
@@ -233,57 +352,214 @@ class Dispatcher:
                 self.updates_queue.put_nowait(None)
             await asyncio.gather(*self.handler_worker_tasks)
             self.handler_worker_tasks.clear()
-            self.groups.clear()
-            self.error_handlers.clear()
+            await asyncio.gather(*self.detached_tasks)
+            self.semaphores.clear()
+
+            if self.process_executor is not None:
+                self.process_executor.shutdown(wait=False)
+                self.process_executor = None
+
+            self.groups = {}
+            self.routes = {}
+            self.error_handlers = ()
 
             log.info("Stopped %s HandlerTasks", self.client.workers)
 
     def add_handler(self, handler: Handler, group: int):
-        async def fn():
-            async with asyncio.Lock():
-                if isinstance(handler, ErrorHandler):
-                    if handler not in self.error_handlers:
-                        self.error_handlers.append(handler)
-                else:
-                    if group not in self.groups:
-                        self.groups[group] = []
-                        self.groups = OrderedDict(sorted(self.groups.items()))
-                    self.groups[group].append(handler)
+        if isinstance(handler, ErrorHandler):
+            if handler not in self.error_handlers:
+                self.error_handlers = (*self.error_handlers, handler)
+
+            return
+
+        handler.compile_filters()
 
-        self.loop.create_task(fn())
+        groups = dict(self.groups)
+        groups[group] = (*groups.get(group, ()), handler)
+
+        self._set_groups(groups)
 
     def remove_handler(self, handler: Handler, group: int):
-        async def fn():
-            async with asyncio.Lock():
-                if isinstance(handler, ErrorHandler):
-                    if handler not in self.error_handlers:
-                        raise ValueError(
-                            f"Error handler {handler} does not exist. Handler was not removed."
-                        )
-
-                    self.error_handlers.remove(handler)
-                else:
-                    if group not in self.groups:
-                        raise ValueError(f"Group {group} does not exist. Handler was not removed.")
-                    self.groups[group].remove(handler)
+        if isinstance(handler, ErrorHandler):
+            if handler not in self.error_handlers:
+                raise ValueError(
+                    f"Error handler {handler} does not exist. Handler was not removed."
+                )
+
+            error_handlers = list(self.error_handlers)
+            error_handlers.remove(handler)
+            self.error_handlers = tuple(error_handlers)
+
+            return
+
+        if group not in self.groups:
+            raise ValueError(f"Group {group} does not exist. Handler was not removed.")
+
+        handlers = list(self.groups[group])
+        handlers.remove(handler)
+
+        self._set_groups({**self.groups, group: tuple(handlers)})
 
-        self.loop.create_task(fn())
+    def _set_groups(self, groups: dict[int, tuple[Handler, ...]]):
+        self.groups = dict(sorted(groups.items()))
+        self.routes = {}
 
-    async def handler_worker(self, lock: asyncio.Lock):
+    async def handler_worker(self):
         while True:
             packet = await self.updates_queue.get()
             if packet is None:
                 break
-            await self._process_packet(packet, lock)
+            await self._process_packet(packet)
+
+    @staticmethod
+    def _get_chat_key(update: raw.core.TLObject) -> int | None:
+        peer = getattr(getattr(update, "message", None), "peer_id", None) or getattr(
+            update, "peer", None
+        )
+
+        if isinstance(peer, (raw.types.PeerUser, raw.types.PeerChat, raw.types.PeerChannel)):
+            return utils.get_peer_id(peer)
+
+        if isinstance(getattr(update, "channel_id", None), int):
+            return utils.get_channel_id(update.channel_id)
+
+        if isinstance(getattr(update, "chat_id", None), int):
+            return -update.chat_id
+
+        user_id = getattr(update, "user_id", None)
+
+        return user_id if isinstance(user_id, int) else None
+
+    def _take_ready(self, shard: int) -> tuple[int, tuple] | None:
+        ready = self.shards[shard]
+
+        if not ready:
+            # Nothing to do on this shard, steal a chat from the busiest one
+            ready = max(self.shards, key=len)
+
+            if not ready:
+                return None
+
+            self.stolen += 1
+
+        key = ready.popleft()
+
+        return key, self.backlogs[key].popleft()
+
+    def _release(self, key: int):
+        if self.backlogs[key]:
+            # Back to the end of the line, so that a busy chat doesn't starve the others
+            self.shards[hash(key) % len(self.shards)].append(key)
+
+            # Let an idle worker take it, in case the worker of its shard is busy
+            while self.idle_workers:
+                waiter = self.idle_workers.popleft()
+
+                if not waiter.done():
+                    waiter.set_result(None)
+                    break
+        else:
+            del self.backlogs[key]
+
+    async def _next_packet(self) -> tuple | bool | None:
+        """Get the next packet from the queue, or False if woken up to take a ready chat."""
+        getter = self.loop.create_task(self.updates_queue.get())
+        waiter = self.loop.create_future()
+        self.idle_workers.append(waiter)
+
+        try:
+            await asyncio.wait({getter, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+
+            with contextlib.suppress(ValueError):
+                self.idle_workers.remove(waiter)
+
+            # The queue hands the packet over to another getter, if this one got it meanwhile
+            getter.cancel()
+
+        await asyncio.wait({getter})
+
+        return False if getter.cancelled() else getter.result()
+
+    @property
+    def shard_depths(self) -> list[int]:
+        """Amount of updates waiting on each shard in the ``PER_CHAT`` dispatch mode."""
+        depths = [0] * len(self.shards)
+
+        for key, backlog in self.backlogs.items():
+            depths[hash(key) % len(self.shards)] += len(backlog)
+
+        return depths
+
+    async def sharded_handler_worker(self, shard: int):
+        is_stopping = False
+
+        while True:
+            taken = self._take_ready(shard)
+
+            if taken is not None:
+                key, packet = taken
+            elif is_stopping:
+                # Nothing left on any shard
+                break
+            else:
+                packet = await self._next_packet()
+
+                if packet is False:
+                    continue
+
+                if packet is None:
+                    # Handle the updates still waiting on the shards before stopping
+                    is_stopping = True
+                    continue
+
+                key = self._get_chat_key(packet[0])
+
+                if key in self.backlogs:
+                    self.backlogs[key].append(packet)
+                    continue
+
+                if key is not None:
+                    self.backlogs[key] = deque()
+
+            try:
+                await self._process_packet(packet)
+            finally:
+                if key is not None:
+                    self._release(key)
+
+    def _get_routes(self, handler_type: type[Handler]) -> list[HandlerIndex]:
+        if self.routes_version != filters.Filter.version:
+            self.routes = {}
+            self.routes_version = filters.Filter.version
+
+        routes = self.routes.get(handler_type)
+
+        if routes is None:
+            routes = self.routes[handler_type] = build_routes(self.groups, handler_type)
+
+        return routes
 
     async def _process_packet(
         self,
         packet: tuple[raw.core.TLObject, dict[int, types.Update], dict[int, types.Update]],
-        lock: asyncio.Lock,
     ):
         try:
             update, users, chats = packet
             parser = self.update_parsers.get(type(update))
+            has_listeners = any(getattr(self.client, "listeners", {}).values())
+            lazy_handler_type = self.LAZY_PARSE_UPDATES.get(type(update))
+
+            if lazy_handler_type is not None:
+                view = RawMessageView(update.message)
+
+                if not any(
+                    index.candidates(self.client, view, has_listeners)
+                    for index in self._get_routes(lazy_handler_type)
+                ):
+                    self.skipped_parses += 1
+                    return
 
             if parser is not None:
                 parsed_result = parser(update, users, chats)
@@ -294,25 +570,26 @@ class Dispatcher:
             else:
                 parsed_update, handler_type = (None, type(None))
 
-            async with lock:
-                for group in self.groups.values():
-                    for handler in group:
-                        try:
-                            if parsed_update is not None:
-                                if isinstance(handler, handler_type) and await handler.check(
-                                    self.client, parsed_update
-                                ):
-                                    await self._execute_callback(handler, parsed_update)
-                                    break
-                            elif isinstance(handler, RawUpdateHandler):
-                                await self._execute_callback(handler, update, users, chats)
+            routes = self._get_routes(
+                handler_type if parsed_update is not None else RawUpdateHandler
+            )
+
+            for index in routes:
+                for handler in index.candidates(self.client, parsed_update, has_listeners):
+                    try:
+                        if parsed_update is not None:
+                            if await handler.check(self.client, parsed_update):
+                                await self._execute_callback(handler, parsed_update)
                                 break
-                        except (hydrogram.StopPropagation, hydrogram.ContinuePropagation) as e:
-                            if isinstance(e, hydrogram.StopPropagation):
-                                raise
-                        except Exception as exception:
-                            if parsed_update is not None:
-                                await self._handle_exception(parsed_update, exception)
+                        else:
+                            await self._execute_callback(handler, update, users, chats)
+                            break
+                    except (hydrogram.StopPropagation, hydrogram.ContinuePropagation) as e:
+                        if isinstance(e, hydrogram.StopPropagation):
+                            raise
+                    except Exception as exception:
+                        if parsed_update is not None:
+                            await self._handle_exception(parsed_update, exception)
         except hydrogram.StopPropagation:
             pass
         except Exception as e:
@@ -338,9 +615,82 @@ class Dispatcher:
             log.exception("Unhandled exception: %s", exception)
 
     async def _execute_callback(self, handler: Handler, *args):
+        if handler.fire_and_forget:
+            task = self.loop.create_task(self._execute_detached(handler, *args))
+            self.detached_tasks.add(task)
+            task.add_done_callback(self.detached_tasks.discard)
+        else:
+            await self._execute_limited(handler, *args)
+
+    async def _execute_limited(self, handler: Handler, *args):
+        semaphore = None
+
+        if handler.max_concurrency:
+            semaphore = self.semaphores.get(handler)
+
+            if semaphore is None:
+                semaphore = self.semaphores[handler] = asyncio.Semaphore(handler.max_concurrency)
+
+        async with semaphore or contextlib.nullcontext():
+            await self._run_callback(handler, *args)
+
+    def run_sync_callback(
+        self, handler: Handler, callback: Callable, client: hydrogram.Client, *args
+    ) -> asyncio.Future:
+        """Run the synchronous callback of a handler in the client executor, or in a separate
+        process for handlers added with *in_process*.
+
+        The client can't be sent to another process, the callback is called without it.
+        """
+        if not handler.in_process:
+            return self.loop.run_in_executor(self.client.executor, callback, client, *args)
+
+        if self.process_executor is None:
+            self.process_executor = ProcessPoolExecutor(self.client.process_workers)
+
+        return self.loop.run_in_executor(self.process_executor, callback, *args)
+
+    async def _execute_detached(self, handler: Handler, *args):
+        try:
+            await self._execute_limited(handler, *args)
+        except (hydrogram.StopPropagation, hydrogram.ContinuePropagation):
+            pass
+        except Exception as exception:
+            # Parsed updates are passed alone, raw updates along with their users and chats
+            if len(args) == 1:
+                await self._handle_exception(args[0], exception)
+            else:
+                log.exception(exception)
+
+    async def _run_callback(self, handler: Handler, *args):
         if inspect.iscoroutinefunction(handler.callback):
-            await handler.callback(self.client, *args)
+            callback = handler.callback(self.client, *args)
         else:
-            await self.loop.run_in_executor(
-                self.client.executor, handler.callback, self.client, *args
-            )
+            callback = self.run_sync_callback(handler, handler.callback, self.client, *args)
+
+        stats = self.handler_stats.get(handler)
+
+        if stats is None:
+            stats = self.handler_stats[handler] = HandlerStats()
+
+        start = perf_counter()
+
+        try:
+            if handler.timeout is None:
+                await callback
+            else:
+                await asyncio.wait_for(callback, handler.timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise
+        except (hydrogram.StopPropagation, hydrogram.ContinuePropagation):
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            elapsed = perf_counter() - start
+            stats.record(elapsed)
+
+            if self.slow_handler_threshold is not None and elapsed > self.slow_handler_threshold:
+                log.warning("Slow handler: %s took %.3f seconds", handler.callback_name, elapsed)
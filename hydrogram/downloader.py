@@ -0,0 +1,320 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+import math
+from hashlib import sha256
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from hydrogram import raw
+from hydrogram.crypto import aes
+from hydrogram.errors import CDNFileHashMismatch
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+    from concurrent.futures import Executor
+
+    from hydrogram.session import Session
+
+
+class CdnRedirectError(Exception):
+    """Raised when the file has to be downloaded from a CDN DC instead."""
+
+    def __init__(self, redirect: raw.types.upload.FileCdnRedirect, part: int):
+        super().__init__(f"File moved to CDN DC{redirect.dc_id}")
+        self.redirect = redirect
+        self.part = part
+
+
+class Downloader:
+    """Download a file in chunks, keeping several ``upload.GetFile`` requests in flight.
+
+    Chunks are requested ahead of the one being consumed, spread among the given sessions, and
+    yielded in order. At most ``window`` chunks are requested or waiting to be yielded at any time,
+    which also bounds the memory held by chunks received out of order.
+
+    The window grows while responses arrive about as fast as the fastest one seen and shrinks when
+    they slow down, which means the requests are queuing up somewhere on the way (e.g.: the
+    bandwidth is already saturated).
+
+    Parameters:
+        sessions (List of :obj:`~hydrogram.session.Session`):
+            The started media sessions to the DC of the file.
+
+        location (:obj:`~hydrogram.raw.base.InputFileLocation`):
+            The file location.
+
+        file_size (``int``):
+            The file size in bytes, or 0 if unknown. Chunks are requested one at a time when the
+            size is unknown, because requests past the end of the file fail.
+
+        offset (``int``, *optional*):
+            Index of the first chunk. Defaults to 0.
+
+        limit (``int``, *optional*):
+            Maximum amount of chunks. Defaults to 0 (up to the end of the file).
+
+        max_window (``int``, *optional*):
+            Maximum amount of chunks in flight. Defaults to 8.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    INITIAL_WINDOW = 2
+    # Smoothing factor of the response time average, as in TCP
+    RTT_ALPHA = 0.125
+    # Ratios of the average response time to the fastest one under/over which the window grows
+    # or shrinks
+    GROW_RATIO = 1.5
+    SHRINK_RATIO = 3
+
+    def __init__(
+        self,
+        sessions: list[Session],
+        location: raw.base.InputFileLocation,
+        file_size: int,
+        offset: int = 0,
+        limit: int = 0,
+        max_window: int = 8,
+    ):
+        self.sessions = sessions
+        self.location = location
+        self.offset = offset
+
+        end = offset + (limit or (1 << 31) - 1)
+
+        if file_size:
+            end = min(end, math.ceil(file_size / self.CHUNK_SIZE))
+            self.max_window = max(1, max_window)
+        else:
+            self.max_window = 1
+
+        self.end = end
+        self.window = min(self.INITIAL_WINDOW, self.max_window)
+        self.min_rtt = math.inf
+        self.rtt: float | None = None
+
+    def record(self, rtt: float):
+        self.min_rtt = min(self.min_rtt, rtt)
+        self.rtt = rtt if self.rtt is None else self.rtt + self.RTT_ALPHA * (rtt - self.rtt)
+
+        if self.rtt < self.min_rtt * self.GROW_RATIO:
+            self.window = min(self.window + 1, self.max_window)
+        elif self.rtt > self.min_rtt * self.SHRINK_RATIO:
+            self.window = max(self.window - 1, 1)
+
+    async def fetch(self, part: int) -> bytes:
+        session = self.sessions[part % len(self.sessions)]
+        start = perf_counter()
+
+        r = await session.invoke(
+            raw.functions.upload.GetFile(
+                location=self.location, offset=part * self.CHUNK_SIZE, limit=self.CHUNK_SIZE
+            ),
+            sleep_threshold=30,
+        )
+
+        if isinstance(r, raw.types.upload.FileCdnRedirect):
+            raise CdnRedirectError(r, part)
+
+        self.record(perf_counter() - start)
+
+        return r.bytes
+
+    async def chunks(self) -> AsyncGenerator[bytes, None]:
+        """Yield the chunks of the file in order.
+
+        Raises:
+            CdnRedirectError: In case the file has to be downloaded from a CDN DC, starting from
+                the chunk given by its ``part``.
+        """
+        loop = asyncio.get_running_loop()
+        pending: dict[int, asyncio.Task] = {}
+        requested = self.offset
+
+        try:
+            for part in range(self.offset, self.end):
+                while requested < self.end and requested - part < self.window:
+                    pending[requested] = loop.create_task(self.fetch(requested))
+                    requested += 1
+
+                chunk = await pending.pop(part)
+
+                yield chunk
+
+                if len(chunk) < self.CHUNK_SIZE:
+                    break
+        finally:
+            for task in pending.values():
+                task.cancel()
+
+            # Retrieve the outcome of the requests left behind, so that they aren't logged
+            await asyncio.gather(*pending.values(), return_exceptions=True)
+
+
+class CdnDownloader(Downloader):
+    """Download a file from a CDN DC, keeping several ``upload.GetCdnFile`` requests in flight.
+
+    Chunks are decrypted and verified in the given executor. Each ``upload.GetCdnFileHashes``
+    response usually covers several chunks, so the hashes are cached and requested only for the
+    parts of the file not covered yet, at the same time as the chunks.
+
+    Parameters:
+        sessions (List of :obj:`~hydrogram.session.Session`):
+            The started sessions to the CDN DC.
+
+        session (:obj:`~hydrogram.session.Session`):
+            A started media session to the DC of the file, used to get the hashes of the file and
+            ask for the file to be uploaded to the CDN again.
+
+        redirect (:obj:`~hydrogram.raw.types.upload.FileCdnRedirect`):
+            The redirect to the CDN DC.
+
+        file_size (``int``):
+            The file size in bytes, or 0 if unknown.
+
+        offset (``int``, *optional*):
+            Index of the first chunk. Defaults to 0.
+
+        limit (``int``, *optional*):
+            Maximum amount of chunks. Defaults to 0 (up to the end of the file).
+
+        max_window (``int``, *optional*):
+            Maximum amount of chunks in flight. Defaults to 8.
+
+        executor (:obj:`~concurrent.futures.Executor`, *optional*):
+            Where to decrypt and verify the chunks. Defaults to the event loop default executor.
+    """
+
+    def __init__(
+        self,
+        sessions: list[Session],
+        session: Session,
+        redirect: raw.types.upload.FileCdnRedirect,
+        file_size: int,
+        offset: int = 0,
+        limit: int = 0,
+        max_window: int = 8,
+        executor: Executor | None = None,
+    ):
+        super().__init__(sessions, None, file_size, offset, limit, max_window)
+
+        self.session = session
+        self.redirect = redirect
+        self.executor = executor
+        self.hashes: dict[int, raw.types.FileHash] = {}
+        self.hashes_lock = asyncio.Lock()
+
+        self.add_hashes(redirect.file_hashes)
+
+    def add_hashes(self, hashes: list[raw.types.FileHash]):
+        for h in hashes:
+            self.hashes[h.offset] = h
+
+    async def fetch_hashes(self, offset: int):
+        async with self.hashes_lock:
+            # A previous request may have covered the offset in the meantime
+            if offset in self.hashes:
+                return
+
+            self.add_hashes(
+                await self.session.invoke(
+                    raw.functions.upload.GetCdnFileHashes(
+                        file_token=self.redirect.file_token, offset=offset
+                    )
+                )
+            )
+
+    async def get_hash(self, offset: int) -> raw.types.FileHash:
+        if offset not in self.hashes:
+            await self.fetch_hashes(offset)
+
+        CDNFileHashMismatch.check(offset in self.hashes, "offset in self.hashes")
+
+        return self.hashes[offset]
+
+    def decrypt(self, data: bytes, offset: int, hashes: list[raw.types.FileHash]) -> bytes:
+        # https://core.telegram.org/cdn#decrypting-files
+        chunk = aes.ctr256_decrypt(
+            data,
+            self.redirect.encryption_key,
+            bytearray(self.redirect.encryption_iv[:-4] + (offset // 16).to_bytes(4, "big")),
+        )
+        view = memoryview(chunk)
+        start = 0
+
+        # https://core.telegram.org/cdn#verifying-files
+        for h in hashes:
+            CDNFileHashMismatch.check(
+                h.hash == sha256(view[start : start + h.limit]).digest(),
+                "h.hash == sha256(cdn_chunk).digest()",
+            )
+            start += h.limit
+
+        return chunk
+
+    async def fetch(self, part: int) -> bytes:
+        loop = asyncio.get_running_loop()
+        session = self.sessions[part % len(self.sessions)]
+        offset = part * self.CHUNK_SIZE
+        # Get the hashes of the chunk while it is being downloaded, unless they are cached already
+        prefetch = None
+
+        if offset not in self.hashes:
+            prefetch = loop.create_task(self.fetch_hashes(offset))
+
+        try:
+            while True:
+                start = perf_counter()
+
+                r = await session.invoke(
+                    raw.functions.upload.GetCdnFile(
+                        file_token=self.redirect.file_token, offset=offset, limit=self.CHUNK_SIZE
+                    ),
+                    sleep_threshold=30,
+                )
+
+                if not isinstance(r, raw.types.upload.CdnFileReuploadNeeded):
+                    break
+
+                self.add_hashes(
+                    await self.session.invoke(
+                        raw.functions.upload.ReuploadCdnFile(
+                            file_token=self.redirect.file_token, request_token=r.request_token
+                        )
+                    )
+                )
+
+            self.record(perf_counter() - start)
+        finally:
+            # Failed requests are made again below, when the hashes are actually needed
+            if prefetch is not None:
+                await asyncio.gather(prefetch, return_exceptions=True)
+
+        hashes = []
+        position = offset
+
+        while position < offset + len(r.bytes):
+            h = await self.get_hash(position)
+            CDNFileHashMismatch.check(h.limit > 0, "h.limit > 0")
+            hashes.append(h)
+            position += h.limit
+
+        return await loop.run_in_executor(self.executor, self.decrypt, r.bytes, offset, hashes)
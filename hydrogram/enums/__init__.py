@@ -22,11 +22,13 @@ from .chat_event_action import ChatEventAction
 from .chat_member_status import ChatMemberStatus
 from .chat_members_filter import ChatMembersFilter
 from .chat_type import ChatType
+from .dispatch_mode import DispatchMode
 from .message_entity_type import MessageEntityType
 from .message_media_type import MessageMediaType
 from .message_service_type import MessageServiceType
 from .messages_filter import MessagesFilter
 from .next_code_type import NextCodeType
+from .overflow_policy import OverflowPolicy
 from .parse_mode import ParseMode
 from .poll_type import PollType
 from .sent_code_type import SentCodeType
@@ -38,11 +40,13 @@ __all__ = [
     "ChatMemberStatus",
     "ChatMembersFilter",
     "ChatType",
+    "DispatchMode",
     "MessageEntityType",
     "MessageMediaType",
     "MessageServiceType",
     "MessagesFilter",
     "NextCodeType",
+    "OverflowPolicy",
     "ParseMode",
     "PollType",
     "SentCodeType",
@@ -0,0 +1,31 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-2023 Dan <https://github.com/delivrance>
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+from enum import auto
+
+from .auto_name import AutoName
+
+
+class DispatchMode(AutoName):
+    """Dispatch mode enumeration used to decide how updates are spread among the handler workers"""
+
+    CONCURRENT = auto()
+    "Any worker handles any update, no ordering is guaranteed"
+
+    PER_CHAT = auto()
+    "Updates of the same chat are handled one at a time and in order, different chats in parallel"
@@ -0,0 +1,34 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-2023 Dan <https://github.com/delivrance>
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+from enum import auto
+
+from .auto_name import AutoName
+
+
+class OverflowPolicy(AutoName):
+    """Overflow policy enumeration used to decide what happens when the updates queue is full"""
+
+    BLOCK = auto()
+    "Wait until there's room in the queue, slowing down the receiving of updates"
+
+    DROP_OLDEST = auto()
+    "Drop the oldest queued update to make room for the new one"
+
+    SHED = auto()
+    "Drop the oldest update of the least important kind, which may be the new update itself"
@@ -0,0 +1,371 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import io
+import json
+import mmap
+import os
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from pathlib import Path
+
+    from hydrogram.file_id import FileId
+
+
+def get_fd(fp: BinaryIO, positional: bool) -> int | None:
+    """Get the descriptor of a regular file, if it can be accessed with pread/pwrite."""
+    if not positional or not isinstance(fp, (io.FileIO, io.BufferedIOBase)):
+        return None
+
+    try:
+        return fp.fileno()
+    except (AttributeError, OSError):
+        return None
+
+
+class FileReader:
+    """Read a file in parts without blocking the event loop, keeping the next parts read ahead.
+
+    Regular files are read with ``os.pread`` in the given executor, so that parts are read at the
+    same time without touching the file position. Other file objects are read in the executor one
+    part at a time, except for in-memory ones, which are read directly.
+
+    Regular files can also be memory-mapped, in which case parts are returned as ``memoryview``
+    slices of the mapping, without copying them, and reading ahead only asks the kernel to load the
+    next parts in the background. Only map files that won't be truncated while being read.
+
+    Parameters:
+        fp (``BinaryIO``):
+            The file to read.
+
+        part_size (``int``):
+            Size of each part in bytes.
+
+        offset (``int``, *optional*):
+            Where to start reading from. Defaults to 0.
+
+        read_ahead (``int``, *optional*):
+            Amount of parts read in advance. Defaults to 2.
+
+        executor (:obj:`~concurrent.futures.Executor`, *optional*):
+            Where to run the reads. Defaults to the event loop default executor.
+
+        use_mmap (``bool``, *optional*):
+            Memory-map regular files, where possible. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        fp: BinaryIO,
+        part_size: int,
+        offset: int = 0,
+        read_ahead: int = 2,
+        executor: Executor | None = None,
+        use_mmap: bool = False,
+    ):
+        self.fp = fp
+        self.part_size = part_size
+        self.offset = offset
+        self.read_ahead = read_ahead
+        self.executor = executor
+        self.fd = get_fd(fp, hasattr(os, "pread"))
+        self.lock = threading.Lock()
+        self.pending: deque[asyncio.Future] = deque()
+        self.map: mmap.mmap | None = None
+        self.view: memoryview | None = None
+        # End of the parts the kernel was already asked to load
+        self.advised = offset
+
+        if use_mmap:
+            fd = get_fd(fp, True)
+
+            # Empty files and special ones (e.g.: pipes) can't be mapped
+            with contextlib.suppress(OSError, ValueError):
+                if fd is not None:
+                    self.map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+                    self.view = memoryview(self.map)
+
+    def read_at(self, offset: int) -> bytes:
+        if self.fd is not None:
+            return os.pread(self.fd, self.part_size, offset)
+
+        with self.lock:
+            self.fp.seek(offset)
+            return self.fp.read(self.part_size)
+
+    def advise(self, offset: int, length: int):
+        with contextlib.suppress(OSError, ValueError):
+            self.map.madvise(mmap.MADV_WILLNEED, offset, length)
+
+    def read_view(self) -> memoryview:
+        start = min(self.offset, len(self.view))
+        end = min(start + self.part_size, len(self.view))
+        self.offset = end
+
+        # Let the kernel load the next parts while the current ones are being sent
+        ahead = min(end + self.part_size * self.read_ahead, len(self.view))
+
+        if hasattr(mmap, "MADV_WILLNEED") and ahead > self.advised:
+            start_page = max(self.advised, end) // mmap.PAGESIZE * mmap.PAGESIZE
+            self.pending.append(
+                asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.advise, start_page, ahead - start_page
+                )
+            )
+            self.advised = ahead
+
+            while self.pending and self.pending[0].done():
+                self.pending.popleft()
+
+        return self.view[start:end]
+
+    async def read(self) -> bytes | memoryview:
+        """Read the next part, or an empty bytes object at the end of the file."""
+        if self.view is not None:
+            return self.read_view()
+
+        if isinstance(self.fp, io.BytesIO):
+            self.offset += self.part_size
+            return self.read_at(self.offset - self.part_size)
+
+        loop = asyncio.get_running_loop()
+
+        while len(self.pending) <= self.read_ahead:
+            self.pending.append(loop.run_in_executor(self.executor, self.read_at, self.offset))
+            self.offset += self.part_size
+
+        return await self.pending.popleft()
+
+    async def close(self):
+        """Wait for the parts still being read, so that the file can be closed."""
+        await asyncio.gather(*self.pending, return_exceptions=True)
+        self.pending.clear()
+
+        if self.map is not None:
+            # Parts still referenced elsewhere keep the mapping alive until they are collected
+            with contextlib.suppress(BufferError):
+                self.view.release()
+                self.map.close()
+
+
+class FileWriter:
+    """Write a file without blocking the event loop, letting writes complete in the background.
+
+    Regular files are written with ``os.pwrite`` at the given offsets in the given executor, so
+    chunks can be written at the same time and in any order. Other file objects are written in the
+    executor one chunk at a time, except for in-memory ones, which are written directly.
+
+    Parameters:
+        fp (``BinaryIO``):
+            The file to write.
+
+        write_behind (``int``, *optional*):
+            Amount of writes that can be still in progress when :meth:`write` returns.
+            Defaults to 4.
+
+        executor (:obj:`~concurrent.futures.Executor`, *optional*):
+            Where to run the writes. Defaults to the event loop default executor.
+    """
+
+    def __init__(self, fp: BinaryIO, write_behind: int = 4, executor: Executor | None = None):
+        self.fp = fp
+        self.write_behind = write_behind
+        self.executor = executor
+        self.fd = get_fd(fp, hasattr(os, "pwrite"))
+        self.lock = threading.Lock()
+        self.pending: deque[asyncio.Future] = deque()
+
+    def write_at(self, data: bytes, offset: int):
+        if self.fd is None:
+            with self.lock:
+                self.fp.seek(offset)
+                self.fp.write(data)
+            return
+
+        view = memoryview(data)
+
+        while view:
+            written = os.pwrite(self.fd, view, offset)
+            view = view[written:]
+            offset += written
+
+    async def write(self, data: bytes, offset: int):
+        """Write a chunk at the given offset, waiting only if too many writes are in progress."""
+        if isinstance(self.fp, io.BytesIO):
+            self.write_at(data, offset)
+            return
+
+        loop = asyncio.get_running_loop()
+        self.pending.append(loop.run_in_executor(self.executor, self.write_at, data, offset))
+
+        while len(self.pending) > self.write_behind:
+            await self.pending.popleft()
+
+    async def allocate(self, size: int):
+        """Reserve the disk space for the whole file, where supported."""
+        if self.fd is None or not hasattr(os, "posix_fallocate") or size <= 0:
+            return
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, os.posix_fallocate, self.fd, 0, size)
+
+    async def flush(self):
+        """Wait for every write in progress, raising the first error if any failed."""
+        try:
+            for future in self.pending:
+                await future
+        finally:
+            await asyncio.gather(*self.pending, return_exceptions=True)
+            self.pending.clear()
+
+
+class DownloadJournal:
+    """A small file next to a resumable download, recording which parts of it are complete.
+
+    The journal also identifies the file being downloaded, so that a download is only resumed
+    when the same file is downloaded again to the same path.
+
+    Parameters:
+        path (``Path``):
+            Where to keep the journal.
+
+        executor (:obj:`~concurrent.futures.Executor`, *optional*):
+            Where to run the file operations. Defaults to the event loop default executor.
+    """
+
+    # Amount of bytes written between two journal updates
+    INTERVAL = 8 * 1024 * 1024
+
+    def __init__(self, path: Path, executor: Executor | None = None):
+        self.path = path
+        self.executor = executor
+        self.saved = 0
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def load(self, media_id: int, file_size: int) -> int:
+        """Get the amount of bytes already downloaded from the start of the file, if any."""
+        try:
+            state = json.loads(await self.run(self.path.read_text))
+        except (OSError, ValueError):
+            return 0
+
+        if state.get("media_id") != media_id or state.get("file_size") != file_size:
+            return 0
+
+        self.saved = next((end for start, end in state.get("ranges", []) if start == 0), 0)
+
+        return self.saved
+
+    async def save(self, file_id: FileId, file_size: int, done: int):
+        """Record that the first *done* bytes of the file are written."""
+        state = {
+            "file_id": file_id.encode(),
+            "media_id": file_id.media_id,
+            "file_reference": file_id.file_reference.hex(),
+            "file_size": file_size,
+            "ranges": [[0, done]],
+        }
+        temp_path = self.path.with_name(self.path.name + ".temp")
+
+        # Replace the journal atomically, so that a crash never leaves it half written
+        await self.run(temp_path.write_text, json.dumps(state))
+        await self.run(os.replace, temp_path, self.path)
+
+        self.saved = done
+
+    async def remove(self):
+        with contextlib.suppress(FileNotFoundError):
+            await self.run(self.path.unlink)
+
+
+class UploadManifest:
+    """A small file next to a file being uploaded, recording which of its parts were saved.
+
+    The manifest also identifies the file by size and modification time, so that an upload is
+    only resumed when the file didn't change in the meantime.
+
+    Parameters:
+        path (``Path``):
+            Where to keep the manifest.
+
+        executor (:obj:`~concurrent.futures.Executor`, *optional*):
+            Where to run the file operations. Defaults to the event loop default executor.
+    """
+
+    # Amount of parts acknowledged between two manifest updates
+    INTERVAL = 16
+
+    def __init__(self, path: Path, executor: Executor | None = None):
+        self.path = path
+        self.executor = executor
+        self.saved = 0
+        # Parts are acknowledged while the manifest is being saved, which can start another save
+        self.lock = asyncio.Lock()
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def load(self, file_path: Path, part_size: int) -> tuple[int, list[int]] | None:
+        """Get the file id and the parts already saved of an interrupted upload, if any."""
+        try:
+            state = json.loads(await self.run(self.path.read_text))
+            stat = await self.run(file_path.stat)
+        except (OSError, ValueError):
+            return None
+
+        if (
+            state.get("path") != str(file_path)
+            or state.get("size") != stat.st_size
+            or state.get("mtime") != stat.st_mtime_ns
+            or state.get("part_size") != part_size
+        ):
+            return None
+
+        return state["file_id"], state["done"]
+
+    async def save(self, file_path: Path, part_size: int, file_id: int, done: set[int]):
+        """Record the parts of the file saved so far."""
+        async with self.lock:
+            self.saved = len(done)
+            stat = await self.run(file_path.stat)
+            state = {
+                "path": str(file_path),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "part_size": part_size,
+                "file_id": file_id,
+                "done": sorted(done),
+            }
+            temp_path = self.path.with_name(self.path.name + ".temp")
+
+            await self.run(temp_path.write_text, json.dumps(state))
+            await self.run(os.replace, temp_path, self.path)
+
+    async def remove(self):
+        with contextlib.suppress(FileNotFoundError):
+            await self.run(self.path.unlink)
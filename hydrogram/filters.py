@@ -19,6 +19,7 @@
 
 from __future__ import annotations
 
+import contextlib
 import inspect
 import re
 from re import Pattern
@@ -37,9 +38,38 @@ from hydrogram.types import (
 
 
 class Filter:
+    blocking = False
+    """Whether the filter is a synchronous function that blocks (e.g.: file or database access) and
+    therefore has to run in the client internal executor. Non-blocking synchronous filters run
+    inline."""
+
+    cost = None
+    """How expensive the filter is compared to the others it's combined with, cheaper filters are
+    checked first. Defaults to 0 for synchronous, 2 for asynchronous and 3 for blocking filters."""
+
+    pure = False
+    """Whether the filter only reads the update and doesn't depend on what other filters store in
+    it (e.g.: the ``command`` attribute set by the command filter). Only pure filters are moved
+    around by :attr:`cost`, the others are checked in the order they are written."""
+
+    route = None
+    """The kind of static key the dispatcher can index handlers by ("command", "regex", "user" or
+    "chat"), for the built-in filters that have one."""
+
+    version = 0
+    """Counts the changes to the filters the dispatcher indexes handlers by, which make its indexes
+    stale: replacing an attribute of one of them or of a combination of filters, changing a
+    :class:`TrackedSet` or replacing the filters of a handler."""
+
     async def __call__(self, client: hydrogram.Client, update: Update):
         raise NotImplementedError
 
+    def __setattr__(self, name, value):
+        if (self.route is not None or type(self) in {AndFilter, OrFilter}) and hasattr(self, name):
+            Filter.version += 1
+
+        super().__setattr__(name, value)
+
     def __invert__(self):
         return InvertFilter(self)
 
@@ -50,15 +80,23 @@ class Filter:
         return OrFilter(self, other)
 
 
+async def evaluate(flt: Filter, client: hydrogram.Client, update: Update) -> bool:
+    """Run a filter, be it asynchronous, synchronous or synchronous and blocking."""
+    if inspect.iscoroutinefunction(flt.__call__):
+        return await flt(client, update)
+
+    if getattr(flt, "blocking", False):
+        return await client.loop.run_in_executor(client.internal_executor, flt, client, update)
+
+    return flt(client, update)
+
+
 class InvertFilter(Filter):
     def __init__(self, base):
         self.base = base
 
     async def __call__(self, client: hydrogram.Client, update: Update):
-        if inspect.iscoroutinefunction(self.base.__call__):
-            x = await self.base(client, update)
-        else:
-            x = await client.loop.run_in_executor(client.executor, self.base, client, update)
+        x = await evaluate(self.base, client, update)
 
         return not x
 
@@ -69,19 +107,13 @@ class AndFilter(Filter):
         self.other = other
 
     async def __call__(self, client: hydrogram.Client, update: Update):
-        if inspect.iscoroutinefunction(self.base.__call__):
-            x = await self.base(client, update)
-        else:
-            x = await client.loop.run_in_executor(client.executor, self.base, client, update)
+        x = await evaluate(self.base, client, update)
 
         # short circuit
         if not x:
             return False
 
-        if inspect.iscoroutinefunction(self.other.__call__):
-            y = await self.other(client, update)
-        else:
-            y = await client.loop.run_in_executor(client.executor, self.other, client, update)
+        y = await evaluate(self.other, client, update)
 
         return x and y
 
@@ -92,23 +124,139 @@ class OrFilter(Filter):
         self.other = other
 
     async def __call__(self, client: hydrogram.Client, update: Update):
-        if inspect.iscoroutinefunction(self.base.__call__):
-            x = await self.base(client, update)
-        else:
-            x = await client.loop.run_in_executor(client.executor, self.base, client, update)
+        x = await evaluate(self.base, client, update)
 
         # short circuit
         if x:
             return True
 
-        if inspect.iscoroutinefunction(self.other.__call__):
-            y = await self.other(client, update)
-        else:
-            y = await client.loop.run_in_executor(client.executor, self.other, client, update)
+        y = await evaluate(self.other, client, update)
 
         return x or y
 
 
+class CompiledFilter:
+    """A filter tree flattened into a single function, see :func:`compile_filter`."""
+
+    __slots__ = ("cost", "func", "is_async", "pure", "source")
+
+    def __init__(self, source, func: Callable, is_async: bool, cost: int, pure: bool = False):
+        self.source = source
+        self.func = func
+        self.is_async = is_async
+        self.cost = cost
+        self.pure = pure
+
+    async def __call__(self, client: hydrogram.Client, update: Update) -> bool:
+        result = self.func(client, update)
+        return bool(await result if self.is_async else result)
+
+
+def _compile_leaf(flt) -> CompiledFilter:
+    cost = getattr(flt, "cost", None)
+    pure = getattr(flt, "pure", False)
+
+    if inspect.iscoroutinefunction(flt.__call__):
+        return CompiledFilter(flt, flt.__call__, True, 2 if cost is None else cost, pure)
+
+    if getattr(flt, "blocking", False):
+
+        async def run_in_executor(client: hydrogram.Client, update: Update):
+            return await client.loop.run_in_executor(client.internal_executor, flt, client, update)
+
+        return CompiledFilter(flt, run_in_executor, True, 3 if cost is None else cost, pure)
+
+    return CompiledFilter(flt, flt.__call__, False, 0 if cost is None else cost, pure)
+
+
+def _compile_chain(flt, operands: list[CompiledFilter], stop_on: bool) -> CompiledFilter:
+    # Cheap operands first, the result of a chain of "and"/"or" doesn't depend on the order. Other
+    # filters may store something the ones written after them read, so they stay where they are.
+    ordered, run = [], []
+
+    for operand in operands:
+        if operand.pure:
+            run.append(operand)
+        else:
+            ordered += sorted(run, key=lambda operand: operand.cost)
+            ordered.append(operand)
+            run = []
+
+    operands = ordered + sorted(run, key=lambda operand: operand.cost)
+    cost = max(operand.cost for operand in operands)
+    pure = not any(not operand.pure for operand in operands)
+
+    if not any(operand.is_async for operand in operands):
+        funcs = tuple(operand.func for operand in operands)
+
+        def run_sync(client: hydrogram.Client, update: Update):
+            for func in funcs:
+                if bool(func(client, update)) is stop_on:
+                    return stop_on
+
+            return not stop_on
+
+        return CompiledFilter(flt, run_sync, False, cost, pure)
+
+    steps = tuple((operand.func, operand.is_async) for operand in operands)
+
+    async def run_async(client: hydrogram.Client, update: Update):
+        for func, is_async in steps:
+            result = func(client, update)
+
+            if is_async:
+                result = await result
+
+            if bool(result) is stop_on:
+                return stop_on
+
+        return not stop_on
+
+    return CompiledFilter(flt, run_async, True, cost, pure)
+
+
+def _flatten(flt, kind: type[Filter]) -> list:
+    if type(flt) is not kind:
+        return [flt]
+
+    return _flatten(flt.base, kind) + _flatten(flt.other, kind)
+
+
+def compile_filter(flt) -> CompiledFilter:
+    """Flatten a filter tree into a single function.
+
+    Chains of ``&`` and ``|`` are merged and their :attr:`~Filter.pure` operands are sorted by
+    :attr:`Filter.cost`, so that cheap attribute checks run before asynchronous and blocking
+    filters. Whether a filter is asynchronous or blocking is resolved once here, and a tree made
+    only of synchronous filters is evaluated without creating any coroutine.
+
+    Parameters:
+        flt (:obj:`Filter`):
+            The filter to compile.
+    """
+    if type(flt) is InvertFilter:
+        base = compile_filter(flt.base)
+        func = base.func
+
+        if base.is_async:
+
+            async def invert(client: hydrogram.Client, update: Update):
+                return not await func(client, update)
+
+        else:
+
+            def invert(client: hydrogram.Client, update: Update):
+                return not func(client, update)
+
+        return CompiledFilter(flt, invert, base.is_async, base.cost, base.pure)
+
+    if type(flt) in {AndFilter, OrFilter}:
+        operands = [compile_filter(operand) for operand in _flatten(flt, type(flt))]
+        return _compile_chain(flt, operands, type(flt) is OrFilter)
+
+    return _compile_leaf(flt)
+
+
 CUSTOM_FILTER_NAME = "CustomFilter"
 
 
@@ -134,6 +282,11 @@ def create(func: Callable, name: str | None = None, **kwargs) -> Filter:
         **kwargs (``any``, *optional*):
             Any keyword argument you would like to pass. Useful when creating parameterized custom filters, such as
             :meth:`~hydrogram.filters.command` or :meth:`~hydrogram.filters.regex`.
+            Pass *blocking=True* if *func* is a synchronous function that blocks (e.g.: it does
+            file or database access), so that it runs in the client internal executor instead of
+            the event loop.
+            Pass *cost* to tell how expensive the filter is, see :attr:`Filter.cost`, and
+            *pure=True* if it only reads the update, see :attr:`Filter.pure`.
     """
     return type(
         name or func.__name__ or CUSTOM_FILTER_NAME,
@@ -147,7 +300,7 @@ def all_filter(_, __, ___):
     return True
 
 
-all = create(all_filter)
+all = create(all_filter, pure=True)
 """Filter all messages."""
 
 
@@ -159,7 +312,7 @@ def me_filter(_, __, m: Message):
     return bool(m.from_user.is_self if m.from_user else getattr(m, "outgoing", False))
 
 
-me = create(me_filter)
+me = create(me_filter, pure=True)
 """Filter messages generated by you yourself."""
 
 
@@ -171,7 +324,7 @@ def bot_filter(_, __, m: Message):
     return bool(m.from_user and m.from_user.is_bot)
 
 
-bot = create(bot_filter)
+bot = create(bot_filter, pure=True)
 """Filter messages coming from bots."""
 
 
@@ -183,7 +336,7 @@ def incoming_filter(_, __, m: Message):
     return not m.outgoing
 
 
-incoming = create(incoming_filter)
+incoming = create(incoming_filter, pure=True)
 """Filter incoming messages. Messages sent to your own chat (Saved Messages) are also recognised as incoming."""
 
 
@@ -195,7 +348,7 @@ def outgoing_filter(_, __, m: Message):
     return m.outgoing
 
 
-outgoing = create(outgoing_filter)
+outgoing = create(outgoing_filter, pure=True)
 """Filter outgoing messages. Messages sent to your own chat (Saved Messages) are not recognized as outgoing."""
 
 
@@ -207,7 +360,7 @@ def text_filter(_, __, m: Message):
     return bool(m.text)
 
 
-text = create(text_filter)
+text = create(text_filter, pure=True)
 """Filter text messages."""
 
 
@@ -219,7 +372,7 @@ def reply_filter(_, __, m: Message):
     return bool(m.reply_to_message_id)
 
 
-reply = create(reply_filter)
+reply = create(reply_filter, pure=True)
 """Filter messages that are replies to other messages."""
 
 
@@ -231,7 +384,7 @@ def forwarded_filter(_, __, m: Message):
     return bool(m.forward_date)
 
 
-forwarded = create(forwarded_filter)
+forwarded = create(forwarded_filter, pure=True)
 """Filter messages that are forwarded."""
 
 
@@ -243,7 +396,7 @@ def caption_filter(_, __, m: Message):
     return bool(m.caption)
 
 
-caption = create(caption_filter)
+caption = create(caption_filter, pure=True)
 """Filter media messages that contain captions."""
 
 
@@ -255,7 +408,7 @@ def audio_filter(_, __, m: Message):
     return bool(m.audio)
 
 
-audio = create(audio_filter)
+audio = create(audio_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Audio` objects."""
 
 
@@ -267,7 +420,7 @@ def document_filter(_, __, m: Message):
     return bool(m.document)
 
 
-document = create(document_filter)
+document = create(document_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Document` objects."""
 
 
@@ -279,7 +432,7 @@ def photo_filter(_, __, m: Message):
     return bool(m.photo)
 
 
-photo = create(photo_filter)
+photo = create(photo_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Photo` objects."""
 
 
@@ -291,7 +444,7 @@ def sticker_filter(_, __, m: Message):
     return bool(m.sticker)
 
 
-sticker = create(sticker_filter)
+sticker = create(sticker_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Sticker` objects."""
 
 
@@ -303,7 +456,7 @@ def animation_filter(_, __, m: Message):
     return bool(m.animation)
 
 
-animation = create(animation_filter)
+animation = create(animation_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Animation` objects."""
 
 
@@ -315,7 +468,7 @@ def game_filter(_, __, m: Message):
     return bool(m.game)
 
 
-game = create(game_filter)
+game = create(game_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Game` objects."""
 
 
@@ -327,7 +480,7 @@ def video_filter(_, __, m: Message):
     return bool(m.video)
 
 
-video = create(video_filter)
+video = create(video_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Video` objects."""
 
 
@@ -339,7 +492,7 @@ def media_group_filter(_, __, m: Message):
     return bool(m.media_group_id)
 
 
-media_group = create(media_group_filter)
+media_group = create(media_group_filter, pure=True)
 """Filter messages containing photos or videos being part of an album."""
 
 
@@ -351,7 +504,7 @@ def voice_filter(_, __, m: Message):
     return bool(m.voice)
 
 
-voice = create(voice_filter)
+voice = create(voice_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Voice` note objects."""
 
 
@@ -363,7 +516,7 @@ def video_note_filter(_, __, m: Message):
     return bool(m.video_note)
 
 
-video_note = create(video_note_filter)
+video_note = create(video_note_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.VideoNote` objects."""
 
 
@@ -375,7 +528,7 @@ def contact_filter(_, __, m: Message):
     return bool(m.contact)
 
 
-contact = create(contact_filter)
+contact = create(contact_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Contact` objects."""
 
 
@@ -387,7 +540,7 @@ def location_filter(_, __, m: Message):
     return bool(m.location)
 
 
-location = create(location_filter)
+location = create(location_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Location` objects."""
 
 
@@ -399,7 +552,7 @@ def venue_filter(_, __, m: Message):
     return bool(m.venue)
 
 
-venue = create(venue_filter)
+venue = create(venue_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Venue` objects."""
 
 
@@ -411,7 +564,7 @@ def web_page_filter(_, __, m: Message):
     return bool(m.web_page)
 
 
-web_page = create(web_page_filter)
+web_page = create(web_page_filter, pure=True)
 """Filter messages sent with a webpage preview."""
 
 
@@ -423,7 +576,7 @@ def poll_filter(_, __, m: Message):
     return bool(m.poll)
 
 
-poll = create(poll_filter)
+poll = create(poll_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Poll` objects."""
 
 
@@ -435,7 +588,7 @@ def dice_filter(_, __, m: Message):
     return bool(m.dice)
 
 
-dice = create(dice_filter)
+dice = create(dice_filter, pure=True)
 """Filter messages that contain :obj:`~hydrogram.types.Dice` objects."""
 
 
@@ -447,7 +600,7 @@ def media_spoiler_filter(_, __, m: Message):
     return bool(m.has_media_spoiler)
 
 
-media_spoiler = create(media_spoiler_filter)
+media_spoiler = create(media_spoiler_filter, pure=True)
 """Filter media messages that contain a spoiler."""
 
 
@@ -465,7 +618,7 @@ def private_filter(_, __, m: CallbackQuery | Message):
     return bool(value and value.type in {enums.ChatType.PRIVATE, enums.ChatType.BOT})
 
 
-private = create(private_filter)
+private = create(private_filter, pure=True)
 """Filter messages sent in private chats."""
 
 
@@ -483,7 +636,7 @@ def group_filter(_, __, m: CallbackQuery | Message):
     return bool(value and value.type in {enums.ChatType.GROUP, enums.ChatType.SUPERGROUP})
 
 
-group = create(group_filter)
+group = create(group_filter, pure=True)
 """Filter messages sent in group or supergroup chats."""
 
 
@@ -501,7 +654,7 @@ def channel_filter(_, __, m: CallbackQuery | Message):
     return bool(value and value.type == enums.ChatType.CHANNEL)
 
 
-channel = create(channel_filter)
+channel = create(channel_filter, pure=True)
 """Filter messages sent in channels."""
 
 
@@ -513,7 +666,7 @@ def new_chat_members_filter(_, __, m: Message):
     return bool(m.new_chat_members)
 
 
-new_chat_members = create(new_chat_members_filter)
+new_chat_members = create(new_chat_members_filter, pure=True)
 """Filter service messages for new chat members."""
 
 
@@ -525,7 +678,7 @@ def left_chat_member_filter(_, __, m: Message):
     return bool(m.left_chat_member)
 
 
-left_chat_member = create(left_chat_member_filter)
+left_chat_member = create(left_chat_member_filter, pure=True)
 """Filter service messages for members that left the chat."""
 
 
@@ -537,7 +690,7 @@ def new_chat_title_filter(_, __, m: Message):
     return bool(m.new_chat_title)
 
 
-new_chat_title = create(new_chat_title_filter)
+new_chat_title = create(new_chat_title_filter, pure=True)
 """Filter service messages for new chat titles."""
 
 
@@ -549,7 +702,7 @@ def new_chat_photo_filter(_, __, m: Message):
     return bool(m.new_chat_photo)
 
 
-new_chat_photo = create(new_chat_photo_filter)
+new_chat_photo = create(new_chat_photo_filter, pure=True)
 """Filter service messages for new chat photos."""
 
 
@@ -561,7 +714,7 @@ def delete_chat_photo_filter(_, __, m: Message):
     return bool(m.delete_chat_photo)
 
 
-delete_chat_photo = create(delete_chat_photo_filter)
+delete_chat_photo = create(delete_chat_photo_filter, pure=True)
 """Filter service messages for deleted photos."""
 
 
@@ -573,7 +726,7 @@ def group_chat_created_filter(_, __, m: Message):
     return bool(m.group_chat_created)
 
 
-group_chat_created = create(group_chat_created_filter)
+group_chat_created = create(group_chat_created_filter, pure=True)
 """Filter service messages for group chat creations."""
 
 
@@ -585,7 +738,7 @@ def supergroup_chat_created_filter(_, __, m: Message):
     return bool(m.supergroup_chat_created)
 
 
-supergroup_chat_created = create(supergroup_chat_created_filter)
+supergroup_chat_created = create(supergroup_chat_created_filter, pure=True)
 """Filter service messages for supergroup chat creations."""
 
 
@@ -597,7 +750,7 @@ def channel_chat_created_filter(_, __, m: Message):
     return bool(m.channel_chat_created)
 
 
-channel_chat_created = create(channel_chat_created_filter)
+channel_chat_created = create(channel_chat_created_filter, pure=True)
 """Filter service messages for channel chat creations."""
 
 
@@ -609,7 +762,7 @@ def migrate_to_chat_id_filter(_, __, m: Message):
     return bool(m.migrate_to_chat_id)
 
 
-migrate_to_chat_id = create(migrate_to_chat_id_filter)
+migrate_to_chat_id = create(migrate_to_chat_id_filter, pure=True)
 """Filter service messages that contain migrate_to_chat_id."""
 
 
@@ -621,7 +774,7 @@ def migrate_from_chat_id_filter(_, __, m: Message):
     return bool(m.migrate_from_chat_id)
 
 
-migrate_from_chat_id = create(migrate_from_chat_id_filter)
+migrate_from_chat_id = create(migrate_from_chat_id_filter, pure=True)
 """Filter service messages that contain migrate_from_chat_id."""
 
 
@@ -633,7 +786,7 @@ def pinned_message_filter(_, __, m: Message):
     return bool(m.pinned_message)
 
 
-pinned_message = create(pinned_message_filter)
+pinned_message = create(pinned_message_filter, pure=True)
 """Filter service messages for pinned messages."""
 
 
@@ -645,7 +798,7 @@ def game_high_score_filter(_, __, m: Message):
     return bool(m.game_high_score)
 
 
-game_high_score = create(game_high_score_filter)
+game_high_score = create(game_high_score_filter, pure=True)
 """Filter service messages for game high scores."""
 
 
@@ -657,7 +810,7 @@ def reply_keyboard_filter(_, __, m: Message):
     return isinstance(m.reply_markup, ReplyKeyboardMarkup)
 
 
-reply_keyboard = create(reply_keyboard_filter)
+reply_keyboard = create(reply_keyboard_filter, pure=True)
 """Filter messages containing reply keyboard markups"""
 
 
@@ -669,7 +822,7 @@ def inline_keyboard_filter(_, __, m: Message):
     return isinstance(m.reply_markup, InlineKeyboardMarkup)
 
 
-inline_keyboard = create(inline_keyboard_filter)
+inline_keyboard = create(inline_keyboard_filter, pure=True)
 """Filter messages containing inline keyboard markups"""
 
 
@@ -681,7 +834,7 @@ def mentioned_filter(_, __, m: Message):
     return bool(m.mentioned)
 
 
-mentioned = create(mentioned_filter)
+mentioned = create(mentioned_filter, pure=True)
 """Filter messages containing mentions"""
 
 
@@ -693,7 +846,7 @@ def via_bot_filter(_, __, m: Message):
     return bool(m.via_bot)
 
 
-via_bot = create(via_bot_filter)
+via_bot = create(via_bot_filter, pure=True)
 """Filter messages sent via inline bots"""
 
 
@@ -705,7 +858,7 @@ def video_chat_started_filter(_, __, m: Message):
     return bool(m.video_chat_started)
 
 
-video_chat_started = create(video_chat_started_filter)
+video_chat_started = create(video_chat_started_filter, pure=True)
 """Filter messages for started video chats"""
 
 
@@ -717,7 +870,7 @@ def video_chat_ended_filter(_, __, m: Message):
     return bool(m.video_chat_ended)
 
 
-video_chat_ended = create(video_chat_ended_filter)
+video_chat_ended = create(video_chat_ended_filter, pure=True)
 """Filter messages for ended video chats"""
 
 
@@ -729,7 +882,7 @@ def video_chat_members_invited_filter(_, __, m: Message):
     return bool(m.video_chat_members_invited)
 
 
-video_chat_members_invited = create(video_chat_members_invited_filter)
+video_chat_members_invited = create(video_chat_members_invited_filter, pure=True)
 """Filter messages for voice chat invited members"""
 
 
@@ -741,7 +894,7 @@ def service_filter(_, __, m: Message):
     return bool(m.service)
 
 
-service = create(service_filter)
+service = create(service_filter, pure=True)
 """Filter service messages.
 
 A service message contains any of the following fields set: *left_chat_member*,
@@ -759,7 +912,7 @@ def media_filter(_, __, m: Message):
     return bool(m.media)
 
 
-media = create(media_filter)
+media = create(media_filter, pure=True)
 """Filter media messages.
 
 A media message contains any of the following fields set: *audio*, *document*, *photo*, *sticker*, *video*,
@@ -775,7 +928,7 @@ def scheduled_filter(_, __, m: Message):
     return bool(m.scheduled)
 
 
-scheduled = create(scheduled_filter)
+scheduled = create(scheduled_filter, pure=True)
 """Filter messages that have been scheduled (not yet sent)."""
 
 
@@ -787,7 +940,7 @@ def from_scheduled_filter(_, __, m: Message):
     return bool(m.from_scheduled)
 
 
-from_scheduled = create(from_scheduled_filter)
+from_scheduled = create(from_scheduled_filter, pure=True)
 """Filter new automatically sent messages that were previously scheduled."""
 
 
@@ -799,7 +952,7 @@ def linked_channel_filter(_, __, m: Message):
     return bool(m.forward_from_chat and not m.from_user)
 
 
-linked_channel = create(linked_channel_filter)
+linked_channel = create(linked_channel_filter, pure=True)
 """Filter messages that are automatically forwarded from the linked channel to the group chat."""
 
 
@@ -807,6 +960,44 @@ linked_channel = create(linked_channel_filter)
 
 
 # region command_filter
+# The leading token of a text (command name and optional @username) and the arguments after it
+COMMAND_TOKEN_RE = re.compile(r"(\S*)\s?(.*)", re.DOTALL)
+# Arguments: group(2) is the text between quotes, group(3) is unquoted, whitespace-split text
+COMMAND_ARGS_RE = re.compile(r"([\"'])(.*?)(?<!\\)\1|(\S+)")
+COMMAND_UNESCAPE_RE = re.compile(r"\\([\"'])")
+# Commands that are plain words, the others are matched as regular expressions
+PLAIN_COMMAND_RE = re.compile(r"[^\s\\.^$*+?{}\[\]|()@]+")
+
+
+def split_command(message: Message, text: str, prefix: str) -> tuple[str, str]:
+    """Split a text starting with a prefix into its leading token and the arguments text.
+
+    The result is cached in the message, so that the text is split only once no matter how many
+    command filters check it.
+    """
+    cache = getattr(message, "_command_tokens", None)
+
+    if cache is None or cache[0] is not text:
+        cache = (text, {})
+
+        with contextlib.suppress(AttributeError):
+            message._command_tokens = cache
+
+    tokens = cache[1]
+
+    if prefix not in tokens:
+        tokens[prefix] = COMMAND_TOKEN_RE.match(text, len(prefix)).groups()
+
+    return tokens[prefix]
+
+
+def parse_command_args(text: str) -> list[str]:
+    return [
+        COMMAND_UNESCAPE_RE.sub(r"\1", m.group(2) or m.group(3) or "")
+        for m in COMMAND_ARGS_RE.finditer(text)
+    ]
+
+
 def command(
     commands: str | list[str],
     prefixes: str | list[str] = "/",
@@ -830,7 +1021,24 @@ def command(
             Pass True if you want your command(s) to be case sensitive. Defaults to False.
             Examples: when True, command="Start" would trigger /Start but not /start.
     """
-    command_re = re.compile(r"([\"'])(.*?)(?<!\\)\1|(\S+)")
+
+    def match_pattern(flt, username: str, text: str) -> tuple[str, str] | None:
+        for cmd in flt.patterns:
+            key = (cmd, username)
+
+            if key not in flt.compiled_patterns:
+                flags = 0 if flt.case_sensitive else re.IGNORECASE
+                flt.compiled_patterns[key] = (
+                    re.compile(rf"^(?:{cmd}(?:@?{username})?)(?:\s|$)", flags),
+                    re.compile(rf"{cmd}(?:@?{username})?\s?", flags),
+                )
+
+            match_re, sub_re = flt.compiled_patterns[key]
+
+            if match_re.match(text):
+                return cmd, sub_re.sub("", text, count=1)
+
+        return None
 
     def func(flt, client: hydrogram.Client, message: Message):
         username = client.me.username or ""
@@ -840,39 +1048,36 @@ def command(
         if not text:
             return False
 
+        if not flt.case_sensitive:
+            username = username.lower()
+
         for prefix in flt.prefixes:
             if not text.startswith(prefix):
                 continue
 
-            without_prefix = text[len(prefix) :]
-
-            for cmd in flt.commands:
-                if not re.match(
-                    rf"^(?:{cmd}(?:@?{username})?)(?:\s|$)",
-                    without_prefix,
-                    flags=0 if flt.case_sensitive else re.IGNORECASE,
-                ):
-                    continue
-
-                without_command = re.sub(
-                    rf"{cmd}(?:@?{username})?\s?",
-                    "",
-                    without_prefix,
-                    count=1,
-                    flags=0 if flt.case_sensitive else re.IGNORECASE,
-                )
+            token, args = split_command(message, text, prefix)
+
+            if not flt.case_sensitive:
+                token = token.lower()
 
-                # match.groups are 1-indexed, group(1) is the quote, group(2) is the text
-                # between the quotes, group(3) is unquoted, whitespace-split text
+            name, at, bot = token.partition("@")
 
-                # Remove the escape character from the arguments
-                message.command = [cmd] + [
-                    re.sub(r"\\([\"'])", r"\1", m.group(2) or m.group(3) or "")
-                    for m in command_re.finditer(without_command)
-                ]
+            if at and bot != username:
+                name = None
+            elif not at and name not in flt.commands and username and name.endswith(username):
+                name = name[: -len(username)]
 
+            if name in flt.commands:
+                message.command = [name, *parse_command_args(args)]
                 return True
 
+            if flt.patterns:
+                matched = match_pattern(flt, username, text[len(prefix) :])
+
+                if matched is not None:
+                    message.command = [matched[0], *parse_command_args(matched[1])]
+                    return True
+
         return False
 
     commands = commands if isinstance(commands, list) else [commands]
@@ -880,12 +1085,16 @@ def command(
 
     prefixes = [] if prefixes is None else prefixes
     prefixes = prefixes if isinstance(prefixes, list) else [prefixes]
-    prefixes = set(prefixes) if prefixes else {""}
+    prefixes = TrackedSet(prefixes) if prefixes else TrackedSet({""})
 
     return create(
         func,
         "CommandFilter",
-        commands=commands,
+        cost=1,
+        route="command",
+        commands=TrackedSet(c for c in commands if PLAIN_COMMAND_RE.fullmatch(c)),
+        patterns=tuple(c for c in commands if not PLAIN_COMMAND_RE.fullmatch(c)),
+        compiled_patterns={},
         prefixes=prefixes,
         case_sensitive=case_sensitive,
     )
@@ -932,11 +1141,47 @@ def regex(pattern: str | Pattern, flags: int = 0):
     return create(
         func,
         "RegexFilter",
+        cost=1,
+        route="regex",
         p=pattern if isinstance(pattern, Pattern) else re.compile(pattern, flags),
     )
 
 
-class user(Filter, set):  # noqa: N801
+class TrackedSet(set):
+    """A set whose changes are counted in :attr:`Filter.version`."""
+
+
+for _name in (
+    "add",
+    "clear",
+    "difference_update",
+    "discard",
+    "intersection_update",
+    "pop",
+    "remove",
+    "symmetric_difference_update",
+    "update",
+    "__iand__",
+    "__ior__",
+    "__isub__",
+    "__ixor__",
+):
+
+    def _tracked(self, *args, _method=getattr(set, _name)):
+        result = _method(self, *args)
+        Filter.version += 1
+        return result
+
+    setattr(TrackedSet, _name, _tracked)
+
+del _name, _tracked
+
+
+class SetFilter(Filter, TrackedSet):
+    """A filter that is also a set, whose changes are counted in :attr:`Filter.version`."""
+
+
+class user(SetFilter):  # noqa: N801
     """Filter messages coming from one or more users.
 
     You can use `set bound methods <https://docs.python.org/3/library/stdtypes.html#set>`_ to manipulate the
@@ -949,6 +1194,9 @@ class user(Filter, set):  # noqa: N801
             Defaults to None (no users).
     """
 
+    pure = True
+    route = "user"
+
     def __init__(self, users: int | str | list[int | str] | None = None):
         users = [] if users is None else users if isinstance(users, list) else [users]
 
@@ -965,7 +1213,7 @@ class user(Filter, set):  # noqa: N801
         )
 
 
-class chat(Filter, set):  # noqa: N801
+class chat(SetFilter):  # noqa: N801
     """Filter messages coming from one or more chats.
 
     You can use `set bound methods <https://docs.python.org/3/library/stdtypes.html#set>`_ to manipulate the
@@ -978,6 +1226,9 @@ class chat(Filter, set):  # noqa: N801
             Defaults to None (no chats).
     """
 
+    pure = True
+    route = "chat"
+
     def __init__(self, chats: int | str | list[int | str] | None = None):
         chats = [] if chats is None else chats if isinstance(chats, list) else [chats]
 
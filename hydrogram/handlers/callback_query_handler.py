@@ -23,6 +23,7 @@ from asyncio import iscoroutinefunction
 from typing import Callable
 
 import hydrogram
+from hydrogram.filters import evaluate
 from hydrogram.types import CallbackQuery, Identifier, Listener, ListenerTypes
 from hydrogram.utils import PyromodConfig
 
@@ -115,12 +116,7 @@ class CallbackQueryHandler(Handler):
         if listener:
             filters = listener.filters
             if callable(filters):
-                if iscoroutinefunction(filters.__call__):
-                    listener_does_match = await filters(client, query)
-                else:
-                    listener_does_match = await client.loop.run_in_executor(
-                        None, filters, client, query
-                    )
+                listener_does_match = await evaluate(filters, client, query)
             else:
                 listener_does_match = True
 
@@ -142,15 +138,7 @@ class CallbackQueryHandler(Handler):
         """
         listener_does_match, listener = await self.check_if_has_matching_listener(client, query)
 
-        if callable(self.filters):
-            if iscoroutinefunction(self.filters.__call__):
-                handler_does_match = await self.filters(client, query)
-            else:
-                handler_does_match = await client.loop.run_in_executor(
-                    None, self.filters, client, query
-                )
-        else:
-            handler_does_match = True
+        handler_does_match = await self.check_filters(client, query)
 
         data = self.compose_data_identifier(query)
 
@@ -220,4 +208,9 @@ class CallbackQueryHandler(Handler):
 
             raise ValueError("Listener must have either a future or a callback")
 
-        await self.original_callback(client, query, *args)
+        if iscoroutinefunction(self.original_callback):
+            await self.original_callback(client, query, *args)
+        else:
+            await client.dispatcher.run_sync_callback(
+                self, self.original_callback, client, query, *args
+            )
@@ -17,25 +17,65 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
 
-import inspect
+from __future__ import annotations
+
 from typing import TYPE_CHECKING, Callable
 
-from hydrogram.filters import Filter
-from hydrogram.types import Update
+from hydrogram.filters import CompiledFilter, Filter, compile_filter
 
 if TYPE_CHECKING:
     import hydrogram
+    from hydrogram.types import Update
 
 
 class Handler:
+    # Execution options, see Client.add_handler
+    timeout: float | None = None
+    max_concurrency: int | None = None
+    fire_and_forget: bool = False
+    in_process: bool = False
+
     def __init__(self, callback: Callable, filters: Filter = None):
         self.callback = callback
         self.filters = filters
+        self.compiled_filters: CompiledFilter | None = None
+
+    @property
+    def filters(self) -> Filter | None:
+        return self._filters
+
+    @filters.setter
+    def filters(self, filters: Filter | None):
+        self._filters = filters
+        # The dispatcher indexes handlers by their filters
+        Filter.version += 1
+
+    @property
+    def callback_name(self) -> str:
+        """The qualified name of the user callback, as shown in logs."""
+        callback = getattr(self, "original_callback", self.callback)
+        module = getattr(callback, "__module__", None)
+        name = getattr(callback, "__qualname__", repr(callback))
+
+        return f"{module}.{name}" if module else name
+
+    def compile_filters(self):
+        """Compile the handler filters, done once when the handler is added to the client."""
+        self.compiled_filters = compile_filter(self.filters) if callable(self.filters) else None
+
+    async def check_filters(self, client: hydrogram.Client, update: Update) -> bool:
+        compiled = self.compiled_filters
+
+        if compiled is None or compiled.source is not self.filters:
+            if not callable(self.filters):
+                return True
+
+            self.compile_filters()
+            compiled = self.compiled_filters
+
+        result = compiled.func(client, update)
 
-    async def check(self, client: "hydrogram.Client", update: Update):
-        if callable(self.filters):
-            if inspect.iscoroutinefunction(self.filters.__call__):
-                return await self.filters(client, update)
-            return await client.loop.run_in_executor(client.executor, self.filters, client, update)
+        return bool(await result if compiled.is_async else result)
 
-        return True
+    async def check(self, client: hydrogram.Client, update: Update):
+        return await self.check_filters(client, update)
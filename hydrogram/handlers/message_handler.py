@@ -23,6 +23,7 @@ from inspect import iscoroutinefunction
 from typing import Callable
 
 import hydrogram
+from hydrogram.filters import evaluate
 from hydrogram.types import Identifier, Listener, ListenerTypes, Message
 
 from .handler import Handler
@@ -93,12 +94,7 @@ class MessageHandler(Handler):
         if listener:
             filters = listener.filters
             if callable(filters):
-                if iscoroutinefunction(filters.__call__):
-                    listener_does_match = await filters(client, message)
-                else:
-                    listener_does_match = await client.loop.run_in_executor(
-                        None, filters, client, message
-                    )
+                listener_does_match = await evaluate(filters, client, message)
             else:
                 listener_does_match = True
 
@@ -120,15 +116,7 @@ class MessageHandler(Handler):
         """
         listener_does_match = (await self.check_if_has_matching_listener(client, message))[0]
 
-        if callable(self.filters):
-            if iscoroutinefunction(self.filters.__call__):
-                handler_does_match = await self.filters(client, message)
-            else:
-                handler_does_match = await client.loop.run_in_executor(
-                    None, self.filters, client, message
-                )
-        else:
-            handler_does_match = True
+        handler_does_match = await self.check_filters(client, message)
 
         # let handler get the chance to handle if listener
         # exists but its filters doesn't match
@@ -167,4 +155,9 @@ class MessageHandler(Handler):
 
             raise ValueError("Listener must have either a future or a callback")
 
-        await self.original_callback(client, message, *args)
+        if iscoroutinefunction(self.original_callback):
+            await self.original_callback(client, message, *args)
+        else:
+            await client.dispatcher.run_sync_callback(
+                self, self.original_callback, client, message, *args
+            )
@@ -0,0 +1,294 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from hydrogram.downloader import Downloader
+
+if TYPE_CHECKING:
+    import hydrogram
+    from hydrogram.file_id import FileId
+
+
+class MediaReader:
+    """Read a media file at arbitrary byte offsets, like an asynchronous file object.
+
+    Files can only be downloaded in whole chunks of 1 MiB, so the chunks covering each read are
+    downloaded with :meth:`~hydrogram.Client.get_file` and the most recently used ones are kept in
+    memory, which makes reading a range again or seeking back and forth cheap. The chunks following
+    the position are downloaded in advance, several at a time with a single download, so that
+    sequential reads don't wait for each chunk.
+
+    Use :meth:`~hydrogram.Client.open_media` to open a reader.
+
+    Parameters:
+        client (:obj:`~hydrogram.Client`):
+            The client used to download the file.
+
+        file_id (:obj:`~hydrogram.file_id.FileId`):
+            The file to read.
+
+        file_size (``int``):
+            The file size in bytes, or 0 if unknown.
+
+        cache_size (``int``, *optional*):
+            Amount of chunks kept in memory. Defaults to 8.
+
+        read_ahead (``int``, *optional*):
+            Amount of chunks downloaded in advance. Up to twice as many can be held while the next
+            ones are downloaded, within *cache_size*. Defaults to 2.
+    """
+
+    CHUNK_SIZE = Downloader.CHUNK_SIZE
+
+    def __init__(
+        self,
+        client: hydrogram.Client,
+        file_id: FileId,
+        file_size: int,
+        cache_size: int = 8,
+        read_ahead: int = 2,
+    ):
+        self.client = client
+        self.file_id = file_id
+        self.size = file_size
+        self.cache_size = max(1, cache_size)
+        # Chunks read ahead, and the ones downloaded next, must fit in the cache along with the
+        # one being read
+        self.read_ahead = max(0, min(read_ahead, (self.cache_size - 1) // 2))
+        self.position = 0
+        self.cache: OrderedDict[int, bytes] = OrderedDict()
+        self.pending: dict[int, asyncio.Future] = {}
+        self.tasks: set[asyncio.Task] = set()
+        self.eof = False
+
+    async def __aenter__(self) -> MediaReader:
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    @property
+    def chunks(self) -> int | None:
+        return math.ceil(self.size / self.CHUNK_SIZE) if self.size else None
+
+    def store(self, index: int, chunk: bytes):
+        self.cache[index] = chunk
+        self.cache.move_to_end(index)
+
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def fetch(self, start: int, count: int):
+        futures = {index: self.pending[index] for index in range(start, start + count)}
+        chunks = self.client.get_file(self.file_id, self.size, count, start)
+        index = start
+
+        try:
+            async for chunk in chunks:
+                self.store(index, chunk)
+
+                if not futures[index].done():
+                    futures[index].set_result(chunk)
+
+                index += 1
+        except asyncio.CancelledError:
+            for future in futures.values():
+                future.cancel()
+
+            raise
+        except Exception as e:
+            # Errors get_file doesn't log (e.g.: flood waits) are raised by the reads of the chunks
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Mark it retrieved, chunks read ahead may never be waited for
+                    future.exception()
+        finally:
+            await chunks.aclose()
+
+            for i, future in futures.items():
+                self.pending.pop(i, None)
+
+                # Chunks past the end of a file of unknown size are empty, others are missing
+                # because the download failed (get_file logs the reason)
+                if not future.done():
+                    future.set_result(b"" if not self.size or i >= self.chunks else None)
+
+    def schedule(self, index: int):
+        """Start downloading the chunks from *index* on if some of them aren't cached or requested.
+
+        The first missing chunk and the ones following it are downloaded with a single request of
+        up to *read_ahead* + 1 chunks, so that they are fetched together instead of one by one.
+        """
+        limit = math.inf if self.chunks is None else self.chunks
+        end = min(index + self.read_ahead + 1, limit)
+
+        while index < end and (index in self.cache or index in self.pending):
+            index += 1
+
+        if index >= end:
+            return
+
+        loop = asyncio.get_running_loop()
+        start = index
+        end = min(start + self.read_ahead + 1, limit)
+
+        while index < end and index not in self.cache and index not in self.pending:
+            self.pending[index] = loop.create_future()
+            index += 1
+
+        task = loop.create_task(self.fetch(start, index - start))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def get_chunk(self, index: int) -> bytes:
+        self.schedule(index)
+
+        if index in self.cache:
+            self.cache.move_to_end(index)
+            return self.cache[index]
+
+        if index not in self.pending:
+            return b""
+
+        # Other reads may be waiting for the same chunk, don't cancel it along with this one
+        chunk = await asyncio.shield(self.pending[index])
+
+        if chunk is None:
+            raise ConnectionError(f"Couldn't download chunk {index} of the file")
+
+        return chunk
+
+    async def read(self, n: int = -1) -> bytes:
+        """Read up to *n* bytes from the current position, or up to the end of the file.
+
+        An empty bytes object is returned at the end of the file.
+        """
+        end = math.inf if n < 0 else self.position + n
+
+        if self.size:
+            end = min(end, self.size)
+
+        parts = []
+
+        while self.position < end:
+            index, start = divmod(self.position, self.CHUNK_SIZE)
+            chunk = await self.get_chunk(index)
+            data = chunk[start : start + int(min(end - self.position, self.CHUNK_SIZE))]
+
+            if not data:
+                self.eof = True
+                break
+
+            parts.append(data)
+            self.position += len(data)
+
+            # A short chunk is the last one of a file of unknown size
+            if len(chunk) < self.CHUNK_SIZE and start + len(data) == len(chunk):
+                self.eof = True
+                break
+
+        if self.size and self.position >= self.size:
+            self.eof = True
+
+        return b"".join(parts)
+
+    async def readexactly(self, n: int) -> bytes:
+        """Read exactly *n* bytes.
+
+        Raises:
+            asyncio.IncompleteReadError: In case the end of the file is reached before.
+        """
+        data = await self.read(n)
+
+        if len(data) < n:
+            raise asyncio.IncompleteReadError(data, n)
+
+        return data
+
+    def at_eof(self) -> bool:
+        """Whether the end of the file was reached."""
+        return self.eof
+
+    def tell(self) -> int:
+        return self.position
+
+    async def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """Change the position, just like :meth:`io.IOBase.seek`, and return the new one.
+
+        Chunks being downloaded in advance for the previous position are cancelled when the new
+        one is outside of them.
+        """
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            if not self.size:
+                raise ValueError("Can't seek from the end of a file of unknown size")
+
+            offset += self.size
+        elif whence != os.SEEK_SET:
+            raise ValueError(f"Invalid whence ({whence})")
+
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+
+        index = offset // self.CHUNK_SIZE
+
+        if not self.position // self.CHUNK_SIZE <= index <= max(self.pending, default=-1):
+            await self.cancel()
+
+        self.position = offset
+        self.eof = bool(self.size) and offset >= self.size
+
+        return offset
+
+    async def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        # Tasks cancelled before starting never resolve their chunks
+        for future in self.pending.values():
+            future.cancel()
+
+        self.pending.clear()
+
+    async def close(self):
+        """Stop the downloads in progress and free the cached chunks."""
+        await self.cancel()
+        self.cache.clear()
+
+    def __aiter__(self) -> MediaReader:
+        return self
+
+    async def __anext__(self) -> bytes:
+        """Iterate the file from the current position, one chunk at a time."""
+        data = await self.read(self.CHUNK_SIZE - self.position % self.CHUNK_SIZE)
+
+        if not data:
+            raise StopAsyncIteration
+
+        return data
@@ -20,7 +20,8 @@
 from .invoke import Invoke
 from .resolve_peer import ResolvePeer
 from .save_file import SaveFile
+from .save_files import SaveFiles
 
 
-class Advanced(Invoke, ResolvePeer, SaveFile):
+class Advanced(Invoke, ResolvePeer, SaveFile, SaveFiles):
     pass
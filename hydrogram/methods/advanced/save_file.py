@@ -19,7 +19,7 @@
 
 from __future__ import annotations
 
-import asyncio
+import contextlib
 import functools
 import inspect
 import io
@@ -31,10 +31,15 @@ from typing import BinaryIO, Callable
 
 import hydrogram
 from hydrogram import StopTransmission, raw
-from hydrogram.session import Session
+from hydrogram.errors import FloodWait
+from hydrogram.file_io import FileReader, UploadManifest
+from hydrogram.uploader import Uploader
 
 log = logging.getLogger(__name__)
 
+# Errors raised by an upload instead of being logged
+RAISED_ERRORS = (StopTransmission, FloodWait)
+
 
 class SaveFile:
     async def save_file(
@@ -99,20 +104,6 @@ class SaveFile:
             if path is None:
                 return None
 
-            async def worker(session):
-                while True:
-                    data = await queue.get()
-
-                    if data is None:
-                        return
-
-                    try:
-                        await session.invoke(data)
-                    except Exception as e:
-                        log.exception(e)
-
-            part_size = 512 * 1024
-
             if isinstance(path, (str, PurePath)):
                 fp = Path(path).open("rb")  # noqa: SIM115
             elif isinstance(path, io.IOBase):
@@ -137,93 +128,125 @@ class SaveFile:
             if file_size > file_size_limit_mib * 1024 * 1024:
                 raise ValueError(f"Can't upload files bigger than {file_size_limit_mib} MiB")
 
+            part_size = Uploader.get_part_size(file_size)
             file_total_parts = int(math.ceil(file_size / part_size))
             is_big = file_size > 10 * 1024 * 1024
-            workers_count = 4 if is_big else 1
             is_missing_part = file_id is not None
             file_id = file_id or self.rnd_id()
             md5_sum = md5() if not is_big and not is_missing_part else None
-            session = Session(
-                self,
-                await self.storage.dc_id(),
-                await self.storage.auth_key(),
-                await self.storage.test_mode(),
-                is_media=True,
+            done = []
+            manifest = None
+
+            if (
+                self.resumable_uploads
+                and is_big
+                and not is_missing_part
+                and isinstance(path, (str, PurePath))
+            ):
+                file_path = Path(path).resolve()
+                manifest = UploadManifest(
+                    file_path.with_name(file_path.name + ".upload"), self.internal_executor
+                )
+                state = await manifest.load(file_path, part_size)
+
+                if state is not None:
+                    file_id, done = state
+                    log.info(
+                        "Resuming the upload of %s, %s of %s parts already saved",
+                        file_path,
+                        len(done),
+                        file_total_parts,
+                    )
+
+            # Bytes of the parts saved by a previous attempt
+            resumed = sum(min(part_size, file_size - part * part_size) for part in done)
+            # Map files opened here, so that parts aren't read into new bytes objects. File objects
+            # given by the caller could be truncated while mapped, which would crash the process
+            reader = FileReader(
+                fp,
+                part_size,
+                part_size * file_part,
+                executor=self.internal_executor,
+                use_mmap=isinstance(path, (str, PurePath)),
             )
-            workers = [self.loop.create_task(worker(session)) for _ in range(workers_count)]
-            queue = asyncio.Queue(1)
 
-            try:
-                await session.start()
+            async def read_parts():
+                part = file_part
 
-                fp.seek(part_size * file_part)
+                while chunk := await reader.read():
+                    if md5_sum is not None:
+                        md5_sum.update(chunk)
 
-                while True:
-                    chunk = fp.read(part_size)
+                    yield part, chunk
 
-                    if not chunk:
-                        if not is_big and not is_missing_part:
-                            md5_sum = "".join([f"{i:x}".zfill(2) for i in md5_sum.digest()])
+                    if is_missing_part:
                         break
 
-                    if is_big:
-                        rpc = raw.functions.upload.SaveBigFilePart(
-                            file_id=file_id,
-                            file_part=file_part,
-                            file_total_parts=file_total_parts,
-                            bytes=chunk,
-                        )
+                    part += 1
+
+            async def on_ack(uploader: Uploader):
+                if (
+                    manifest is not None
+                    and len(uploader.done) - manifest.saved >= manifest.INTERVAL
+                ):
+                    await manifest.save(file_path, part_size, file_id, uploader.done)
+
+                if progress:
+                    func = functools.partial(
+                        progress, resumed + uploader.acked, file_size, *progress_args
+                    )
+
+                    if inspect.iscoroutinefunction(progress):
+                        await func()
                     else:
-                        rpc = raw.functions.upload.SaveFilePart(
-                            file_id=file_id, file_part=file_part, bytes=chunk
-                        )
+                        await self.loop.run_in_executor(self.internal_executor, func)
+
+            async with self.use_media_sessions(await self.storage.dc_id()) as sessions:
+                uploader = Uploader(
+                    sessions,
+                    file_id,
+                    file_total_parts,
+                    is_big,
+                    self.upload_window,
+                    done,
+                    on_ack,
+                    self.sleep_threshold,
+                )
 
-                    await queue.put(rpc)
+                try:
+                    await uploader.upload(read_parts())
+                except BaseException as e:
+                    # Keep track of the saved parts, to upload only the missing ones next time
+                    if manifest is not None:
+                        with contextlib.suppress(OSError):
+                            await manifest.save(file_path, part_size, file_id, uploader.done)
 
-                    if is_missing_part:
-                        return None
+                    # Like other requests, long flood waits are raised to the caller
+                    if not isinstance(e, Exception) or isinstance(e, RAISED_ERRORS):
+                        raise
 
-                    if not is_big and not is_missing_part:
-                        md5_sum.update(chunk)
+                    log.exception(e)
+                else:
+                    if manifest is not None:
+                        await manifest.remove()
 
-                    file_part += 1
+                    if is_missing_part:
+                        return None
 
-                    if progress:
-                        func = functools.partial(
-                            progress,
-                            min(file_part * part_size, file_size),
-                            file_size,
-                            *progress_args,
+                    if is_big:
+                        return raw.types.InputFileBig(
+                            id=file_id,
+                            parts=file_total_parts,
+                            name=file_name,
                         )
-
-                        if inspect.iscoroutinefunction(progress):
-                            await func()
-                        else:
-                            await self.loop.run_in_executor(self.executor, func)
-            except StopTransmission:
-                raise
-            except Exception as e:
-                log.exception(e)
-            else:
-                if is_big:
-                    return raw.types.InputFileBig(
+                    return raw.types.InputFile(
                         id=file_id,
                         parts=file_total_parts,
                         name=file_name,
+                        md5_checksum=md5_sum.hexdigest(),
                     )
-                return raw.types.InputFile(
-                    id=file_id,
-                    parts=file_total_parts,
-                    name=file_name,
-                    md5_checksum=md5_sum,
-                )
-            finally:
-                for _ in workers:
-                    await queue.put(None)
-
-                await asyncio.gather(*workers)
-
-                await session.stop()
+                finally:
+                    await reader.close()
 
-                if isinstance(path, (str, PurePath)):
-                    fp.close()
+                    if isinstance(path, (str, PurePath)):
+                        fp.close()
@@ -0,0 +1,64 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, BinaryIO
+
+if TYPE_CHECKING:
+    import hydrogram
+    from hydrogram import raw
+
+
+class SaveFiles:
+    async def save_files(
+        self: hydrogram.Client, paths: list[str | BinaryIO | None]
+    ) -> list[raw.base.InputFile | None]:
+        """Upload several files at the same time onto Telegram servers.
+        Useful to prepare the items of a media group, together with their thumbnails.
+
+        .. note::
+
+            At most *max_concurrent_uploads* files (see :obj:`~hydrogram.Client`) are uploaded at
+            the same time by the whole client, the others wait for their turn.
+
+        .. include:: /_includes/usable-by/users-bots.rst
+
+        Parameters:
+            paths (List of ``str`` | ``BinaryIO``):
+                The files to upload, as accepted by :meth:`~hydrogram.Client.save_file`.
+                None items are skipped.
+
+        Returns:
+            List of ``InputFile``: On success, the uploaded files are returned in the same order,
+            with None in place of the skipped items.
+
+        Raises:
+            RPCError: In case of a Telegram RPC error.
+        """
+        tasks = [self.loop.create_task(self.save_file(path)) for path in paths]
+
+        try:
+            return list(await asyncio.gather(*tasks))
+        finally:
+            # Don't keep uploading the rest if one of the files failed
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -50,6 +50,10 @@ class Initialize:
 
         await self.dispatcher.start()
 
+        if not self.no_updates:
+            await self.updates_manager.start()
+
         self.updates_watchdog_task = asyncio.create_task(self.updates_watchdog())
+        self.media_sessions_watchdog_task = asyncio.create_task(self.media_sessions_watchdog())
 
         self.is_initialized = True
@@ -44,13 +44,30 @@ class Terminate:
             await self.invoke(raw.functions.account.FinishTakeoutSession())
             log.info("Takeout session %s finished", self.takeout_id)
 
+        if not self.no_updates:
+            await self.updates_manager.stop()
+
         await self.storage.save()
         await self.dispatcher.stop()
 
+        self.media_sessions_watchdog_event.set()
+
+        if self.media_sessions_watchdog_task is not None:
+            await self.media_sessions_watchdog_task
+
+        self.media_sessions_watchdog_event.clear()
+
         for media_session in self.media_sessions.values():
             await media_session.stop()
 
+        for extra_sessions in self.extra_media_sessions.values():
+            for media_session in extra_sessions:
+                await media_session.stop()
+
         self.media_sessions.clear()
+        self.extra_media_sessions.clear()
+        self.media_sessions_last_used.clear()
+        self.kept_media_sessions.clear()
 
         self.updates_watchdog_event.set()
 
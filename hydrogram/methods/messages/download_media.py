@@ -41,6 +41,7 @@ class DownloadMedia:
         block: bool = True,
         progress: Callable | None = None,
         progress_args: tuple = (),
+        resume: bool = False,
     ) -> str | BinaryIO | None:
         """Download the media from a message.
 
@@ -77,6 +78,14 @@ class DownloadMedia:
                 You can pass anything you need to be available in the progress callback scope; for example, a Message
                 object or a Client instance in order to edit the message with the updated progress status.
 
+            resume (``bool``, *optional*):
+                Pass True to keep the partially downloaded file in case the download is interrupted,
+                and continue from where it stopped when the same media is downloaded again with the
+                same *file_name*.
+                The progress is kept in a ".journal" file next to the ".temp" one.
+                Has no effect when downloading in memory.
+                Defaults to False.
+
         Other Parameters:
             current (``int``):
                 The amount of bytes transmitted so far.
@@ -192,6 +201,7 @@ class DownloadMedia:
             file_size,
             progress,
             progress_args,
+            resume,
         ))
 
         if block:
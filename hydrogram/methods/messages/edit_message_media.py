@@ -88,13 +88,22 @@ class EditMessageMedia:
         if caption is not None:
             message, entities = (await self.parser.parse(caption, parse_mode)).values()
 
+        uploaded_file, uploaded_thumb = None, None
+
+        # Upload the file and its thumbnail at the same time
+        if isinstance(media.media, io.BytesIO) or Path(str(media.media)).is_file():
+            uploaded_file, uploaded_thumb = await self.save_files([
+                media.media,
+                getattr(media, "thumb", None),
+            ])
+
         if isinstance(media, types.InputMediaPhoto):
             if isinstance(media.media, io.BytesIO) or Path(media.media).is_file():
                 uploaded_media = await self.invoke(
                     raw.functions.messages.UploadMedia(
                         peer=await self.resolve_peer(chat_id),
                         media=raw.types.InputMediaUploadedPhoto(
-                            file=await self.save_file(media.media),
+                            file=uploaded_file,
                             spoiler=media.has_spoiler,
                         ),
                     )
@@ -122,9 +131,9 @@ class EditMessageMedia:
                         media=raw.types.InputMediaUploadedDocument(
                             mime_type=self.guess_mime_type(file_name or media.media.name)
                             or "video/mp4",
-                            thumb=await self.save_file(media.thumb),
+                            thumb=uploaded_thumb,
                             spoiler=media.has_spoiler,
-                            file=await self.save_file(media.media),
+                            file=uploaded_file,
                             attributes=[
                                 raw.types.DocumentAttributeVideo(
                                     supports_streaming=media.supports_streaming or None,
@@ -162,8 +171,8 @@ class EditMessageMedia:
                         media=raw.types.InputMediaUploadedDocument(
                             mime_type=self.guess_mime_type(file_name or media.media.name)
                             or "audio/mpeg",
-                            thumb=await self.save_file(media.thumb),
-                            file=await self.save_file(media.media),
+                            thumb=uploaded_thumb,
+                            file=uploaded_file,
                             attributes=[
                                 raw.types.DocumentAttributeAudio(
                                     duration=media.duration,
@@ -197,9 +206,9 @@ class EditMessageMedia:
                         media=raw.types.InputMediaUploadedDocument(
                             mime_type=self.guess_mime_type(file_name or media.media.name)
                             or "video/mp4",
-                            thumb=await self.save_file(media.thumb),
+                            thumb=uploaded_thumb,
                             spoiler=media.has_spoiler,
-                            file=await self.save_file(media.media),
+                            file=uploaded_file,
                             attributes=[
                                 raw.types.DocumentAttributeVideo(
                                     supports_streaming=True,
@@ -238,8 +247,8 @@ class EditMessageMedia:
                         media=raw.types.InputMediaUploadedDocument(
                             mime_type=self.guess_mime_type(file_name or media.media.name)
                             or "application/zip",
-                            thumb=await self.save_file(media.thumb),
-                            file=await self.save_file(media.media),
+                            thumb=uploaded_thumb,
+                            file=uploaded_file,
                             attributes=[
                                 raw.types.DocumentAttributeFilename(
                                     file_name=file_name or Path(media.media).name
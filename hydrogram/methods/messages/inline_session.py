@@ -17,48 +17,14 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
 
-import hydrogram
-from hydrogram import raw
-from hydrogram.errors import AuthBytesInvalid
-from hydrogram.session import Session
-from hydrogram.session.auth import Auth
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import hydrogram
 
 
 async def get_session(client: "hydrogram.Client", dc_id: int):
     if dc_id == await client.storage.dc_id():
         return client
 
-    async with client.media_sessions_lock:
-        if client.media_sessions.get(dc_id):
-            return client.media_sessions[dc_id]
-
-        session = client.media_sessions[dc_id] = Session(
-            client,
-            dc_id,
-            await Auth(client, dc_id, await client.storage.test_mode()).create(),
-            await client.storage.test_mode(),
-            is_media=True,
-        )
-
-        await session.start()
-
-        for _ in range(3):
-            exported_auth = await client.invoke(
-                raw.functions.auth.ExportAuthorization(dc_id=dc_id)
-            )
-
-            try:
-                await session.invoke(
-                    raw.functions.auth.ImportAuthorization(
-                        id=exported_auth.id, bytes=exported_auth.bytes
-                    )
-                )
-            except AuthBytesInvalid:
-                continue
-            else:
-                break
-        else:
-            await session.stop()
-            raise AuthBytesInvalid
-
-        return session
+    return (await client.get_media_sessions(dc_id))[0]
@@ -0,0 +1,103 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import hydrogram
+from hydrogram import types
+from hydrogram.file_id import FileId
+from hydrogram.media_reader import MediaReader
+
+
+class OpenMedia:
+    def open_media(
+        self: hydrogram.Client,
+        message: types.Message | str,
+        cache_size: int = 8,
+        read_ahead: int = 2,
+    ) -> MediaReader:
+        """Open the media from a message for reading at any position, like a file.
+
+        Unlike :meth:`~hydrogram.Client.stream_media`, which yields whole chunks of 1 MiB, the
+        returned reader reads any amount of bytes from any position, downloading only the chunks
+        needed and keeping the most recently used ones in memory. This is useful e.g. to serve
+        HTTP range requests.
+
+        .. include:: /_includes/usable-by/users-bots.rst
+
+        Parameters:
+            message (:obj:`~hydrogram.types.Message` | ``str``):
+                Pass a Message containing the media, the media itself (message.audio,
+                message.video, ...) or a file id as string.
+
+            cache_size (``int``, *optional*):
+                Amount of chunks of 1 MiB kept in memory.
+                Defaults to 8.
+
+            read_ahead (``int``, *optional*):
+                Amount of chunks downloaded in advance while reading.
+                Defaults to 2.
+
+        Returns:
+            :obj:`~hydrogram.media_reader.MediaReader`: An asynchronous file-like object with
+            ``read()``, ``readexactly()``, ``seek()`` and ``tell()`` methods.
+
+        Example:
+            .. code-block:: python
+
+                async with app.open_media(message) as media:
+                    # Read 1000 bytes from the 5000th byte on
+                    await media.seek(5000)
+                    data = await media.read(1000)
+
+                    # Read the last 100 bytes
+                    await media.seek(-100, os.SEEK_END)
+                    data = await media.read()
+        """
+        available_media = (
+            "audio",
+            "document",
+            "photo",
+            "sticker",
+            "animation",
+            "video",
+            "voice",
+            "video_note",
+            "new_chat_photo",
+        )
+
+        if isinstance(message, types.Message):
+            for kind in available_media:
+                media = getattr(message, kind, None)
+
+                if media is not None:
+                    break
+            else:
+                raise ValueError("This message doesn't contain any downloadable media")
+        else:
+            media = message
+
+        file_id_str = media if isinstance(media, str) else media.file_id
+
+        return MediaReader(
+            self,
+            FileId.decode(file_id_str),
+            getattr(media, "file_size", 0),
+            cache_size,
+            read_ahead,
+        )
@@ -101,7 +101,15 @@ class SendMediaGroup:
         """
         multi_media = []
 
-        for i in media:
+        # Upload the local files and their thumbnails all at once, then build the group in order
+        is_local = [not isinstance(i.media, str) or Path(i.media).is_file() for i in media]
+        uploads = await self.save_files(
+            [i.media if local else None for i, local in zip(media, is_local)]
+            + [getattr(i, "thumb", None) if local else None for i, local in zip(media, is_local)]
+        )
+        files, thumbs = uploads[: len(media)], uploads[len(media) :]
+
+        for n, i in enumerate(media):
             if isinstance(i, types.InputMediaPhoto):
                 if isinstance(i.media, str):
                     if Path(i.media).is_file():
@@ -109,7 +117,7 @@ class SendMediaGroup:
                             raw.functions.messages.UploadMedia(
                                 peer=await self.resolve_peer(chat_id),
                                 media=raw.types.InputMediaUploadedPhoto(
-                                    file=await self.save_file(i.media),
+                                    file=files[n],
                                     spoiler=i.has_spoiler,
                                 ),
                             )
@@ -148,7 +156,7 @@ class SendMediaGroup:
                         raw.functions.messages.UploadMedia(
                             peer=await self.resolve_peer(chat_id),
                             media=raw.types.InputMediaUploadedPhoto(
-                                file=await self.save_file(i.media),
+                                file=files[n],
                                 spoiler=i.has_spoiler,
                             ),
                         )
@@ -169,8 +177,8 @@ class SendMediaGroup:
                             raw.functions.messages.UploadMedia(
                                 peer=await self.resolve_peer(chat_id),
                                 media=raw.types.InputMediaUploadedDocument(
-                                    file=await self.save_file(i.media),
-                                    thumb=await self.save_file(i.thumb),
+                                    file=files[n],
+                                    thumb=thumbs[n],
                                     spoiler=i.has_spoiler,
                                     mime_type=self.guess_mime_type(i.media) or "video/mp4",
                                     nosound_video=True,
@@ -222,8 +230,8 @@ class SendMediaGroup:
                         raw.functions.messages.UploadMedia(
                             peer=await self.resolve_peer(chat_id),
                             media=raw.types.InputMediaUploadedDocument(
-                                file=await self.save_file(i.media),
-                                thumb=await self.save_file(i.thumb),
+                                file=files[n],
+                                thumb=thumbs[n],
                                 spoiler=i.has_spoiler,
                                 mime_type=self.guess_mime_type(
                                     getattr(i.media, "name", "video.mp4")
@@ -261,8 +269,8 @@ class SendMediaGroup:
                                 peer=await self.resolve_peer(chat_id),
                                 media=raw.types.InputMediaUploadedDocument(
                                     mime_type=self.guess_mime_type(i.media) or "audio/mpeg",
-                                    file=await self.save_file(i.media),
-                                    thumb=await self.save_file(i.thumb),
+                                    file=files[n],
+                                    thumb=thumbs[n],
                                     attributes=[
                                         raw.types.DocumentAttributeAudio(
                                             duration=i.duration,
@@ -310,8 +318,8 @@ class SendMediaGroup:
                                     getattr(i.media, "name", "audio.mp3")
                                 )
                                 or "audio/mpeg",
-                                file=await self.save_file(i.media),
-                                thumb=await self.save_file(i.thumb),
+                                file=files[n],
+                                thumb=thumbs[n],
                                 attributes=[
                                     raw.types.DocumentAttributeAudio(
                                         duration=i.duration,
@@ -341,8 +349,8 @@ class SendMediaGroup:
                                 peer=await self.resolve_peer(chat_id),
                                 media=raw.types.InputMediaUploadedDocument(
                                     mime_type=self.guess_mime_type(i.media) or "application/zip",
-                                    file=await self.save_file(i.media),
-                                    thumb=await self.save_file(i.thumb),
+                                    file=files[n],
+                                    thumb=thumbs[n],
                                     attributes=[
                                         raw.types.DocumentAttributeFilename(
                                             file_name=Path(i.media).name
@@ -385,8 +393,8 @@ class SendMediaGroup:
                                     getattr(i.media, "name", "file.zip")
                                 )
                                 or "application/zip",
-                                file=await self.save_file(i.media),
-                                thumb=await self.save_file(i.thumb),
+                                file=files[n],
+                                thumb=thumbs[n],
                                 attributes=[
                                     raw.types.DocumentAttributeFilename(
                                         file_name=getattr(i.media, "name", "file.zip")
@@ -107,7 +107,11 @@ class Listen:
                     await PyromodConfig.timeout_handler(pattern, listener, timeout)
                 else:
                     await self.loop.run_in_executor(
-                        None, PyromodConfig.timeout_handler, pattern, listener, timeout
+                        self.internal_executor,
+                        PyromodConfig.timeout_handler,
+                        pattern,
+                        listener,
+                        timeout,
                     )
             elif PyromodConfig.throw_exceptions:
                 raise ListenerTimeout(timeout)
@@ -55,7 +55,7 @@ class StopListener:
                 await PyromodConfig.stopped_handler(None, listener)
             else:
                 await self.loop.run_in_executor(
-                    None, PyromodConfig.stopped_handler, None, listener
+                    self.internal_executor, PyromodConfig.stopped_handler, None, listener
                 )
         elif PyromodConfig.throw_exceptions:
             listener.future.set_exception(ListenerStopped())
@@ -17,6 +17,10 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
 
+from __future__ import annotations
+
+import inspect
+import pickle
 from typing import TYPE_CHECKING
 
 from hydrogram.handlers import DisconnectHandler
@@ -27,7 +31,16 @@ if TYPE_CHECKING:
 
 
 class AddHandler:
-    def add_handler(self: "hydrogram.Client", handler: "Handler", group: int = 0):
+    def add_handler(
+        self: hydrogram.Client,
+        handler: Handler,
+        group: int = 0,
+        *,
+        timeout: float | None = None,
+        max_concurrency: int | None = None,
+        fire_and_forget: bool = False,
+        in_process: bool = False,
+    ):
         """Register an update handler.
 
         You can register multiple handlers, but at most one handler within a group will be used for a single update.
@@ -42,6 +55,35 @@ class AddHandler:
             group (``int``, *optional*):
                 The group identifier, defaults to 0.
 
+            timeout (``float``, *optional*):
+                Maximum time, in seconds, the callback is allowed to run. A callback running for
+                longer is cancelled and :obj:`asyncio.TimeoutError` is passed to the error
+                handlers.
+                Synchronous callbacks can't be interrupted: they keep running in the executor, but
+                the update is no longer waiting for them.
+                Defaults to None (no limit).
+
+            max_concurrency (``int``, *optional*):
+                Maximum number of calls of the callback running at the same time, the others wait
+                for their turn. Defaults to None (no limit).
+
+            fire_and_forget (``bool``, *optional*):
+                Run the callback in its own task, so that the worker moves on to the next update
+                right away. The callback can't stop or continue the propagation of the update, and
+                its exceptions are still passed to the error handlers.
+                Defaults to False.
+
+            in_process (``bool``, *optional*):
+                Run a synchronous callback in a separate process (see *process_workers* in
+                :obj:`~hydrogram.Client`), for CPU-heavy work that would hold the interpreter lock.
+                The client can't be sent to another process: the callback is called without it,
+                with a copy of the update only, and must be defined at module level.
+                Defaults to False.
+
+        Raises:
+            ValueError: In case *in_process* is passed for an asynchronous callback or one that
+                can't be sent to another process.
+
         Returns:
             ``tuple``: A tuple consisting of *(handler, group)*.
 
@@ -62,6 +104,31 @@ class AddHandler:
 
                 app.run()
         """
+        if timeout is not None:
+            handler.timeout = timeout
+
+        if max_concurrency is not None:
+            handler.max_concurrency = max_concurrency
+
+        if fire_and_forget:
+            handler.fire_and_forget = True
+
+        if in_process:
+            callback = getattr(handler, "original_callback", handler.callback)
+
+            if inspect.iscoroutinefunction(callback):
+                raise ValueError("Only synchronous callbacks can run in a separate process")
+
+            try:
+                pickle.dumps(callback)
+            except (pickle.PicklingError, AttributeError, TypeError):
+                raise ValueError(
+                    f"{handler.callback_name} can't be sent to another process, "
+                    "define it at module level"
+                ) from None
+
+            handler.in_process = True
+
         if isinstance(handler, DisconnectHandler):
             self.disconnect_handler = handler.callback
         else:
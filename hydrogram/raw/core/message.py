@@ -17,6 +17,8 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
 
+from __future__ import annotations
+
 from io import BytesIO
 from typing import Any
 
@@ -27,18 +29,22 @@ from .tl_object import TLObject
 class Message(TLObject):
     ID = 0x5BB8E511  # hex(crc32(b"message msg_id:long seqno:int bytes:int body:Object = Message"))
 
-    __slots__ = ["body", "length", "msg_id", "seq_no"]
+    __slots__ = ["body", "data", "length", "msg_id", "seq_no"]
 
     QUALNAME = "Message"
 
-    def __init__(self, body: TLObject, msg_id: int, seq_no: int, length: int):
+    def __init__(
+        self, body: TLObject, msg_id: int, seq_no: int, length: int, data: bytes | None = None
+    ):
         self.msg_id = msg_id
         self.seq_no = seq_no
         self.length = length
         self.body = body
+        # The body already serialized, if available
+        self.data = data
 
     @staticmethod
-    def read(data: BytesIO, *args: Any) -> "Message":
+    def read(data: BytesIO, *args: Any) -> Message:
         msg_id = Long.read(data)
         seq_no = Int.read(data)
         length = Int.read(data)
@@ -47,11 +53,9 @@ class Message(TLObject):
         return Message(TLObject.read(BytesIO(body)), msg_id, seq_no, length)
 
     def write(self, *args: Any) -> bytes:
-        b = BytesIO()
-
-        b.write(Long(self.msg_id))
-        b.write(Int(self.seq_no))
-        b.write(Int(self.length))
-        b.write(self.body.write())
-
-        return b.getvalue()
+        return b"".join((
+            Long(self.msg_id),
+            Int(self.seq_no),
+            Int(self.length),
+            self.body.write() if self.data is None else self.data,
+        ))
@@ -17,11 +17,15 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
 
-from io import BytesIO
-from typing import Any
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
 
 from hydrogram.raw.core.tl_object import TLObject
 
+if TYPE_CHECKING:
+    from io import BytesIO
+
 
 class Bytes(bytes, TLObject):
     @classmethod
@@ -38,9 +42,15 @@ class Bytes(bytes, TLObject):
 
         return x
 
-    def __new__(cls, value: bytes) -> bytes:  # type: ignore
+    def __new__(cls, value: bytes | bytearray | memoryview) -> bytes:  # type: ignore
         length = len(value)
 
+        # Join the parts at once, instead of concatenating copies of big values (e.g.: file parts)
         if length <= 253:
-            return bytes([length]) + value + bytes(-(length + 1) % 4)
-        return bytes([254]) + length.to_bytes(3, "little") + value + bytes(-length % 4)
+            return b"".join((bytes([length]), value, bytes(-(length + 1) % 4)))
+        return b"".join((
+            bytes([254]),
+            length.to_bytes(3, "little"),
+            value,
+            bytes(-length % 4),
+        ))
@@ -42,8 +42,8 @@ class TLObject:
 
     @staticmethod
     def default(obj: TLObject) -> str | dict[str, str]:
-        if isinstance(obj, bytes):
-            return repr(obj)
+        if isinstance(obj, (bytes, memoryview)):
+            return repr(bytes(obj))
 
         return {
             "_": obj.QUALNAME,
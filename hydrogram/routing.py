@@ -0,0 +1,271 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-2023 Dan <https://github.com/delivrance>
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+from __future__ import annotations
+
+import re
+from types import SimpleNamespace
+from typing import TYPE_CHECKING
+
+from hydrogram import raw, utils
+from hydrogram.filters import AndFilter, OrFilter, TrackedSet, split_command
+from hydrogram.handlers import CallbackQueryHandler, MessageHandler
+from hydrogram.handlers.handler import Handler
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+if TYPE_CHECKING:
+    import hydrogram
+    from hydrogram.types import Update
+
+# Kinds of static keys, from the most to the least selective one
+COMMAND = "command"
+CHAT = "chat"
+USER = "user"
+PREFIX = "prefix"
+KINDS = (COMMAND, CHAT, USER, PREFIX)
+
+# Handlers whose check() only depends on their filters (and listeners, see candidates())
+INDEXABLE_CHECKS = {Handler.check, MessageHandler.check, CallbackQueryHandler.check}
+
+
+def get_literal_prefix(pattern: re.Pattern) -> tuple[str, bool] | None:
+    """Get the literal text a pattern anchored at the beginning has to start with."""
+    if not isinstance(pattern.pattern, str) or pattern.flags & re.MULTILINE:
+        return None
+
+    items = list(sre_parse.parse(pattern.pattern, pattern.flags))
+
+    if not items or items[0] not in {
+        (sre_parse.AT, sre_parse.AT_BEGINNING),
+        (sre_parse.AT, sre_parse.AT_BEGINNING_STRING),
+    }:
+        return None
+
+    chars = []
+
+    for op, value in items[1:]:
+        if op is not sre_parse.LITERAL:
+            break
+
+        chars.append(chr(value))
+
+    prefix = "".join(chars)
+    ignore_case = bool(pattern.flags & re.IGNORECASE)
+
+    if not prefix or (ignore_case and not prefix.isascii()):
+        return None
+
+    return (prefix.lower() if ignore_case else prefix), ignore_case
+
+
+def get_requirement(flt) -> tuple[str, frozenset] | None:
+    """Get a static key an update must have to possibly pass a filter, or None if there's none."""
+    if type(flt) is AndFilter:
+        candidates = [r for r in (get_requirement(flt.base), get_requirement(flt.other)) if r]
+        return min(candidates, key=lambda r: (KINDS.index(r[0]), len(r[1])), default=None)
+
+    if type(flt) is OrFilter:
+        base, other = get_requirement(flt.base), get_requirement(flt.other)
+
+        if base and other and base[0] == other[0]:
+            return base[0], base[1] | other[1]
+
+        return None
+
+    route = getattr(flt, "route", None)
+
+    if route == COMMAND:
+        # Commands that aren't plain words are regular expressions and can't be indexed, neither
+        # can sets whose changes wouldn't be noticed
+        if flt.patterns or not isinstance(flt.commands, TrackedSet):
+            return None
+
+        if not isinstance(flt.prefixes, TrackedSet):
+            return None
+
+        return COMMAND, frozenset(
+            (prefix, cmd.lower()) for prefix in flt.prefixes for cmd in flt.commands
+        )
+
+    if route == "regex":
+        prefix = get_literal_prefix(flt.p)
+        return None if prefix is None else (PREFIX, frozenset({prefix}))
+
+    if route in {CHAT, USER}:
+        if not flt or not all(isinstance(i, int) for i in flt):
+            return None
+
+        return route, frozenset(flt)
+
+    return None
+
+
+class HandlerIndex:
+    """The handlers of a group that can handle a given type of update, indexed by static key.
+
+    Handlers whose filters require a command name, a chat id, a user id or a text starting with
+    a literal prefix (a regular expression anchored with "^") are only returned as candidates for
+    updates having that key. The other handlers are always candidates. Candidates keep the group
+    order, and every candidate must still be checked.
+
+    Parameters:
+        handlers (List of :obj:`~hydrogram.handlers.handler.Handler`):
+            The handlers, in group order.
+    """
+
+    def __init__(self, handlers: list[Handler]):
+        self.handlers = handlers
+        self.unkeyed: list[int] = []
+        self.keyed: dict[str, dict] = {kind: {} for kind in KINDS}
+        self.command_prefixes: set[str] = set()
+        self.literal_prefixes: set[tuple[int, bool]] = set()
+        # Handlers that can be triggered by a listener no matter what their filters say
+        self.listener_handlers: list[int] = []
+
+        for position, handler in enumerate(handlers):
+            if isinstance(handler, (MessageHandler, CallbackQueryHandler)):
+                self.listener_handlers.append(position)
+
+            requirement = (
+                get_requirement(handler.filters)
+                if callable(handler.filters) and type(handler).check in INDEXABLE_CHECKS
+                else None
+            )
+
+            if requirement is None:
+                self.unkeyed.append(position)
+                continue
+
+            kind, keys = requirement
+
+            for key in keys:
+                self.keyed[kind].setdefault(key, []).append(position)
+
+                if kind == COMMAND:
+                    self.command_prefixes.add(key[0])
+                elif kind == PREFIX:
+                    self.literal_prefixes.add((len(key[0]), key[1]))
+
+    def get_command_keys(self, update: Update, text: str, username: str) -> set[tuple[str, str]]:
+        keys = set()
+
+        for prefix in self.command_prefixes:
+            if not text.startswith(prefix):
+                continue
+
+            token = split_command(update, text, prefix)[0].lower()
+            keys.add((prefix, token))
+            keys.add((prefix, token.split("@", 1)[0]))
+
+            if username and token.endswith(username):
+                keys.add((prefix, token[: -len(username)]))
+
+        return keys
+
+    def candidates(
+        self, client: hydrogram.Client, update: Update | None, has_listeners: bool
+    ) -> list[Handler]:
+        """Get the handlers that may accept an update, in group order."""
+        if update is None or len(self.unkeyed) == len(self.handlers):
+            return self.handlers
+
+        positions = set(self.unkeyed)
+
+        if has_listeners:
+            positions.update(self.listener_handlers)
+
+        def add(kind: str, key):
+            positions.update(self.keyed[kind].get(key, ()))
+
+        text = getattr(update, "text", None) or getattr(update, "caption", None)
+
+        if text:
+            username = (getattr(client.me, "username", None) or "").lower()
+
+            for key in self.get_command_keys(update, text, username):
+                add(COMMAND, key)
+
+        if text is None:
+            text = getattr(update, "data", None) or getattr(update, "query", None)
+
+        if isinstance(text, str):
+            lowered = None
+
+            for length, ignore_case in self.literal_prefixes:
+                if ignore_case:
+                    lowered = text.lower() if lowered is None else lowered
+                    add(PREFIX, (lowered[:length], True))
+                else:
+                    add(PREFIX, (text[:length], False))
+        elif text is not None:
+            for positions_by_key in self.keyed[PREFIX].values():
+                positions.update(positions_by_key)
+
+        for kind, attribute in ((CHAT, "chat"), (USER, "from_user")):
+            if not self.keyed[kind]:
+                continue
+
+            if not hasattr(update, attribute):
+                # Not an update these filters are meant for, let them decide
+                for positions_by_key in self.keyed[kind].values():
+                    positions.update(positions_by_key)
+            else:
+                add(kind, getattr(getattr(update, attribute), "id", None))
+
+        return [self.handlers[position] for position in sorted(positions)]
+
+
+class RawMessageView:
+    """The keys of a raw message the handler index looks at, read without parsing the message.
+
+    Each key is the same the parsed :obj:`~hydrogram.types.Message` would have, when it has one.
+
+    Parameters:
+        message (:obj:`~hydrogram.raw.base.Message`):
+            The raw message.
+    """
+
+    __slots__ = ("_command_tokens", "caption", "chat", "from_user", "text")
+
+    def __init__(self, message: raw.base.Message):
+        peer = getattr(message, "peer_id", None)
+        user_id = utils.get_raw_peer_id(getattr(message, "from_id", None)) or (
+            utils.get_raw_peer_id(peer) if peer is not None else None
+        )
+
+        self.text = getattr(message, "message", None) or None
+        self.caption = None
+        self.chat = None if peer is None else SimpleNamespace(id=utils.get_peer_id(peer))
+        self.from_user = SimpleNamespace(id=user_id) if user_id else None
+
+
+def build_routes(groups: dict[int, list[Handler]], handler_type: type) -> list[HandlerIndex]:
+    """Build the index of every group for a handler type, skipping groups with no such handler."""
+    routes = []
+
+    for group in groups.values():
+        handlers = [handler for handler in group if isinstance(handler, handler_type)]
+
+        if handlers:
+            routes.append(HandlerIndex(handlers))
+
+    return routes
@@ -32,9 +32,13 @@ class MsgFactory:
         self.seq_no = SeqNo()
 
     def __call__(self, body: TLObject) -> Message:
+        # Serialize the body only once, it is needed for both the length and the message itself
+        data = body.write()
+
         return Message(
             body,
             MsgId(),
             self.seq_no(not isinstance(body, not_content_related)),
-            len(body),
+            len(data),
+            data,
         )
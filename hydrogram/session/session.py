@@ -24,10 +24,12 @@ import bisect
 import contextlib
 import logging
 import os
+from collections import deque
 from datetime import datetime, timedelta
 from hashlib import sha1
 from io import BytesIO
-from typing import TYPE_CHECKING, ClassVar
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, ClassVar
 
 import hydrogram
 from hydrogram import raw
@@ -42,7 +44,8 @@ from hydrogram.errors import (
     ServiceUnavailable,
 )
 from hydrogram.raw.all import layer
-from hydrogram.raw.core import FutureSalts, Int, MsgContainer, TLObject
+from hydrogram.raw.core import FutureSalts, Int, Message, MsgContainer, TLObject
+from hydrogram.updates_manager import COMMON, QTS, UpdatesManager
 
 from .internals import MsgFactory, MsgId
 
@@ -67,6 +70,15 @@ class Session:
     PING_INTERVAL = 5
     STORED_MSG_IDS_MAX_SIZE = 1000 * 2
     RECONNECT_THRESHOLD = timedelta(seconds=10)
+    # Received packets waiting to be decrypted and processed, in arrival order
+    PACKETS_QUEUE_SIZE = 64
+    # Processed updates waiting to be handed to the client, in arrival order
+    UPDATES_QUEUE_SIZE = 1024
+    # Updates of different sequence boxes (the common one and each channel) are handled at once
+    UPDATE_WORKERS = 4
+    # Seconds the updates already received have to be handed to the client when stopping
+    UPDATES_STOP_TIMEOUT = 5
+    STAGES = ("decrypt", "process", "update_wait", "update")
 
     TRANSPORT_ERRORS: ClassVar = {
         404: "auth key not found",
@@ -110,7 +122,21 @@ class Session:
 
         self.recv_task = None
 
+        self.packets: asyncio.Queue | None = None
+        self.process_task = None
+
+        self.updates: asyncio.Queue | None = None
+        self.updates_room = asyncio.Event()
+        # Updates waiting for the ones of the same box to be handled, by box. Shared by the workers
+        # of every connection, so that the order of each box is kept across reconnections.
+        self.update_backlogs: dict[int, deque] = {}
+        self.update_tasks: list[asyncio.Task] = []
+
+        # Count, total and max time spent by items in each stage of the pipeline
+        self.stage_times = {stage: [0, 0.0, 0.0] for stage in self.STAGES}
+
         self.is_started = asyncio.Event()
+        self.is_stopping = False
 
         self.loop = asyncio.get_event_loop()
 
@@ -130,6 +156,15 @@ class Session:
             try:
                 await self.connection.connect()
 
+                self.packets = asyncio.Queue(self.PACKETS_QUEUE_SIZE)
+                self.process_task = self.loop.create_task(self.process_worker())
+
+                self.updates = asyncio.Queue()
+                self.update_tasks = [
+                    self.loop.create_task(self.update_worker(self.updates))
+                    for _ in range(self.UPDATE_WORKERS)
+                ]
+
                 self.recv_task = self.loop.create_task(self.recv_worker())
 
                 await self.send(raw.functions.Ping(ping_id=0), timeout=self.START_TIMEOUT)
@@ -186,9 +221,42 @@ class Session:
 
         await self.connection.close()
 
+        # The processing mustn't wait for room for updates anymore, the receiving waits for it
+        self.is_stopping = True
+        self.updates_room.set()
+
         if self.recv_task:
             await self.recv_task
 
+        if self.process_task:
+            await self.process_task
+
+        self.is_stopping = False
+
+        # Updates already received are still handed to the client before stopping, unless the
+        # handling is stuck (e.g.: on a request waiting for this session to restart)
+        if self.updates is not None:
+            for _ in self.update_tasks:
+                self.updates.put_nowait(None)
+
+        # A worker stopping its own session can't wait for itself
+        update_tasks = [task for task in self.update_tasks if task is not asyncio.current_task()]
+
+        if update_tasks:
+            _, pending = await asyncio.wait(update_tasks, timeout=self.UPDATES_STOP_TIMEOUT)
+
+            if pending:
+                log.warning(
+                    "Dropping %s updates that weren't handled in time", self.queued_updates
+                )
+
+                for task in pending:
+                    task.cancel()
+
+                await asyncio.wait(pending)
+
+        self.update_tasks = []
+
         if not self.is_media and callable(self.client.disconnect_handler):
             try:
                 await self.client.disconnect_handler(self.client)
@@ -210,16 +278,133 @@ class Session:
         await self.stop()
         await self.start()
 
-    async def handle_packet(self, packet):
-        data = await self.loop.run_in_executor(
-            hydrogram.crypto_executor,
-            mtproto.unpack,
-            BytesIO(packet),
-            self.session_id,
-            self.auth_key,
-            self.auth_key_id,
-        )
+    def record(self, stage: str, start: float):
+        elapsed = perf_counter() - start
+        times = self.stage_times[stage]
+        times[0] += 1
+        times[1] += elapsed
+        times[2] = max(times[2], elapsed)
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Queue depths and per-stage latency of the receive pipeline."""
+        stats: dict[str, Any] = {
+            "packets_queued": self.packets.qsize() if self.packets else 0,
+            "updates_queued": self.queued_updates,
+        }
+
+        for stage, (count, total, maximum) in self.stage_times.items():
+            stats[stage] = {
+                "count": count,
+                "average_time": total / count if count else 0.0,
+                "max_time": maximum,
+            }
+
+        return stats
+
+    async def process_worker(self):
+        while True:
+            item = await self.packets.get()
+
+            if item is None:
+                break
+
+            received, future = item
+
+            try:
+                data = await future
+            except SecurityCheckMismatch as e:
+                log.info("Discarding packet: %s", e)
+                await self.connection.close()
+                continue
+            except Exception as e:
+                log.exception(e)
+                continue
+
+            self.record("decrypt", received)
+
+            start = perf_counter()
+
+            try:
+                await self.handle_packet(data)
+            except Exception as e:
+                log.exception(e)
+
+            self.record("process", start)
+
+    @property
+    def queued_updates(self) -> int:
+        queued = self.updates.qsize() if self.updates else 0
+        return queued + sum(len(backlog) for backlog in self.update_backlogs.values())
+
+    @staticmethod
+    def get_update_box(updates: TLObject) -> int:
+        """Get the sequence box the updates belong to, or the common one if they span more."""
+        if isinstance(updates, raw.types.UpdateShort):
+            contained, seq = [updates.update], 0
+        elif isinstance(updates, (raw.types.Updates, raw.types.UpdatesCombined)):
+            contained, seq = updates.updates, updates.seq
+        else:
+            return COMMON
+
+        # Updates carrying a seq are checked against the common state as a whole
+        if seq:
+            return COMMON
+
+        sequences = filter(None, map(UpdatesManager.get_sequence, contained))
+        boxes = {sequence[0] for sequence in sequences}
+
+        return boxes.pop() if len(boxes) == 1 and QTS not in boxes else COMMON
+
+    async def update_worker(self, updates: asyncio.Queue):
+        while True:
+            item = await updates.get()
+            self.updates_room.set()
+
+            if item is None:
+                break
+
+            box = self.get_update_box(item[1])
+            backlog = self.update_backlogs.get(box)
+
+            # Another worker is handling updates of the same box, it will handle this one next
+            if backlog is not None:
+                backlog.append(item)
+                continue
+
+            backlog = self.update_backlogs[box] = deque([item])
+
+            try:
+                while backlog:
+                    received, update = backlog.popleft()
+                    self.updates_room.set()
+                    self.record("update_wait", received)
+
+                    start = perf_counter()
+
+                    try:
+                        await self.client.handle_updates(update)
+                    except Exception as e:
+                        log.exception(e)
+
+                    self.record("update", start)
+            finally:
+                del self.update_backlogs[box]
+
+    async def put_update(self, update: TLObject):
+        # Waiting for room is only safe while no request is waiting for a response: the update
+        # workers may be blocked on one of them, and responses are read by this same pipeline.
+        while (
+            self.queued_updates >= self.UPDATES_QUEUE_SIZE
+            and not self.results
+            and not self.is_stopping
+        ):
+            self.updates_room.clear()
+            await self.updates_room.wait()
+
+        self.updates.put_nowait((perf_counter(), update))
 
+    async def handle_packet(self, data: Message):
         messages = data.body.messages if isinstance(data.body, MsgContainer) else [data]
 
         log.debug("Received: %s", data)
@@ -281,7 +466,7 @@ class Session:
             elif isinstance(msg.body, raw.types.Pong):
                 msg_id = msg.body.msg_id
             elif self.client is not None:
-                self.loop.create_task(self.client.handle_updates(msg.body))
+                await self.put_update(msg.body)
 
             if msg_id in self.results:
                 self.results[msg_id].value = getattr(msg.body, "result", msg.body)
@@ -321,25 +506,40 @@ class Session:
     async def recv_worker(self):
         log.info("NetworkTask started")
 
-        while True:
-            packet = await self.connection.recv()
-
-            if packet is None or len(packet) == 4:
-                if packet:
-                    error_code = -Int.read(BytesIO(packet))
-
-                    log.warning(
-                        "Server sent transport error: %s (%s)",
-                        error_code,
-                        Session.TRANSPORT_ERRORS.get(error_code, "unknown error"),
-                    )
+        try:
+            while True:
+                packet = await self.connection.recv()
 
-                if self.is_started.is_set():
-                    self.loop.create_task(self.restart())
+                if packet is None or len(packet) == 4:
+                    if packet:
+                        error_code = -Int.read(BytesIO(packet))
 
-                break
+                        log.warning(
+                            "Server sent transport error: %s (%s)",
+                            error_code,
+                            Session.TRANSPORT_ERRORS.get(error_code, "unknown error"),
+                        )
 
-            self.loop.create_task(self.handle_packet(packet))
+                    if self.is_started.is_set():
+                        self.loop.create_task(self.restart())
+
+                    break
+
+                # Packets are decrypted in the crypto executor and processed in arrival order,
+                # while reading pauses whenever the processing falls behind
+                await self.packets.put((
+                    perf_counter(),
+                    self.loop.run_in_executor(
+                        hydrogram.crypto_executor,
+                        mtproto.unpack,
+                        BytesIO(packet),
+                        self.session_id,
+                        self.auth_key,
+                        self.auth_key_id,
+                    ),
+                ))
+        finally:
+            await self.packets.put(None)
 
         log.info("NetworkTask stopped")
 
@@ -351,6 +551,7 @@ class Session:
 
         if wait_response:
             self.results[msg_id] = Result()
+            self.updates_room.set()
 
         log.debug("Sent: %s", message)
 
@@ -18,6 +18,14 @@
 #  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
 
 from .base import BaseStorage
+from .redis_storage import RedisStorage
+from .shared_sqlite_storage import SharedPeerStore, SharedSQLiteStorage
 from .sqlite_storage import SQLiteStorage
 
-__all__ = ["BaseStorage", "SQLiteStorage"]
+__all__ = [
+    "BaseStorage",
+    "RedisStorage",
+    "SQLiteStorage",
+    "SharedPeerStore",
+    "SharedSQLiteStorage",
+]
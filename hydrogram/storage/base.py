@@ -208,6 +208,37 @@ class BaseStorage(ABC):
         """
         ...
 
+    async def update_state(
+        self, value: tuple[int, int, int, int, int] | int | object = object
+    ) -> list[tuple[int, int, int, int, int]] | None:
+        """Get, set or delete the saved update states.
+
+        The common state of the account is stored with id 0, while every channel has its own state
+        stored with the channel id. The default implementation keeps the states in memory only,
+        storage engines should override it in order to persist them.
+
+        Parameters:
+            value (``tuple`` | ``int``, *optional*):
+                A tuple of *(id, pts, qts, date, seq)* to store, or the id of a state to delete.
+
+        Returns:
+            ``list``: The stored states if no value is provided.
+        """
+        # Created on first use, subclasses may not call BaseStorage.__init__
+        states: dict[int, tuple[int, int, int, int, int]] = vars(self).setdefault(
+            "_update_states", {}
+        )
+
+        if value is object:
+            return list(states.values())
+
+        if isinstance(value, int):
+            states.pop(value, None)
+        else:
+            states[value[0]] = value
+
+        return None
+
     async def export_session_string(self) -> str:
         """Exports the session string for the current session.
 
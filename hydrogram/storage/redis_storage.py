@@ -0,0 +1,649 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import contextlib
+import logging
+import os
+import struct
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable
+
+from .base import BaseStorage, InputPeer
+from .sqlite_storage import get_input_peer
+
+log = logging.getLogger(__name__)
+
+
+class RedisError(Exception):
+    """Raised when the server replies with an error."""
+
+
+class RedisConnection:
+    """A minimal asyncio client speaking the Redis serialization protocol (RESP2).
+
+    Commands are written as soon as they are issued and replies are matched to callers in order,
+    so any number of coroutines can share one connection and their requests are pipelined.
+
+    Parameters:
+        host (``str``):
+            The server host.
+
+        port (``int``):
+            The server port.
+
+        password (``str``, *optional*):
+            The password sent with ``AUTH`` right after connecting.
+
+        db (``int``, *optional*):
+            The database index selected right after connecting.
+    """
+
+    def __init__(self, host: str, port: int, password: str | None = None, db: int = 0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.db = db
+
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        self.reader_task: asyncio.Task | None = None
+
+        self.waiters: deque[asyncio.Future] = deque()
+        self.on_message: Callable[[bytes, bytes], Any] | None = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.reader_task = asyncio.create_task(self.reader_worker())
+
+        if self.password:
+            await self.execute("AUTH", self.password)
+
+        if self.db:
+            await self.execute("SELECT", self.db)
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+            with contextlib.suppress(Exception):
+                await self.writer.wait_closed()
+
+            self.writer = None
+
+        if self.reader_task is not None:
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.reader_task
+
+            self.reader_task = None
+
+    @staticmethod
+    def encode(args: tuple) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif not isinstance(arg, (bytes, bytearray)):
+                arg = str(arg).encode()
+
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+
+        return b"".join(out)
+
+    async def read_reply(self) -> Any:
+        line = await self.reader.readline()
+
+        if not line:
+            raise ConnectionError("Connection closed by the server")
+
+        kind, value = line[:1], line[1:-2]
+
+        if kind == b"+":
+            return value.decode()
+        if kind == b"-":
+            return RedisError(value.decode())
+        if kind == b":":
+            return int(value)
+        if kind == b"$":
+            length = int(value)
+
+            if length < 0:
+                return None
+
+            return (await self.reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(value)
+
+            if length < 0:
+                return None
+
+            return [await self.read_reply() for _ in range(length)]
+
+        raise ConnectionError(f"Unknown reply type: {line!r}")
+
+    def handle_reply(self, reply: Any) -> None:
+        if self.on_message is not None and isinstance(reply, list) and reply[:1] == [b"message"]:
+            self.on_message(reply[1], reply[2])
+            return
+
+        if self.waiters:
+            waiter = self.waiters.popleft()
+
+            if not waiter.done():
+                waiter.set_result(reply)
+
+    async def reader_worker(self) -> None:
+        try:
+            while True:
+                self.handle_reply(await self.read_reply())
+        except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+            log.info("Redis connection lost: %s", e)
+        finally:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+
+            while self.waiters:
+                waiter = self.waiters.popleft()
+
+                if not waiter.done():
+                    waiter.set_exception(ConnectionError("Redis connection lost"))
+
+    def send(self, *commands: tuple) -> list[asyncio.Future]:
+        if not self.is_connected:
+            raise ConnectionError("Redis connection is not available")
+
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in commands]
+
+        self.waiters.extend(futures)
+        self.writer.write(b"".join(self.encode(c) for c in commands))
+
+        return futures
+
+    async def execute(self, *args) -> Any:
+        return (await self.pipeline(args))[0]
+
+    async def pipeline(self, *commands: tuple) -> list[Any]:
+        """Send all the commands in a single write and wait for all their replies."""
+        if not self.is_connected:
+            await self.connect()
+
+        replies = await asyncio.gather(*self.send(*commands))
+
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+
+        return replies
+
+
+class RedisStorage(BaseStorage):
+    """Storage engine keeping the session and the peers on a Redis compatible server.
+
+    Any worker can pick up a session by name and the peer cache is shared by every node connected
+    to the same server. Peers are keyed by the user id of the account they belong to.
+
+    Lookups go through an in-process near-cache first, so resolving known peers costs no round
+    trip. Cache misses issued in the same event loop iteration are merged into a single ``MGET``.
+    Writes are sent as one pipelined batch per :meth:`update_peers` call and announced on a
+    pub/sub channel so the other nodes can drop their stale near-cache entries.
+
+    Parameters:
+        name (``str``):
+            The name of the session.
+
+        host (``str``, *optional*):
+            The server host. Defaults to "localhost".
+
+        port (``int``, *optional*):
+            The server port. Defaults to 6379.
+
+        password (``str``, *optional*):
+            The server password, if any.
+
+        db (``int``, *optional*):
+            The database index. Defaults to 0.
+
+        prefix (``str``, *optional*):
+            A prefix for all the keys used by this engine. Defaults to "hydrogram".
+
+        session_string (``str``, *optional*):
+            A session string to load into the server.
+    """
+
+    USERNAME_TTL = 8 * 60 * 60
+    NEAR_CACHE_SIZE = 100_000
+    NEAR_CACHE_TTL = 5 * 60
+    # Seconds to wait before subscribing again after losing the pub/sub connection, doubled on
+    # each failed attempt
+    RECONNECT_DELAY = 1
+    MAX_RECONNECT_DELAY = 30
+
+    def __init__(
+        self,
+        name: str,
+        host: str = "localhost",
+        port: int = 6379,
+        password: str | None = None,
+        db: int = 0,
+        prefix: str = "hydrogram",
+        session_string: str | None = None,
+    ):
+        super().__init__(name)
+        self.prefix = prefix
+        self.session_string = session_string
+
+        self.conn = RedisConnection(host, port, password, db)
+        self.pubsub = RedisConnection(host, port, password, db)
+
+        self.node_id = os.urandom(8).hex()
+        self.owner_id = 0
+
+        # (owner_id, peer_id) -> (id, access_hash, type, username, phone_number, date, cached_at)
+        self.near_cache: OrderedDict[tuple[int, int], tuple] = OrderedDict()
+        self.usernames: dict[tuple[int, str], int] = {}
+        self.phone_numbers: dict[tuple[int, str], int] = {}
+
+        self.pending_lookups: dict[int, asyncio.Future] = {}
+        self.lookup_task: asyncio.Task | None = None
+        self.pubsub_task: asyncio.Task | None = None
+
+        self.stats = {"hits": 0, "misses": 0, "round_trips": 0, "invalidations": 0}
+
+    @property
+    def session_key(self) -> str:
+        return f"{self.prefix}:session:{self.name}"
+
+    @property
+    def state_key(self) -> str:
+        return f"{self.prefix}:state:{self.name}"
+
+    @property
+    def channel(self) -> str:
+        return f"{self.prefix}:invalidate"
+
+    def peer_key(self, peer_id: int) -> str:
+        return f"{self.prefix}:peer:{self.owner_id}:{peer_id}"
+
+    async def open(self) -> None:
+        await self.conn.connect()
+        await self.subscribe()
+
+        self.pubsub_task = asyncio.create_task(self.pubsub_worker())
+
+        await self.conn.execute("HSETNX", self.session_key, "dc_id", 2)
+        await self.conn.execute("HSETNX", self.session_key, "date", 0)
+
+        self.owner_id = await self.user_id() or 0
+
+        if self.session_string:
+            await self._load_session_string()
+
+    async def subscribe(self) -> None:
+        await self.pubsub.close()
+        await self.pubsub.connect()
+
+        self.pubsub.on_message = self.on_invalidation
+        await self.pubsub.execute("SUBSCRIBE", self.channel)
+
+    async def pubsub_worker(self) -> None:
+        """Subscribe again to the invalidations whenever the pub/sub connection is lost."""
+        while True:
+            await asyncio.wait({self.pubsub.reader_task})
+
+            # Invalidations published while disconnected are lost, the cached peers may be stale
+            self.clear_near_cache()
+            delay = self.RECONNECT_DELAY
+
+            while True:
+                await asyncio.sleep(delay)
+
+                try:
+                    await self.subscribe()
+                except (ConnectionError, OSError, RedisError) as e:
+                    log.info("Couldn't subscribe to %s again: %s", self.channel, e)
+                    delay = min(delay * 2, self.MAX_RECONNECT_DELAY)
+                else:
+                    break
+
+    def clear_near_cache(self) -> None:
+        self.near_cache.clear()
+        self.usernames.clear()
+        self.phone_numbers.clear()
+
+    async def _load_session_string(self) -> None:
+        dc_id, api_id, test_mode, auth_key, user_id, is_bot = struct.unpack(
+            self.SESSION_STRING_FORMAT,
+            base64.urlsafe_b64decode(self.session_string + "=" * (-len(self.session_string) % 4)),
+        )
+
+        await self.dc_id(dc_id)
+        await self.api_id(api_id)
+        await self.test_mode(test_mode)
+        await self.auth_key(auth_key)
+        await self.user_id(user_id)
+        await self.is_bot(is_bot)
+        await self.date(0)
+
+    async def save(self) -> None:
+        await self.date(int(time.time()))
+
+    async def close(self) -> None:
+        if self.pubsub_task is not None:
+            self.pubsub_task.cancel()
+
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.pubsub_task
+
+            self.pubsub_task = None
+
+        await self.pubsub.close()
+        await self.conn.close()
+
+        self.clear_near_cache()
+
+    async def delete(self) -> None:
+        if not self.conn.is_connected:
+            await self.conn.connect()
+
+        await self.conn.execute("DEL", self.session_key, self.state_key)
+
+    def on_invalidation(self, channel: bytes, data: bytes) -> None:
+        node_id, owner_id, *peer_ids = data.decode().split(":")
+
+        if node_id == self.node_id or int(owner_id) != self.owner_id:
+            return
+
+        for peer_id in peer_ids:
+            self.forget(int(owner_id), int(peer_id))
+
+        self.stats["invalidations"] += 1
+
+    def forget(self, owner_id: int, peer_id: int) -> None:
+        row = self.near_cache.pop((owner_id, peer_id), None)
+
+        if row is None:
+            return
+
+        if row[3] is not None:
+            self.usernames.pop((owner_id, row[3]), None)
+
+        if row[4] is not None:
+            self.phone_numbers.pop((owner_id, row[4]), None)
+
+    def remember(self, row: tuple) -> None:
+        peer_id, _, _, username, phone_number, _ = row
+        key = (self.owner_id, peer_id)
+
+        self.forget(*key)
+        self.near_cache[key] = (*row, time.monotonic())
+
+        if username is not None:
+            self.usernames[self.owner_id, username] = peer_id
+
+        if phone_number is not None:
+            self.phone_numbers[self.owner_id, phone_number] = peer_id
+
+        while len(self.near_cache) > self.NEAR_CACHE_SIZE:
+            self.forget(*next(iter(self.near_cache)))
+
+    def cached(self, peer_id: int | None) -> tuple | None:
+        row = self.near_cache.get((self.owner_id, peer_id))
+
+        if row is None:
+            return None
+
+        if time.monotonic() - row[6] > self.NEAR_CACHE_TTL:
+            self.forget(self.owner_id, peer_id)
+            return None
+
+        self.near_cache.move_to_end((self.owner_id, peer_id))
+        self.stats["hits"] += 1
+
+        return row
+
+    @staticmethod
+    def pack_peer(row: tuple) -> str:
+        # None is stored as an empty field, which no actual value is
+        return "|".join("" if v is None else str(v) for v in row)
+
+    @staticmethod
+    def unpack_peer(data: bytes) -> tuple:
+        peer_id, access_hash, peer_type, username, phone_number, date = data.decode().split("|")
+
+        return (
+            int(peer_id),
+            int(access_hash) if access_hash else None,
+            peer_type,
+            username or None,
+            phone_number or None,
+            int(date),
+        )
+
+    async def update_peers(
+        self, peers: list[tuple[int, int, str, str | None, str | None]]
+    ) -> None:
+        if not peers:
+            return
+
+        now = int(time.time())
+        commands = []
+
+        for peer_id, access_hash, peer_type, username, phone_number in peers:
+            row = (peer_id, access_hash, peer_type, username, phone_number, now)
+            self.remember(row)
+
+            commands.append(("SET", self.peer_key(peer_id), self.pack_peer(row)))
+
+            if username is not None:
+                commands.append((
+                    "SET",
+                    f"{self.prefix}:username:{self.owner_id}:{username}",
+                    peer_id,
+                ))
+
+            if phone_number is not None:
+                commands.append((
+                    "SET",
+                    f"{self.prefix}:phone:{self.owner_id}:{phone_number}",
+                    peer_id,
+                ))
+
+        commands.append((
+            "PUBLISH",
+            self.channel,
+            ":".join([self.node_id, str(self.owner_id), *(str(p[0]) for p in peers)]),
+        ))
+
+        self.stats["round_trips"] += 1
+        await self.conn.pipeline(*commands)
+
+    async def fetch_pending_lookups(self) -> None:
+        lookups, self.pending_lookups = self.pending_lookups, {}
+
+        try:
+            self.stats["round_trips"] += 1
+            (values,) = await self.conn.pipeline((
+                "MGET",
+                *(self.peer_key(peer_id) for peer_id in lookups),
+            ))
+        except Exception as e:
+            for future in lookups.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, value in zip(lookups.values(), values):
+            if future.done():
+                continue
+
+            # A malformed value must not leave the other lookups of the batch waiting forever
+            try:
+                row = None if value is None else self.unpack_peer(value)
+            except ValueError as e:
+                future.set_exception(e)
+                continue
+
+            if row is not None:
+                self.remember(row)
+
+            future.set_result(row)
+
+    async def fetch_peer(self, peer_id: int) -> tuple | None:
+        row = self.cached(peer_id)
+
+        if row is not None:
+            return row
+
+        self.stats["misses"] += 1
+        future = self.pending_lookups.get(peer_id)
+
+        if future is None:
+            # Misses issued before the lookup task gets to run are merged into the same MGET
+            if not self.pending_lookups:
+                self.lookup_task = asyncio.create_task(self.fetch_pending_lookups())
+
+            future = self.pending_lookups[peer_id] = asyncio.get_running_loop().create_future()
+
+        return await asyncio.shield(future)
+
+    async def fetch_indexed_peer(self, index: str, cache: dict, value: str) -> tuple | None:
+        peer_id = cache.get((self.owner_id, value))
+
+        if peer_id is None:
+            self.stats["round_trips"] += 1
+            peer_id = await self.conn.execute(
+                "GET", f"{self.prefix}:{index}:{self.owner_id}:{value}"
+            )
+
+            if peer_id is None:
+                return None
+
+        row = await self.fetch_peer(int(peer_id))
+
+        # The index may point to a peer that has changed username or phone number since
+        if row is None or value not in {row[3], row[4]}:
+            return None
+
+        return row
+
+    async def get_peer_by_id(self, peer_id: int) -> InputPeer:
+        r = await self.fetch_peer(peer_id)
+
+        if r is None:
+            raise KeyError(f"ID not found: {peer_id}")
+
+        return get_input_peer(*r[:3])
+
+    async def get_peer_by_username(self, username: str) -> InputPeer:
+        r = await self.fetch_indexed_peer("username", self.usernames, username)
+
+        if r is None:
+            raise KeyError(f"Username not found: {username}")
+
+        if abs(time.time() - r[5]) > self.USERNAME_TTL:
+            raise KeyError(f"Username expired: {username}")
+
+        return get_input_peer(*r[:3])
+
+    async def get_peer_by_phone_number(self, phone_number: str) -> InputPeer:
+        r = await self.fetch_indexed_peer("phone", self.phone_numbers, phone_number)
+
+        if r is None:
+            raise KeyError(f"Phone number not found: {phone_number}")
+
+        return get_input_peer(*r[:3])
+
+    async def update_state(
+        self, value: tuple[int, int, int, int, int] | int | object = object
+    ) -> list[tuple[int, int, int, int, int]] | None:
+        if value is object:
+            data = await self.conn.execute("HGETALL", self.state_key)
+
+            # Empty fields are missing values, as NULL columns are for SQLiteStorage
+            return [
+                (int(state_id), *(int(v) if v else None for v in state.split(b"|")))
+                for state_id, state in zip(data[::2], data[1::2])
+            ]
+
+        if isinstance(value, int):
+            await self.conn.execute("HDEL", self.state_key, value)
+        else:
+            await self.conn.execute(
+                "HSET",
+                self.state_key,
+                value[0],
+                "|".join("" if v is None else str(v) for v in value[1:]),
+            )
+
+        return None
+
+    async def _accessor(self, attr: str, value: Any = object, kind: type = int) -> Any | None:
+        if value is object:
+            data = await self.conn.execute("HGET", self.session_key, attr)
+
+            if data is None:
+                return None
+
+            if kind is bytes:
+                return data
+
+            return kind(int(data))
+
+        if value is None:
+            await self.conn.execute("HDEL", self.session_key, attr)
+        else:
+            await self.conn.execute(
+                "HSET", self.session_key, attr, value if kind is bytes else int(value)
+            )
+
+        return None
+
+    async def dc_id(self, value: int | object = object) -> int | None:
+        return await self._accessor("dc_id", value)
+
+    async def api_id(self, value: int | object = object) -> int | None:
+        return await self._accessor("api_id", value)
+
+    async def test_mode(self, value: bool | object = object) -> bool | None:
+        return await self._accessor("test_mode", value, bool)
+
+    async def auth_key(self, value: bytes | object = object) -> bytes | None:
+        return await self._accessor("auth_key", value, bytes)
+
+    async def date(self, value: int | object = object) -> int | None:
+        return await self._accessor("date", value)
+
+    async def user_id(self, value: int | object = object) -> int | None:
+        if value is not object:
+            self.owner_id = value or 0
+
+        return await self._accessor("user_id", value)
+
+    async def is_bot(self, value: bool | object = object) -> bool | None:
+        return await self._accessor("is_bot", value, bool)
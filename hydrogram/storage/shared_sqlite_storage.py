@@ -0,0 +1,428 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import contextlib
+import logging
+import struct
+import time
+from pathlib import Path
+from typing import Any
+
+import aiosqlite
+
+from .base import BaseStorage, InputPeer
+from .sqlite_storage import get_input_peer
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE sessions
+(
+    name      TEXT PRIMARY KEY,
+    dc_id     INTEGER,
+    api_id    INTEGER,
+    test_mode INTEGER,
+    auth_key  BLOB,
+    date      INTEGER NOT NULL,
+    user_id   INTEGER,
+    is_bot    INTEGER
+);
+
+CREATE TABLE peers
+(
+    owner_id       INTEGER NOT NULL,
+    id             INTEGER NOT NULL,
+    access_hash    INTEGER,
+    type           INTEGER NOT NULL,
+    username       TEXT,
+    phone_number   TEXT,
+    last_update_on INTEGER NOT NULL,
+    PRIMARY KEY (owner_id, id)
+);
+
+CREATE TABLE update_state
+(
+    name TEXT    NOT NULL,
+    id   INTEGER NOT NULL,
+    pts  INTEGER,
+    qts  INTEGER,
+    date INTEGER,
+    seq  INTEGER,
+    PRIMARY KEY (name, id)
+);
+
+CREATE TABLE version
+(
+    number INTEGER PRIMARY KEY
+);
+
+CREATE INDEX idx_peers_username ON peers (owner_id, username);
+CREATE INDEX idx_peers_phone_number ON peers (owner_id, phone_number);
+"""
+
+
+class SharedPeerStore:
+    """A single SQLite database shared by many :obj:`~hydrogram.storage.SharedSQLiteStorage`.
+
+    All the clients using the same store share one connection (and therefore one database thread
+    and one file descriptor), no matter how many of them are running in the process. Peers are
+    keyed by the user id of the account that owns the session together with the peer id, because
+    access hashes are only valid for the account that received them.
+
+    Peer writes coming from all the clients are merged in memory and written to disk in batches,
+    either every ``FLUSH_INTERVAL`` seconds or as soon as ``FLUSH_THRESHOLD`` peers are pending.
+
+    Parameters:
+        database (``str`` | ``Path``, *optional*):
+            The path of the database file. Defaults to ":memory:".
+    """
+
+    VERSION = 1
+    FLUSH_INTERVAL = 1
+    FLUSH_THRESHOLD = 1000
+
+    def __init__(self, database: str | Path = ":memory:"):
+        self.database: str | Path = database if database == ":memory:" else Path(database)
+        self.conn: aiosqlite.Connection | None = None
+
+        self.pending: dict[tuple[int, int], tuple] = {}
+
+        self.users = 0
+        self.lock = asyncio.Lock()
+
+        self.flush_task: asyncio.Task | None = None
+        self.flush_event = asyncio.Event()
+        self.is_closing = False
+
+    async def acquire(self) -> aiosqlite.Connection:
+        async with self.lock:
+            if self.conn is None:
+                path = self.database
+                file_exists = isinstance(path, Path) and path.is_file()
+
+                self.conn = await aiosqlite.connect(self.database)
+
+                await self.conn.execute("PRAGMA journal_mode=WAL")
+
+                if not file_exists:
+                    await self.conn.executescript(SCHEMA)
+                    await self.conn.execute("INSERT INTO version VALUES (?)", (self.VERSION,))
+
+                await self.conn.commit()
+
+                self.is_closing = False
+                self.flush_task = asyncio.create_task(self.flush_worker())
+
+            self.users += 1
+
+            return self.conn
+
+    async def release(self) -> None:
+        async with self.lock:
+            self.users -= 1
+
+            if self.users > 0 or self.conn is None:
+                return
+
+            self.is_closing = True
+            self.flush_event.set()
+
+            if self.flush_task is not None:
+                await self.flush_task
+                self.flush_task = None
+
+            await self.conn.close()
+
+            self.conn = None
+
+    def put_peers(self, owner_id: int, peers: list[tuple[int, int, str, str | None, str | None]]):
+        now = int(time.time())
+
+        for peer_id, access_hash, peer_type, username, phone_number in peers:
+            self.pending[owner_id, peer_id] = (
+                owner_id,
+                peer_id,
+                access_hash,
+                peer_type,
+                username,
+                phone_number,
+                now,
+            )
+
+        if len(self.pending) >= self.FLUSH_THRESHOLD:
+            self.flush_event.set()
+
+    def get_pending(self, owner_id: int, column: int, value: Any) -> tuple | None:
+        # The pending buffer is bounded by FLUSH_THRESHOLD, a linear scan is fine here
+        if column == 1:
+            return self.pending.get((owner_id, value))
+
+        for row in reversed(self.pending.values()):
+            if row[0] == owner_id and row[column] == value:
+                return row
+
+        return None
+
+    async def flush(self) -> None:
+        if not self.pending or self.conn is None:
+            return
+
+        # Rows stay pending until committed, so that they are neither lost if the flush fails nor
+        # missing from lookups made in the meantime
+        rows = dict(self.pending)
+
+        await self.conn.executemany(
+            "REPLACE INTO peers "
+            "(owner_id, id, access_hash, type, username, phone_number, last_update_on) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows.values(),
+        )
+        await self.conn.commit()
+
+        # Peers updated again during the flush are left for the next one
+        for key, row in rows.items():
+            if self.pending.get(key) is row:
+                del self.pending[key]
+
+        log.debug("Flushed %s peers", len(rows))
+
+    async def flush_worker(self) -> None:
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.flush_event.wait(), self.FLUSH_INTERVAL)
+
+            self.flush_event.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                log.exception(e)
+
+            if self.is_closing:
+                break
+
+
+class SharedSQLiteStorage(BaseStorage):
+    """Storage engine keeping sessions and peers in a :obj:`~hydrogram.storage.SharedPeerStore`.
+
+    Use it when running many clients in the same process: every client gets its own instance of
+    this engine, while all of them share a single store.
+
+    Parameters:
+        name (``str``):
+            The name of the session. Must be unique inside the store.
+
+        store (:obj:`~hydrogram.storage.SharedPeerStore`):
+            The store shared by all the clients.
+
+        session_string (``str``, *optional*):
+            A session string to load into the store.
+    """
+
+    USERNAME_TTL = 8 * 60 * 60
+
+    def __init__(self, name: str, store: SharedPeerStore, session_string: str | None = None):
+        super().__init__(name)
+        self.store = store
+        self.session_string = session_string
+        self.conn: aiosqlite.Connection | None = None
+        self.owner_id = 0
+
+    async def open(self) -> None:
+        self.conn = await self.store.acquire()
+
+        await self.conn.execute(
+            "INSERT OR IGNORE INTO sessions (name, dc_id, date) VALUES (?, ?, ?)",
+            (self.name, 2, 0),
+        )
+        await self.conn.commit()
+
+        self.owner_id = await self.user_id() or 0
+
+        if self.session_string:
+            await self._load_session_string()
+
+    async def _load_session_string(self) -> None:
+        dc_id, api_id, test_mode, auth_key, user_id, is_bot = struct.unpack(
+            self.SESSION_STRING_FORMAT,
+            base64.urlsafe_b64decode(self.session_string + "=" * (-len(self.session_string) % 4)),
+        )
+
+        await self.dc_id(dc_id)
+        await self.api_id(api_id)
+        await self.test_mode(test_mode)
+        await self.auth_key(auth_key)
+        await self.user_id(user_id)
+        await self.is_bot(is_bot)
+        await self.date(0)
+
+    async def save(self) -> None:
+        if not self.conn:
+            logging.warning("Database connection is not available.")
+            return
+
+        await self.date(int(time.time()))
+        await self.store.flush()
+
+    async def close(self) -> None:
+        if self.conn:
+            self.conn = None
+            await self.store.release()
+
+    async def delete(self) -> None:
+        conn = self.conn or await self.store.acquire()
+
+        try:
+            await conn.execute("DELETE FROM sessions WHERE name = ?", (self.name,))
+            await conn.execute("DELETE FROM update_state WHERE name = ?", (self.name,))
+            await conn.commit()
+        finally:
+            if self.conn is None:
+                await self.store.release()
+
+    async def update_peers(
+        self, peers: list[tuple[int, int, str, str | None, str | None]]
+    ) -> None:
+        if not self.conn:
+            logging.warning("Database connection is not available.")
+            return
+
+        self.store.put_peers(self.owner_id, peers)
+
+    async def _get_peer(self, column: str, index: int, value: Any) -> tuple | None:
+        row = self.store.get_pending(self.owner_id, index, value)
+
+        if row is not None:
+            return row[1], row[2], row[3], row[6]
+
+        q = await self.conn.execute(
+            "SELECT id, access_hash, type, last_update_on FROM peers "
+            f"WHERE owner_id = ? AND {column} = ? "
+            "ORDER BY last_update_on DESC",
+            (self.owner_id, value),
+        )
+        return await q.fetchone()
+
+    async def get_peer_by_id(self, peer_id: int) -> InputPeer | None:
+        if not self.conn:
+            logging.warning("Database connection is not available.")
+            return None
+
+        r = await self._get_peer("id", 1, peer_id)
+        if not r:
+            raise KeyError(f"ID not found: {peer_id}")
+
+        return get_input_peer(*r[:3])
+
+    async def get_peer_by_username(self, username: str) -> InputPeer | None:
+        if not self.conn:
+            logging.warning("Database connection is not available.")
+            return None
+
+        r = await self._get_peer("username", 4, username)
+        if not r:
+            raise KeyError(f"Username not found: {username}")
+
+        if abs(time.time() - r[3]) > self.USERNAME_TTL:
+            raise KeyError(f"Username expired: {username}")
+
+        return get_input_peer(*r[:3])
+
+    async def get_peer_by_phone_number(self, phone_number: str) -> InputPeer | None:
+        if not self.conn:
+            logging.warning("Database connection is not available.")
+            return None
+
+        r = await self._get_peer("phone_number", 5, phone_number)
+        if not r:
+            raise KeyError(f"Phone number not found: {phone_number}")
+
+        return get_input_peer(*r[:3])
+
+    async def update_state(
+        self, value: tuple[int, int, int, int, int] | int | object = object
+    ) -> list[tuple[int, int, int, int, int]] | None:
+        if not self.conn:
+            logging.warning("Database connection is not available.")
+            return None
+
+        if value is object:
+            q = await self.conn.execute(
+                "SELECT id, pts, qts, date, seq FROM update_state WHERE name = ?", (self.name,)
+            )
+            return await q.fetchall()
+
+        if isinstance(value, int):
+            await self.conn.execute(
+                "DELETE FROM update_state WHERE name = ? AND id = ?", (self.name, value)
+            )
+        else:
+            await self.conn.execute(
+                "REPLACE INTO update_state (name, id, pts, qts, date, seq) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.name, *value),
+            )
+
+        await self.conn.commit()
+        return None
+
+    async def _accessor(self, attr: str, value: Any = object) -> Any | None:
+        if not self.conn:
+            logging.warning("Database connection is not available.")
+            return None
+
+        if value is object:
+            q = await self.conn.execute(
+                f"SELECT {attr} FROM sessions WHERE name = ?", (self.name,)
+            )
+            row = await q.fetchone()
+            return row[0] if row else None
+
+        await self.conn.execute(
+            f"UPDATE sessions SET {attr} = ? WHERE name = ?", (value, self.name)
+        )
+        await self.conn.commit()
+        return None
+
+    async def dc_id(self, value: int | object = object) -> int | None:
+        return await self._accessor("dc_id", value)
+
+    async def api_id(self, value: int | object = object) -> int | None:
+        return await self._accessor("api_id", value)
+
+    async def test_mode(self, value: bool | object = object) -> bool | None:
+        return await self._accessor("test_mode", value)
+
+    async def auth_key(self, value: bytes | object = object) -> bytes | None:
+        return await self._accessor("auth_key", value)
+
+    async def date(self, value: int | object = object) -> int | None:
+        return await self._accessor("date", value)
+
+    async def user_id(self, value: int | object = object) -> int | None:
+        if value is not object:
+            self.owner_id = value or 0
+
+        return await self._accessor("user_id", value)
+
+    async def is_bot(self, value: bool | object = object) -> bool | None:
+        return await self._accessor("is_bot", value)
@@ -54,6 +54,15 @@ CREATE TABLE peers
     last_update_on INTEGER NOT NULL DEFAULT (CAST(STRFTIME('%s', 'now') AS INTEGER))
 );
 
+CREATE TABLE update_state
+(
+    id   INTEGER PRIMARY KEY,
+    pts  INTEGER,
+    qts  INTEGER,
+    date INTEGER,
+    seq  INTEGER
+);
+
 CREATE TABLE version
 (
     number INTEGER PRIMARY KEY
@@ -87,7 +96,7 @@ def get_input_peer(peer_id: int, access_hash: int, peer_type: str) -> InputPeer:
 
 
 class SQLiteStorage(BaseStorage):
-    VERSION = 3
+    VERSION = 4
     USERNAME_TTL = 8 * 60 * 60
     FILE_EXTENSION = ".session"
 
@@ -122,6 +131,13 @@ class SQLiteStorage(BaseStorage):
             await self.conn.execute("ALTER TABLE sessions ADD api_id INTEGER")
             version += 1
 
+        if version == 3:
+            await self.conn.execute(
+                "CREATE TABLE update_state "
+                "(id INTEGER PRIMARY KEY, pts INTEGER, qts INTEGER, date INTEGER, seq INTEGER)"
+            )
+            version += 1
+
         await self.version(version)
         await self.conn.commit()
 
@@ -260,6 +276,27 @@ class SQLiteStorage(BaseStorage):
 
         return get_input_peer(*r)
 
+    async def update_state(
+        self, value: tuple[int, int, int, int, int] | int | object = object
+    ) -> list[tuple[int, int, int, int, int]] | None:
+        if not self.conn:
+            logging.warning("Database connection is not available.")
+            return None
+
+        if value is object:
+            q = await self.conn.execute("SELECT id, pts, qts, date, seq FROM update_state")
+            return await q.fetchall()
+
+        if isinstance(value, int):
+            await self.conn.execute("DELETE FROM update_state WHERE id = ?", (value,))
+        else:
+            await self.conn.execute(
+                "REPLACE INTO update_state (id, pts, qts, date, seq) VALUES (?, ?, ?, ?, ?)", value
+            )
+
+        await self.conn.commit()
+        return None
+
     async def _get(self, attr: str) -> Any:
         if not self.conn:
             logging.warning("Database connection is not available.")
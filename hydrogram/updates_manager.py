@@ -0,0 +1,462 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from operator import itemgetter
+from typing import TYPE_CHECKING
+
+from hydrogram import raw, utils
+from hydrogram.errors import ChannelInvalid, ChannelPrivate
+
+if TYPE_CHECKING:
+    import hydrogram
+
+log = logging.getLogger(__name__)
+
+# Sequence boxes: the common pts box of the account (also used as id of the common state in the
+# storage), the qts box and one pts box per channel, keyed by the raw channel id.
+COMMON = 0
+QTS = -1
+
+
+class UpdatesManager:
+    """Keeps track of the update state of the account and recovers missed updates.
+
+    Every update carrying a *pts* (or *qts*) is checked against the local state of its box. Updates
+    arriving out of order are buffered for up to ``GAP_TIMEOUT`` seconds; if the gap is still there
+    after that, the missing updates are fetched with ``updates.GetDifference`` (common box) or
+    ``updates.GetChannelDifference`` (channel boxes) and dispatched before the buffered ones.
+
+    Counters about gaps and recoveries are available in :attr:`stats`.
+    """
+
+    GAP_TIMEOUT = 0.5
+    SAVE_INTERVAL = 60
+    CHANNEL_DIFFERENCE_LIMIT = 100
+    BOT_CHANNEL_DIFFERENCE_LIMIT = 100000
+
+    def __init__(self, client: hydrogram.Client):
+        self.client = client
+
+        self.pts: int | None = None
+        self.qts: int | None = None
+        self.date: int | None = None
+        self.seq: int | None = None
+        self.channels: dict[int, int] = {}
+
+        self.pending: dict[int, list[tuple[int, int, raw.base.Update, dict, dict]]] = {}
+        # Seqs skipped by the updates received so far, the common box has a gap while not empty
+        self.missing_seqs: set[int] = set()
+        self.gap_timers: dict[int, asyncio.TimerHandle] = {}
+        self.recoveries: dict[int, asyncio.Task] = {}
+        self.recovery_requested: set[int] = set()
+
+        self.dirty: set[int] = set()
+        self.save_task: asyncio.Task | None = None
+
+        self.stats = {
+            "gaps": 0,
+            "recoveries": 0,
+            "recovered_updates": 0,
+            "recovery_time": 0.0,
+            "failed_recoveries": 0,
+            "duplicates": 0,
+            "buffered": 0,
+            "too_long": 0,
+        }
+
+    async def start(self):
+        """Load the saved state and, with ``catch_up`` enabled, fetch what was missed meanwhile."""
+        # Storage engines may have nothing to return, e.g.: when not connected
+        states = await self.client.storage.update_state() or []
+        common = next((s for s in states if s[0] == COMMON), None)
+
+        if self.client.catch_up and common is not None:
+            _, self.pts, self.qts, self.date, self.seq = common
+            self.channels = {s[0]: s[1] for s in states if s[0] != COMMON}
+
+            log.info("Catching up from pts %s (%s channels)", self.pts, len(self.channels))
+            self.recover(COMMON)
+        else:
+            self.set_state(await self.client.invoke(raw.functions.updates.GetState()))
+
+            for state in states:
+                if state[0] != COMMON:
+                    await self.client.storage.update_state(state[0])
+
+        self.save_task = asyncio.create_task(self.save_worker())
+
+    async def stop(self):
+        for timer in self.gap_timers.values():
+            timer.cancel()
+
+        self.gap_timers.clear()
+
+        tasks = list(self.recoveries.values())
+
+        if self.save_task is not None:
+            tasks.append(self.save_task)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.save_task = None
+
+        await self.save()
+
+    async def save(self):
+        dirty, self.dirty = self.dirty, set()
+
+        for box in dirty:
+            if box == COMMON:
+                await self.client.storage.update_state((
+                    COMMON,
+                    self.pts,
+                    self.qts,
+                    self.date,
+                    self.seq,
+                ))
+            elif box in self.channels:
+                await self.client.storage.update_state((box, self.channels[box], None, None, None))
+            else:
+                await self.client.storage.update_state(box)
+
+    async def save_worker(self):
+        while True:
+            await asyncio.sleep(self.SAVE_INTERVAL)
+
+            try:
+                await self.save()
+            except Exception as e:
+                log.exception(e)
+
+    def set_state(self, state: raw.types.updates.State):
+        self.pts = state.pts
+        self.qts = state.qts
+        self.date = state.date
+        self.seq = state.seq
+        self.missing_seqs.clear()
+        self.dirty.add(COMMON)
+
+    def get_local(self, box: int) -> int | None:
+        if box == COMMON:
+            return self.pts
+
+        if box == QTS:
+            return self.qts
+
+        return self.channels.get(box)
+
+    def set_local(self, box: int, value: int):
+        if box == COMMON:
+            self.pts = value
+        elif box == QTS:
+            self.qts = value
+        else:
+            self.channels[box] = value
+
+        self.dirty.add(COMMON if box == QTS else box)
+
+    @staticmethod
+    def get_sequence(update: raw.base.Update) -> tuple[int, int, int] | None:
+        pts = getattr(update, "pts", None)
+        pts_count = getattr(update, "pts_count", None)
+
+        if pts is None or pts_count is None:
+            qts = getattr(update, "qts", None)
+
+            return None if qts is None else (QTS, qts, 1)
+
+        channel_id = getattr(
+            getattr(getattr(update, "message", None), "peer_id", None), "channel_id", None
+        ) or getattr(update, "channel_id", None)
+
+        return (channel_id or COMMON), pts, pts_count
+
+    def is_duplicate(self, pts: int, pts_count: int, box: int = COMMON) -> bool:
+        local = self.get_local(box)
+        return local is not None and local + pts_count > pts
+
+    async def dispatch(self, update: raw.base.Update, users: dict, chats: dict):
+        await self.client.dispatcher.updates_queue.put((update, users, chats))
+
+    async def feed(self, update: raw.base.Update, users: dict, chats: dict):
+        """Check the sequence of a single update and dispatch it when its turn comes."""
+        if isinstance(update, raw.types.UpdateChannelTooLong):
+            self.stats["too_long"] += 1
+
+            if update.channel_id in self.channels:
+                self.recover(update.channel_id)
+            else:
+                log.info("Channel %s has updates to fetch but no known state", update.channel_id)
+
+            return
+
+        sequence = self.get_sequence(update)
+
+        if sequence is None:
+            await self.dispatch(update, users, chats)
+            return
+
+        box, pts, pts_count = sequence
+        local = self.get_local(box)
+
+        if (COMMON if box == QTS else box) in self.recoveries:
+            self.buffer(box, pts, pts_count, update, users, chats)
+        elif local is None or local + pts_count == pts:
+            self.set_local(box, pts)
+            await self.dispatch(update, users, chats)
+            await self.drain(box)
+        elif local + pts_count > pts:
+            self.stats["duplicates"] += 1
+        else:
+            self.buffer(box, pts, pts_count, update, users, chats)
+            self.schedule(box)
+
+    def check_seq(self, updates: raw.types.Updates | raw.types.UpdatesCombined):
+        seq_start = getattr(updates, "seq_start", updates.seq)
+
+        if updates.seq and self.seq is not None and seq_start > self.seq + 1:
+            log.debug("Seq gap: local %s, remote %s", self.seq, seq_start)
+            self.missing_seqs.update(range(self.seq + 1, seq_start))
+            self.schedule(COMMON)
+
+    def commit_seq(self, updates: raw.types.Updates | raw.types.UpdatesCombined):
+        if updates.seq:
+            seq_start = getattr(updates, "seq_start", updates.seq)
+
+            self.missing_seqs.difference_update(range(seq_start, updates.seq + 1))
+            self.seq = max(self.seq or 0, updates.seq)
+            self.date = updates.date
+            self.dirty.add(COMMON)
+            self.close_gap(COMMON)
+
+    def buffer(self, box: int, pts: int, pts_count: int, update, users: dict, chats: dict):
+        self.pending.setdefault(box, []).append((pts, pts_count, update, users, chats))
+        self.stats["buffered"] += 1
+
+    async def drain(self, box: int, force: bool = False):
+        pending = self.pending.get(box)
+
+        if not pending:
+            self.close_gap(box)
+            return
+
+        pending.sort(key=itemgetter(0))
+
+        while pending:
+            pts, pts_count, update, users, chats = pending[0]
+            local = self.get_local(box)
+
+            if local is not None and local + pts_count > pts:
+                self.stats["duplicates"] += 1
+            elif local is None or local + pts_count == pts or force:
+                self.set_local(box, pts)
+                await self.dispatch(update, users, chats)
+            else:
+                return
+
+            pending.pop(0)
+
+        del self.pending[box]
+
+        self.close_gap(box)
+
+    def close_gap(self, box: int):
+        """Cancel the recovery scheduled for a box, unless it's still waiting for updates."""
+        if self.pending.get(box) or (box == COMMON and self.missing_seqs):
+            return
+
+        timer = self.gap_timers.pop(box, None)
+
+        if timer is not None:
+            timer.cancel()
+
+    def schedule(self, box: int):
+        if box not in self.gap_timers and box not in self.recoveries:
+            self.gap_timers[box] = asyncio.get_running_loop().call_later(
+                self.GAP_TIMEOUT, self.on_gap_timeout, box
+            )
+
+    def on_gap_timeout(self, box: int):
+        self.gap_timers.pop(box, None)
+        self.stats["gaps"] += 1
+        self.recover(box)
+
+    def recover(self, box: int):
+        if box == QTS:
+            box = COMMON
+
+        if box in self.recoveries:
+            self.recovery_requested.add(box)
+            return
+
+        self.recoveries[box] = asyncio.create_task(self.run_recovery(box))
+
+    async def run_recovery(self, box: int):
+        start = time.monotonic()
+
+        try:
+            await self.fetch_missing(box)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failed_recoveries"] += 1
+            log.exception(e)
+        else:
+            self.stats["recoveries"] += 1
+            self.stats["recovery_time"] += time.monotonic() - start
+        finally:
+            del self.recoveries[box]
+
+        # Whatever is still buffered after the recovery is newer than the state returned by the
+        # server, so it's applied in order regardless of holes.
+        for pending_box in (COMMON, QTS) if box == COMMON else (box,):
+            await self.drain(pending_box, force=True)
+
+    async def fetch_missing(self, box: int):
+        while True:
+            self.recovery_requested.discard(box)
+
+            if box == COMMON:
+                await self.get_difference()
+            else:
+                await self.get_channel_difference(box)
+
+            if box not in self.recovery_requested:
+                return
+
+    async def get_difference(self):
+        if self.pts is None:
+            self.set_state(await self.client.invoke(raw.functions.updates.GetState()))
+            return
+
+        while True:
+            diff = await self.client.invoke(
+                raw.functions.updates.GetDifference(
+                    pts=self.pts,
+                    date=self.date,
+                    qts=self.qts if self.qts is not None else -1,
+                )
+            )
+
+            if isinstance(diff, raw.types.updates.DifferenceEmpty):
+                self.date = diff.date
+                self.seq = diff.seq
+                self.missing_seqs.clear()
+                self.dirty.add(COMMON)
+                return
+
+            if isinstance(diff, raw.types.updates.DifferenceTooLong):
+                log.warning("Too many updates missed, skipping to pts %s", diff.pts)
+                self.stats["too_long"] += 1
+                self.set_local(COMMON, diff.pts)
+                return
+
+            await self.client.fetch_peers(diff.users)
+            await self.client.fetch_peers(diff.chats)
+
+            users = {u.id: u for u in diff.users}
+            chats = {c.id: c for c in diff.chats}
+
+            for message in diff.new_messages:
+                await self.dispatch(
+                    raw.types.UpdateNewMessage(message=message, pts=0, pts_count=0), users, chats
+                )
+
+            for update in diff.other_updates:
+                if isinstance(update, raw.types.UpdateChannelTooLong):
+                    await self.feed(update, users, chats)
+                else:
+                    await self.dispatch(update, users, chats)
+
+            self.stats["recovered_updates"] += len(diff.new_messages) + len(diff.other_updates)
+
+            if isinstance(diff, raw.types.updates.Difference):
+                self.set_state(diff.state)
+                return
+
+            self.set_state(diff.intermediate_state)
+
+    async def get_channel_difference(self, channel_id: int):
+        pts = self.channels.get(channel_id)
+
+        if pts is None:
+            return
+
+        peer = await self.client.resolve_peer(utils.get_channel_id(channel_id))
+        channel = raw.types.InputChannel(channel_id=peer.channel_id, access_hash=peer.access_hash)
+        limit = (
+            self.BOT_CHANNEL_DIFFERENCE_LIMIT
+            if self.client.me and self.client.me.is_bot
+            else self.CHANNEL_DIFFERENCE_LIMIT
+        )
+
+        while True:
+            try:
+                diff = await self.client.invoke(
+                    raw.functions.updates.GetChannelDifference(
+                        channel=channel,
+                        filter=raw.types.ChannelMessagesFilterEmpty(),
+                        pts=self.channels[channel_id],
+                        limit=limit,
+                    )
+                )
+            except (ChannelPrivate, ChannelInvalid):
+                log.info("Channel %s is no longer accessible, dropping its state", channel_id)
+                self.channels.pop(channel_id, None)
+                self.pending.pop(channel_id, None)
+                self.dirty.add(channel_id)
+                return
+
+            if isinstance(diff, raw.types.updates.ChannelDifferenceEmpty):
+                self.set_local(channel_id, diff.pts)
+            elif isinstance(diff, raw.types.updates.ChannelDifferenceTooLong):
+                log.warning("Too many updates missed in channel %s, skipping them", channel_id)
+                self.stats["too_long"] += 1
+                await self.client.fetch_peers(diff.users)
+                await self.client.fetch_peers(diff.chats)
+                self.set_local(channel_id, diff.dialog.pts)
+            else:
+                await self.client.fetch_peers(diff.users)
+                await self.client.fetch_peers(diff.chats)
+
+                users = {u.id: u for u in diff.users}
+                chats = {c.id: c for c in diff.chats}
+
+                for message in diff.new_messages:
+                    await self.dispatch(
+                        raw.types.UpdateNewChannelMessage(message=message, pts=0, pts_count=0),
+                        users,
+                        chats,
+                    )
+
+                for update in diff.other_updates:
+                    await self.dispatch(update, users, chats)
+
+                self.stats["recovered_updates"] += len(diff.new_messages) + len(diff.other_updates)
+                self.set_local(channel_id, diff.pts)
+
+            if diff.final:
+                return
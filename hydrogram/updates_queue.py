@@ -0,0 +1,434 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-2023 Dan <https://github.com/delivrance>
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import sys
+import time
+from collections import Counter, deque
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+from hydrogram import enums
+
+log = logging.getLogger(__name__)
+
+
+class Entry:
+    __slots__ = ("enqueued_at", "item", "key", "level", "order_key", "timer")
+
+    def __init__(self, item: Any, key: Hashable | None, level: int):
+        self.enqueued_at = time.perf_counter()
+        self.item = item
+        self.key = key
+        self.level = level
+        self.order_key: Hashable | None = None
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class UpdatesQueue:
+    """A bounded queue of updates served by priority.
+
+    Updates are served from the most important priority class first (lowest number) and in FIFO
+    order within the same class. When the queue is full, ``overflow_policy`` decides whether the
+    producer waits, the oldest update is dropped or the least important update is shed.
+
+    ``None`` (the stop signal of the workers) is never subject to the bound and is served after
+    every update already queued.
+
+    When a ``coalesce`` function is given, an update with the same key of one still waiting in the
+    queue replaces it instead of being queued again, so that only the newest state is served. With
+    a ``debounce`` window, such updates wait that long before being served, to let more of them be
+    merged. Updates waiting for their window count against the bound like any other.
+
+    When an ``ordering`` function is given, updates with the same ordering key (e.g.: of the same
+    chat) are always served in the order they were queued: priority classes only reorder updates
+    with different keys, an update never overtakes an earlier one with the same key.
+
+    The queue has the same interface as :class:`asyncio.Queue`.
+
+    Parameters:
+        maxsize (``int``, *optional*):
+            Maximum amount of queued updates. Defaults to 0 (unbounded).
+
+        overflow_policy (:obj:`~hydrogram.enums.OverflowPolicy`, *optional*):
+            What to do when the queue is full. Defaults to ``OverflowPolicy.BLOCK``.
+
+        priority (``Callable``, *optional*):
+            A function that takes a queued item and returns its priority class.
+            Defaults to every item having :attr:`NORMAL` priority.
+
+        coalesce (``Callable``, *optional*):
+            A function that takes a queued item and returns its key, or None for items that are
+            never merged. Defaults to no item being merged.
+
+        debounce (``float``, *optional*):
+            Seconds items with a key wait before being served. Defaults to 0.
+
+        ordering (``Callable``, *optional*):
+            A function that takes a queued item and returns its ordering key, or None for items
+            that can be served in any order. Defaults to no ordering.
+    """
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+    STOP = sys.maxsize
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        overflow_policy: enums.OverflowPolicy = enums.OverflowPolicy.BLOCK,
+        priority: Callable[[Any], int] | None = None,
+        coalesce: Callable[[Any], Hashable | None] | None = None,
+        debounce: float = 0,
+        ordering: Callable[[Any], Hashable | None] | None = None,
+    ):
+        self.maxsize = maxsize
+        self.overflow_policy = overflow_policy
+        self.priority = priority or (lambda _: self.NORMAL)
+        self.coalesce = coalesce
+        self.debounce = debounce
+        self.ordering = ordering
+
+        # Entries ready to be served, by priority class, sorted from the most important one
+        self.queues: dict[int, deque[Entry]] = {}
+        # Entries not served yet, by key, including the ones still in their debounce window
+        self.pending: dict[Hashable, Entry] = {}
+        # Amount of updates ready to be served and still in their debounce window
+        self.size = 0
+        self.held = 0
+        # Amount of entries ready to be served by priority class, for each ordering key
+        self.ordering_levels: dict[Hashable, Counter[int]] = {}
+
+        self.getters: deque[asyncio.Future] = deque()
+        self.putters: deque[asyncio.Future] = deque()
+        self.joiners: list[asyncio.Future] = []
+        self.unfinished = 0
+
+        self.enqueued = 0
+        self.dropped: Counter[str] = Counter()
+        self.dropped_total = 0
+        self.max_depth = 0
+        self.served = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.blocked = 0
+        self.blocked_time = 0.0
+        self.coalesced: Counter[str] = Counter()
+        self.coalesced_total = 0
+
+    @staticmethod
+    def wakeup(waiters: deque[asyncio.Future]):
+        while waiters:
+            waiter = waiters.popleft()
+
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    @staticmethod
+    async def wait(waiters: deque[asyncio.Future]):
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+
+        try:
+            await waiter
+        except BaseException:
+            waiter.cancel()
+
+            with contextlib.suppress(ValueError):
+                waiters.remove(waiter)
+
+            raise
+
+    def qsize(self) -> int:
+        return self.size + self.held
+
+    def empty(self) -> bool:
+        return not any(self.queues.values())
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= self.size + self.held
+
+    def enqueue(self, entry: Entry):
+        """Make an entry ready to be served."""
+        if entry.item is not None and self.ordering is not None:
+            entry.order_key = self.ordering(entry.item)
+
+        if entry.order_key is not None:
+            levels = self.ordering_levels.setdefault(entry.order_key, Counter())
+            # Not ahead of the earlier entries with the same key, which are served first this way
+            entry.level = max(entry.level, max(levels, default=entry.level))
+            levels[entry.level] += 1
+
+        if entry.level not in self.queues:
+            self.queues[entry.level] = deque()
+            self.queues = dict(sorted(self.queues.items()))
+
+        self.queues[entry.level].append(entry)
+
+        if entry.item is not None:
+            self.size += 1
+            self.max_depth = max(self.max_depth, self.size + self.held)
+
+        self.wakeup(self.getters)
+
+    def dequeue(self, entry: Entry):
+        """Forget an entry that left the queue, served or dropped."""
+        if entry.key is not None:
+            del self.pending[entry.key]
+
+        if entry.timer is not None:
+            entry.timer.cancel()
+            entry.timer = None
+            self.held -= 1
+        elif entry.item is not None:
+            self.size -= 1
+
+        if entry.order_key is not None:
+            levels = self.ordering_levels[entry.order_key]
+            levels[entry.level] -= 1
+
+            if not levels[entry.level]:
+                del levels[entry.level]
+
+            if not levels:
+                del self.ordering_levels[entry.order_key]
+
+        # There is room for one more update
+        self.wakeup(self.putters)
+
+    def get_nowait(self) -> Any:
+        for queue in self.queues.values():
+            if queue:
+                entry = queue.popleft()
+                break
+        else:
+            raise asyncio.QueueEmpty
+
+        self.dequeue(entry)
+
+        if entry.item is not None:
+            wait_time = time.perf_counter() - entry.enqueued_at
+
+            self.served += 1
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        return entry.item
+
+    async def get(self) -> Any:
+        while self.empty():
+            try:
+                await self.wait(self.getters)
+            except BaseException:
+                # Let another getter take the item this one was woken up for
+                if not self.empty():
+                    self.wakeup(self.getters)
+
+                raise
+
+        return self.get_nowait()
+
+    def task_done(self):
+        if self.unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+
+        self.unfinished -= 1
+
+        if self.unfinished == 0:
+            for joiner in self.joiners:
+                if not joiner.done():
+                    joiner.set_result(None)
+
+            self.joiners.clear()
+
+    async def join(self):
+        if self.unfinished:
+            joiner = asyncio.get_running_loop().create_future()
+            self.joiners.append(joiner)
+            await joiner
+
+    def droppable(self) -> list[Entry]:
+        """The oldest entry of each priority class and the ones in their debounce window."""
+        return [
+            *(queue[0] for level, queue in self.queues.items() if queue and level != self.STOP),
+            *(entry for entry in self.pending.values() if entry.timer is not None),
+        ]
+
+    def drop(self, level: int | None = None) -> Any:
+        """Drop the oldest update of a priority class, or the oldest one overall."""
+        entry = min(
+            (e for e in self.droppable() if level is None or e.level == level),
+            key=lambda e: e.enqueued_at,
+        )
+
+        if entry.timer is None:
+            self.queues[entry.level].popleft()
+
+        self.dequeue(entry)
+        self.task_done()
+        self.record_drop(entry.item)
+
+        return entry.item
+
+    @staticmethod
+    def get_name(item: Any) -> str:
+        return type(item[0]).__name__ if isinstance(item, tuple) else type(item).__name__
+
+    def record_drop(self, item: Any):
+        name = self.get_name(item)
+        self.dropped[name] += 1
+        self.dropped_total += 1
+
+        if self.dropped_total % 1000 == 1:
+            log.warning("Updates queue is full, %s updates dropped so far", self.dropped_total)
+
+    def get_key(self, item: Any) -> Hashable | None:
+        return None if self.coalesce is None else self.coalesce(item)
+
+    def merge(self, item: Any, key: Hashable | None) -> bool:
+        """Replace the pending item with the same key, if any."""
+        entry = self.pending.get(key) if key is not None else None
+
+        if entry is None:
+            return False
+
+        entry.item = item
+        self.coalesced[self.get_name(item)] += 1
+        self.coalesced_total += 1
+
+        return True
+
+    def hold(self, entry: Entry):
+        """Keep an entry out of the queue until its debounce window ends."""
+        entry.timer = asyncio.get_running_loop().call_later(self.debounce, self.release, entry)
+        self.held += 1
+
+    def release(self, entry: Entry):
+        entry.timer.cancel()
+        entry.timer = None
+        self.held -= 1
+
+        self.enqueue(entry)
+
+    def make_room(self, item: Any) -> bool:
+        """Apply the overflow policy to a full queue, telling whether the item can be queued."""
+        if self.overflow_policy == enums.OverflowPolicy.DROP_OLDEST:
+            self.drop()
+            return True
+
+        if self.overflow_policy == enums.OverflowPolicy.SHED:
+            least = max(entry.level for entry in self.droppable())
+
+            if self.priority(item) >= least:
+                self.record_drop(item)
+                return False
+
+            self.drop(least)
+            return True
+
+        raise asyncio.QueueFull
+
+    def put_nowait(self, item: Any):
+        if item is None:
+            # Updates still waiting for their debounce window go first
+            for entry in list(self.pending.values()):
+                if entry.timer is not None:
+                    self.release(entry)
+
+            return self.enqueue(Entry(None, None, self.STOP))
+
+        key = self.get_key(item)
+
+        if self.merge(item, key):
+            return None
+
+        if self.full() and not self.make_room(item):
+            return None
+
+        entry = Entry(item, key, self.priority(item))
+        self.unfinished += 1
+        self.enqueued += 1
+
+        if key is None:
+            return self.enqueue(entry)
+
+        self.pending[key] = entry
+
+        if self.debounce > 0:
+            self.hold(entry)
+            self.max_depth = max(self.max_depth, self.size + self.held)
+            return None
+
+        return self.enqueue(entry)
+
+    async def put(self, item: Any):
+        if (
+            self.overflow_policy != enums.OverflowPolicy.BLOCK
+            or item is None
+            or not self.full()
+            or self.get_key(item) in self.pending
+        ):
+            return self.put_nowait(item)
+
+        self.blocked += 1
+        start = time.perf_counter()
+
+        try:
+            while self.full() and self.get_key(item) not in self.pending:
+                await self.wait(self.putters)
+        except BaseException:
+            # Let another putter take the room this one was woken up for
+            if not self.full():
+                self.wakeup(self.putters)
+
+            raise
+        finally:
+            self.blocked_time += time.perf_counter() - start
+
+        return self.put_nowait(item)
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Depth, drop and wait-time metrics of the queue."""
+        return {
+            "depth": self.size,
+            "held": self.held,
+            "max_depth": self.max_depth,
+            "depth_by_priority": {
+                level: len(queue) for level, queue in self.queues.items() if level != self.STOP
+            },
+            "enqueued": self.enqueued,
+            "served": self.served,
+            "dropped": self.dropped_total,
+            "dropped_by_type": dict(self.dropped),
+            "average_wait_time": self.wait_time / self.served if self.served else 0.0,
+            "max_wait_time": self.max_wait_time,
+            "blocked": self.blocked,
+            "blocked_time": self.blocked_time,
+            "coalesced": self.coalesced_total,
+            "coalesced_by_type": dict(self.coalesced),
+        }
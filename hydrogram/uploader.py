@@ -0,0 +1,260 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable
+
+from hydrogram import raw
+from hydrogram.errors import FloodWait, InternalServerError
+from hydrogram.session import Session
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Iterable
+
+log = logging.getLogger(__name__)
+
+
+class Uploader:
+    """Upload the parts of a file, keeping several of them in flight and retrying failed ones.
+
+    Parts are only considered done once the server acknowledged them. A part that keeps failing
+    stops the whole upload, instead of leaving a hole in the uploaded file.
+
+    The amount of parts in flight adapts to the time the server takes to acknowledge them: it
+    doubles every round trip at first, then grows by one part every round trip while the
+    acknowledgements arrive about as fast as the fastest one seen, and halves once they slow down
+    or a part fails, which means the connection can't keep up with more parts.
+
+    Parameters:
+        sessions (List of :obj:`~hydrogram.session.Session`):
+            The started media sessions the parts are spread among.
+
+        file_id (``int``):
+            The random id of the uploaded file.
+
+        total_parts (``int``):
+            The amount of parts of the file.
+
+        is_big (``bool``):
+            Whether the file is uploaded as a big file (over 10 MB).
+
+        max_window (``int``, *optional*):
+            Maximum amount of parts in flight. Defaults to 8.
+
+        done (Iterable of ``int``, *optional*):
+            Parts already uploaded, e.g.: by an interrupted upload being resumed.
+
+        on_ack (``Callable``, *optional*):
+            Coroutine function called with the uploader after each part is acknowledged.
+
+        sleep_threshold (``float``, *optional*):
+            Flood waits up to this amount of seconds are waited for, longer ones stop the upload.
+            Defaults to the one of the sessions.
+    """
+
+    # Part sizes must divide the maximum one. Big files always use the maximum, which keeps even
+    # the biggest ones within the limit of parts per file
+    MIN_PART_SIZE = 32 * 1024
+    MAX_PART_SIZE = 512 * 1024
+    # Files are split in about these many parts when possible, so that even small ones are
+    # uploaded in parallel, in a single round trip
+    TARGET_PARTS = 4
+
+    INITIAL_WINDOW = 4
+    # Ratios of the acknowledgement time to the fastest one under/over which the window grows or
+    # shrinks
+    GROW_RATIO = 1.5
+    SHRINK_RATIO = 3
+
+    MAX_RETRIES = 5
+    # Seconds to wait before the first retry of a part, doubled on each following one
+    RETRY_DELAY = 1
+    MAX_RETRY_DELAY = 30
+
+    def __init__(
+        self,
+        sessions: list[Session],
+        file_id: int,
+        total_parts: int,
+        is_big: bool,
+        max_window: int = 8,
+        done: Iterable[int] = (),
+        on_ack: Callable[[Uploader], Awaitable[None]] | None = None,
+        sleep_threshold: float = Session.SLEEP_THRESHOLD,
+    ):
+        self.sessions = sessions
+        self.file_id = file_id
+        self.total_parts = total_parts
+        self.is_big = is_big
+        self.max_window = max(1, max_window)
+        self.window = float(min(self.INITIAL_WINDOW, self.max_window))
+        self.is_slow_start = True
+        self.min_rtt = math.inf
+        self.last_decrease = 0.0
+        self.done = set(done)
+        self.on_ack = on_ack
+        self.sleep_threshold = sleep_threshold
+
+        # Bytes acknowledged by the server during this upload
+        self.acked = 0
+        self.in_flight = 0
+        self.room = asyncio.Event()
+        self.error: BaseException | None = None
+
+    @classmethod
+    def get_part_size(cls, file_size: int) -> int:
+        """Get the smallest allowed part size that splits the file in up to TARGET_PARTS parts."""
+        part_size = cls.MIN_PART_SIZE
+
+        while part_size < cls.MAX_PART_SIZE and part_size * cls.TARGET_PARTS < file_size:
+            part_size *= 2
+
+        return part_size
+
+    def increase(self):
+        step = 1 if self.is_slow_start else 1 / self.window
+        self.window = min(self.window + step, self.max_window)
+
+    def decrease(self):
+        now = perf_counter()
+        interval = 0 if math.isinf(self.min_rtt) else self.min_rtt * self.SHRINK_RATIO
+
+        # Halve the window at most once per round trip, for the parts sent before it was halved
+        if now - self.last_decrease < interval:
+            return
+
+        self.is_slow_start = False
+        self.last_decrease = now
+        self.window = max(self.window / 2, 1)
+
+    def record(self, rtt: float):
+        self.min_rtt = min(self.min_rtt, rtt)
+
+        if rtt < self.min_rtt * self.GROW_RATIO:
+            self.increase()
+        elif rtt > self.min_rtt * self.SHRINK_RATIO:
+            self.decrease()
+
+    def get_query(self, part: int, chunk: bytes) -> raw.core.TLObject:
+        if self.is_big:
+            return raw.functions.upload.SaveBigFilePart(
+                file_id=self.file_id,
+                file_part=part,
+                file_total_parts=self.total_parts,
+                bytes=chunk,
+            )
+
+        return raw.functions.upload.SaveFilePart(file_id=self.file_id, file_part=part, bytes=chunk)
+
+    async def invoke(self, part: int, chunk: bytes):
+        session = self.sessions[part % len(self.sessions)]
+        query = self.get_query(part, chunk)
+        delay = self.RETRY_DELAY
+        attempt = 0
+
+        while attempt <= self.MAX_RETRIES:
+            start = perf_counter()
+
+            try:
+                if await session.invoke(query):
+                    self.record(perf_counter() - start)
+                    return
+
+                error: Exception = ConnectionError(f"Part {part} was not saved")
+            except FloodWait as e:
+                # Like any other request, only short flood waits are waited for
+                if e.value > self.sleep_threshold >= 0:
+                    raise
+
+                # Waiting for the flood wait to end doesn't count as a failed attempt
+                await asyncio.sleep(e.value)
+                continue
+            except (OSError, asyncio.TimeoutError, InternalServerError) as e:
+                error = e
+
+            self.decrease()
+            attempt += 1
+
+            if attempt > self.MAX_RETRIES:
+                break
+
+            log.warning("Retrying part %s of file %s in %ss: %s", part, self.file_id, delay, error)
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.MAX_RETRY_DELAY)
+
+        raise error
+
+    async def send(self, part: int, chunk: bytes):
+        try:
+            await self.invoke(part, chunk)
+
+            self.done.add(part)
+            self.acked += len(chunk)
+
+            if self.on_ack:
+                await self.on_ack(self)
+        except BaseException as e:
+            if self.error is None:
+                self.error = e
+
+            raise
+        finally:
+            self.in_flight -= 1
+            self.room.set()
+
+    async def upload(self, parts: AsyncIterator[tuple[int, bytes]]):
+        """Upload the given parts, skipping the ones already done.
+
+        Raises:
+            Exception: The error of the first part that couldn't be uploaded.
+        """
+        loop = asyncio.get_running_loop()
+        tasks: set[asyncio.Task] = set()
+
+        try:
+            async for part, chunk in parts:
+                if part in self.done:
+                    continue
+
+                while self.in_flight >= int(self.window) and self.error is None:
+                    self.room.clear()
+                    await self.room.wait()
+
+                if self.error is not None:
+                    break
+
+                self.in_flight += 1
+                task = loop.create_task(self.send(part, chunk))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.error is not None:
+            raise self.error
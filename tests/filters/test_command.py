@@ -136,3 +136,25 @@ def test_no_text():
 
     m = Message()
     assert not f(c, m)
+
+
+def test_many_commands():
+    f = filters.command([f"command{i}" for i in range(1000)])
+
+    m = Message("/command999 arg")
+    assert f(c, m)
+    assert m.command == ["command999", "arg"]
+
+    m = Message("/command1000")
+    assert not f(c, m)
+
+
+def test_pattern():
+    f = filters.command("st(art|op)")
+
+    m = Message("/stop@username now")
+    assert f(c, m)
+    assert m.command == ["st(art|op)", "now"]
+
+    m = Message("/stay")
+    assert not f(c, m)
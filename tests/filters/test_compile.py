@@ -0,0 +1,96 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-2023 Dan <https://github.com/delivrance>
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+import asyncio
+import itertools
+
+import pytest
+
+from hydrogram import filters
+from tests.filters import Client, Message
+
+c = Client()
+
+
+def make_filter(name: str, result: bool, calls: list, **kwargs) -> filters.Filter:
+    def func(_, __, ___):
+        calls.append(name)
+        return result
+
+    return filters.create(func, name, **kwargs)
+
+
+def test_sync_tree_needs_no_coroutine():
+    calls = []
+    f = make_filter("a", True, calls) & ~make_filter("b", False, calls)
+    compiled = filters.compile_filter(f | make_filter("c", False, calls))
+
+    assert not compiled.is_async
+    assert compiled.func(c, Message("text")) is True
+    assert calls == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_cheap_filters_first():
+    calls = []
+
+    async def expensive(_, __, ___):
+        await asyncio.sleep(0)
+        calls.append("async")
+        return True
+
+    f = (
+        filters.create(expensive, pure=True)
+        & make_filter("regex", True, calls, cost=1, pure=True)
+        & make_filter("attribute", False, calls, pure=True)
+    )
+    compiled = filters.compile_filter(f)
+
+    assert compiled.is_async
+    assert await compiled(c, Message("text")) is False
+    assert calls == ["attribute"]
+
+
+def test_impure_filters_keep_their_order():
+    calls = []
+
+    def has_args(_, __, message):
+        calls.append("args")
+        return len(message.command) > 1
+
+    f = (
+        make_filter("slow", True, calls, cost=5, pure=True)
+        & filters.command("start")
+        & filters.create(has_args)
+        & make_filter("attribute", True, calls, pure=True)
+    )
+    compiled = filters.compile_filter(f)
+
+    assert compiled.func(c, Message("/start now")) is True
+    assert calls == ["slow", "args", "attribute"]
+    assert not compiled.pure
+
+
+@pytest.mark.asyncio
+async def test_same_result_as_tree():
+    calls = []
+    leaves = [make_filter(str(i), i % 2 == 0, calls, cost=3 - i) for i in range(4)]
+
+    for a, b, d in itertools.permutations(leaves, 3):
+        for f in (a & b | ~d, ~(a | b) & d, a | (b & d), ~a & ~b & ~d):
+            assert await filters.compile_filter(f)(c, Message()) == bool(await f(c, Message()))
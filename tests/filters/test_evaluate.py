@@ -0,0 +1,55 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-2023 Dan <https://github.com/delivrance>
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from hydrogram import filters
+from tests.filters import Client, Message
+
+
+class ExecutorClient(Client):
+    def __init__(self):
+        super().__init__()
+        self.loop = asyncio.get_running_loop()
+        self.internal_executor = ThreadPoolExecutor(1)
+
+
+def thread_filter(threads: list, **kwargs) -> filters.Filter:
+    def func(_, __, ___):
+        threads.append(threading.current_thread())
+        return True
+
+    return filters.create(func, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_sync_filters_run_inline():
+    c = ExecutorClient()
+    threads = []
+
+    f = thread_filter(threads) & ~thread_filter(threads, blocking=True) | thread_filter(threads)
+
+    assert await f(c, Message("/start"))
+    assert threads[0] is threads[2] is threading.current_thread()
+    assert threads[1] is not threading.current_thread()
+
+    c.internal_executor.shutdown()
@@ -0,0 +1,117 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+
+
+class FakeRedisServer:
+    """An in-process server implementing the subset of Redis used by RedisStorage."""
+
+    def __init__(self):
+        self.data: dict[bytes, bytes | dict[bytes, bytes]] = {}
+        self.subscribers: dict[bytes, set[asyncio.StreamWriter]] = {}
+        self.commands: list[bytes] = []
+        self.server: asyncio.AbstractServer | None = None
+        self.port = 0
+
+    async def start(self) -> FakeRedisServer:
+        self.server = await asyncio.start_server(self.serve, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def drop_subscribers(self):
+        for writers in self.subscribers.values():
+            for writer in writers:
+                writer.close()
+
+        self.subscribers.clear()
+
+    @staticmethod
+    def encode(value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, Exception):
+            return b"-%s\r\n" % str(value).encode()
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, str):
+            return b"+%s\r\n" % value.encode()
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(FakeRedisServer.encode(v) for v in value)
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        with contextlib.suppress(ConnectionError, asyncio.IncompleteReadError):
+            while line := await reader.readline():
+                args = []
+
+                for _ in range(int(line[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+
+                writer.write(self.encode(self.execute(writer, args)))
+
+        for writers in self.subscribers.values():
+            writers.discard(writer)
+
+    def execute(self, writer: asyncio.StreamWriter, args: list[bytes]):
+        name, *args = args
+        name = name.upper()
+        self.commands.append(name)
+
+        if name in {b"PING", b"AUTH", b"SELECT"}:
+            return "OK"
+        if name == b"GET":
+            return self.data.get(args[0])
+        if name == b"MGET":
+            return [self.data.get(key) for key in args]
+        if name == b"SET":
+            self.data[args[0]] = args[1]
+            return "OK"
+        if name == b"DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if name == b"HGET":
+            return self.data.get(args[0], {}).get(args[1])
+        if name == b"HGETALL":
+            return [i for item in self.data.get(args[0], {}).items() for i in item]
+        if name == b"HSET":
+            self.data.setdefault(args[0], {})[args[1]] = args[2]
+            return 1
+        if name == b"HSETNX":
+            return int(self.data.setdefault(args[0], {}).setdefault(args[1], args[2]) is args[2])
+        if name == b"HDEL":
+            return int(self.data.get(args[0], {}).pop(args[1], None) is not None)
+        if name == b"SUBSCRIBE":
+            self.subscribers.setdefault(args[0], set()).add(writer)
+            return [b"subscribe", args[0], 1]
+        if name == b"PUBLISH":
+            receivers = self.subscribers.get(args[0], set())
+
+            for receiver in receivers:
+                receiver.write(self.encode([b"message", args[0], args[1]]))
+
+            return len(receivers)
+
+        return ValueError(f"ERR unknown command '{name.decode()}'")
@@ -0,0 +1,199 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+import pytest
+
+from hydrogram.storage import RedisStorage
+from tests.storage.fake_redis import FakeRedisServer
+
+
+async def open_storage(server: FakeRedisServer, name: str = "worker") -> RedisStorage:
+    storage = RedisStorage(name, port=server.port)
+    await storage.open()
+    return storage
+
+
+@pytest.mark.asyncio
+async def test_session():
+    server = await FakeRedisServer().start()
+    storage = await open_storage(server)
+
+    assert await storage.dc_id() == 2
+
+    await storage.api_id(12345)
+    await storage.test_mode(False)
+    await storage.auth_key(b"\x00" * 256)
+    await storage.user_id(42)
+    await storage.is_bot(True)
+
+    session_string = await storage.export_session_string()
+    await storage.close()
+
+    other = RedisStorage("other", port=server.port, session_string=session_string)
+    await other.open()
+
+    assert await other.auth_key() == b"\x00" * 256
+    assert await other.user_id() == 42
+    assert await other.is_bot() is True
+
+    await other.close()
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_update_peers_is_pipelined():
+    server = await FakeRedisServer().start()
+    storage = await open_storage(server)
+    await storage.user_id(1)
+
+    round_trips = storage.stats["round_trips"]
+    await storage.update_peers([(i, i * 10, "user", f"user{i}", None) for i in range(1, 101)])
+
+    assert storage.stats["round_trips"] == round_trips + 1
+    assert server.commands.count(b"SET") == 200
+
+    # Served by the near-cache, no round trip
+    peer = await storage.get_peer_by_username("user7")
+    assert peer.access_hash == 70
+    assert storage.stats["round_trips"] == round_trips + 1
+
+    await storage.close()
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_lookups_are_batched_and_invalidated():
+    server = await FakeRedisServer().start()
+    writer = await open_storage(server, "writer")
+    reader = await open_storage(server, "reader")
+
+    await writer.user_id(1)
+    await reader.user_id(1)
+
+    await writer.update_peers([(i, i, "user", None, None) for i in range(1, 11)])
+
+    peers = await asyncio.gather(*(reader.get_peer_by_id(i) for i in range(1, 11)))
+
+    assert [p.access_hash for p in peers] == list(range(1, 11))
+    assert server.commands.count(b"MGET") == 1
+
+    with pytest.raises(KeyError):
+        await reader.get_peer_by_id(11)
+
+    await writer.update_peers([(1, 1000, "user", None, None)])
+
+    for _ in range(10):
+        if reader.stats["invalidations"]:
+            break
+        await asyncio.sleep(0.01)
+
+    assert (await reader.get_peer_by_id(1)).access_hash == 1000
+
+    await writer.close()
+    await reader.close()
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_peer_without_access_hash():
+    server = await FakeRedisServer().start()
+    writer = await open_storage(server, "writer")
+    reader = await open_storage(server, "reader")
+
+    await writer.user_id(1)
+    await reader.user_id(1)
+
+    await writer.update_peers([(5, None, "user", None, None), (6, 60, "user", None, None)])
+    server.data[reader.peer_key(7).encode()] = b"malformed"
+
+    peers = await asyncio.wait_for(
+        asyncio.gather(
+            reader.get_peer_by_id(5),
+            reader.get_peer_by_id(6),
+            reader.get_peer_by_id(7),
+            return_exceptions=True,
+        ),
+        1,
+    )
+
+    assert peers[0].user_id == 5
+    assert peers[1].access_hash == 60
+    assert isinstance(peers[2], ValueError)
+
+    await writer.close()
+    await reader.close()
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_resubscribe_after_reconnect(monkeypatch):
+    monkeypatch.setattr(RedisStorage, "RECONNECT_DELAY", 0.01)
+
+    server = await FakeRedisServer().start()
+    writer = await open_storage(server, "writer")
+    reader = await open_storage(server, "reader")
+
+    await writer.user_id(1)
+    await reader.user_id(1)
+
+    await writer.update_peers([(1, 1, "user", None, None)])
+    assert (await reader.get_peer_by_id(1)).access_hash == 1
+
+    lost_writer = reader.pubsub.writer
+    server.drop_subscribers()
+
+    for _ in range(100):
+        if server.subscribers:
+            break
+        await asyncio.sleep(0.01)
+
+    assert lost_writer.is_closing()
+
+    invalidations = reader.stats["invalidations"]
+    await writer.update_peers([(1, 1000, "user", None, None)])
+
+    for _ in range(100):
+        if reader.stats["invalidations"] > invalidations:
+            break
+        await asyncio.sleep(0.01)
+
+    assert reader.stats["invalidations"] == invalidations + 1
+    assert (await reader.get_peer_by_id(1)).access_hash == 1000
+
+    await writer.close()
+    await reader.close()
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_update_state_keeps_missing_values():
+    server = await FakeRedisServer().start()
+    storage = await open_storage(server)
+
+    await storage.update_state((0, 10, 20, 30, 0))
+    await storage.update_state((1, 5, None, None, None))
+
+    assert sorted(await storage.update_state()) == [(0, 10, 20, 30, 0), (1, 5, None, None, None)]
+
+    await storage.update_state(1)
+    assert await storage.update_state() == [(0, 10, 20, 30, 0)]
+
+    await storage.close()
+    await server.stop()
@@ -0,0 +1,110 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import sqlite3
+
+import pytest
+
+from hydrogram import raw
+from hydrogram.storage import SharedPeerStore, SharedSQLiteStorage
+
+
+@pytest.mark.asyncio
+async def test_peers_are_scoped_by_owner(tmp_path):
+    store = SharedPeerStore(tmp_path / "shared.db")
+    first = SharedSQLiteStorage("first", store)
+    second = SharedSQLiteStorage("second", store)
+
+    await first.open()
+    await second.open()
+
+    assert first.conn is second.conn
+
+    await first.user_id(1)
+    await second.user_id(2)
+
+    await first.update_peers([(100, 111, "user", "alice", None)])
+    await second.update_peers([(100, 222, "user", "alice", None)])
+
+    assert (await first.get_peer_by_id(100)).access_hash == 111
+    assert (await second.get_peer_by_id(100)).access_hash == 222
+
+    await store.flush()
+    assert not store.pending
+
+    assert (await first.get_peer_by_username("alice")).access_hash == 111
+    assert (await second.get_peer_by_username("alice")).access_hash == 222
+
+    with pytest.raises(KeyError):
+        await first.get_peer_by_id(200)
+
+    await first.close()
+    await second.close()
+
+    assert store.conn is None
+
+
+@pytest.mark.asyncio
+async def test_sessions_survive_reopening(tmp_path):
+    store = SharedPeerStore(tmp_path / "shared.db")
+    storage = SharedSQLiteStorage("bot", store)
+
+    await storage.open()
+    await storage.dc_id(4)
+    await storage.user_id(42)
+    await storage.update_peers([(-1001234567890, 333, "channel", None, None)])
+    await storage.close()
+
+    storage = SharedSQLiteStorage("bot", store)
+    await storage.open()
+
+    assert await storage.dc_id() == 4
+    assert await storage.user_id() == 42
+
+    peer = await storage.get_peer_by_id(-1001234567890)
+    assert isinstance(peer, raw.types.InputPeerChannel)
+    assert peer.access_hash == 333
+
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_peers_pending(tmp_path, monkeypatch):
+    store = SharedPeerStore(tmp_path / "shared.db")
+    storage = SharedSQLiteStorage("bot", store)
+
+    await storage.open()
+    await storage.user_id(42)
+    await storage.update_peers([(100, 111, "user", "alice", None)])
+
+    def executemany(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    with monkeypatch.context() as m:
+        m.setattr(store.conn, "executemany", executemany)
+
+        with pytest.raises(sqlite3.OperationalError):
+            await store.flush()
+
+    assert len(store.pending) == 1
+
+    await store.flush()
+    assert not store.pending
+    assert (await storage.get_peer_by_username("alice")).access_hash == 111
+
+    await storage.close()
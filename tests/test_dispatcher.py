@@ -0,0 +1,339 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from hydrogram import enums, filters, raw
+from hydrogram.dispatcher import Dispatcher
+from hydrogram.handlers import MessageHandler, RawUpdateHandler
+from hydrogram.methods.utilities.add_handler import AddHandler
+
+
+@pytest.mark.asyncio
+async def test_per_chat_dispatch():
+    client = SimpleNamespace(
+        workers=4,
+        no_updates=False,
+        max_queued_updates=0,
+        updates_overflow_policy=enums.OverflowPolicy.BLOCK,
+        dispatch_mode=enums.DispatchMode.PER_CHAT,
+        coalesce_window=None,
+        slow_handler_threshold=None,
+    )
+    dispatcher = Dispatcher(client)
+    handled = []
+    running = set()
+    parallel = 0
+
+    async def callback(_, update, __, ___):
+        nonlocal parallel
+
+        assert update.channel_id not in running
+
+        running.add(update.channel_id)
+        parallel = max(parallel, len(running))
+        await asyncio.sleep(0.001)
+        running.discard(update.channel_id)
+
+        handled.append((update.channel_id, update.available_min_id))
+
+    dispatcher.add_handler(RawUpdateHandler(callback), 0)
+    await dispatcher.start()
+
+    for pts in range(20):
+        for channel_id in (1, 1, 1, 2, 3):
+            await dispatcher.updates_queue.put((
+                raw.types.UpdateChannelAvailableMessages(
+                    channel_id=channel_id, available_min_id=pts
+                ),
+                {},
+                {},
+            ))
+
+    await dispatcher.updates_queue.join()
+
+    assert dispatcher.shard_depths == [0, 0, 0, 0]
+
+    await dispatcher.stop()
+
+    for channel_id in (1, 2, 3):
+        ptss = [pts for i, pts in handled if i == channel_id]
+        assert ptss == sorted(ptss)
+
+    assert len(handled) == 100
+    assert parallel == 3
+
+
+@pytest.mark.asyncio
+async def test_per_chat_idle_workers_and_stop():
+    client = SimpleNamespace(
+        workers=2,
+        no_updates=False,
+        max_queued_updates=0,
+        updates_overflow_policy=enums.OverflowPolicy.BLOCK,
+        dispatch_mode=enums.DispatchMode.PER_CHAT,
+        coalesce_window=None,
+        slow_handler_threshold=None,
+    )
+    dispatcher = Dispatcher(client)
+    handled = []
+
+    async def callback(_, update, __, ___):
+        await asyncio.sleep(0.001)
+        handled.append(update.available_min_id)
+
+    def packet(channel_id: int, pts: int) -> tuple:
+        return (
+            raw.types.UpdateChannelAvailableMessages(channel_id=channel_id, available_min_id=pts),
+            {},
+            {},
+        )
+
+    dispatcher.add_handler(RawUpdateHandler(callback), 0)
+    await dispatcher.start()
+    await asyncio.sleep(0)
+
+    # A chat becoming ready wakes up the workers waiting for the queue
+    dispatcher.updates_queue.unfinished += 1
+    dispatcher.backlogs[1] = deque([packet(1, 0)])
+    dispatcher._release(1)
+
+    await asyncio.wait_for(dispatcher.updates_queue.join(), 1)
+
+    assert handled == [0]
+
+    # Updates waiting in the backlogs are handled before stopping
+    for pts in range(1, 21):
+        await dispatcher.updates_queue.put(packet(pts % 2, pts))
+
+    await dispatcher.stop()
+
+    assert sorted(handled) == list(range(21))
+
+
+@pytest.mark.asyncio
+async def test_unmatched_messages_are_not_parsed():
+    client = SimpleNamespace(
+        workers=1,
+        no_updates=False,
+        max_queued_updates=0,
+        updates_overflow_policy=enums.OverflowPolicy.BLOCK,
+        dispatch_mode=enums.DispatchMode.CONCURRENT,
+        coalesce_window=None,
+        slow_handler_threshold=None,
+        me=SimpleNamespace(username="bot"),
+        get_listener_matching_with_data=lambda data, listener_type: None,
+    )
+    dispatcher = Dispatcher(client)
+    parsed = []
+    handled = []
+
+    def parser(update, users, chats):
+        message = SimpleNamespace(
+            text=update.message.message,
+            caption=None,
+            chat=SimpleNamespace(id=1, username=None),
+            from_user=SimpleNamespace(id=1, username=None),
+        )
+        parsed.append(message)
+        return message, MessageHandler
+
+    async def callback(_, message):
+        await asyncio.sleep(0)
+        handled.append(message.command)
+
+    dispatcher.update_parsers[raw.types.UpdateNewMessage] = parser
+    dispatcher.add_handler(MessageHandler(callback, filters.command("start")), 0)
+    await dispatcher.start()
+
+    for text in ("hello", "/help", "/start now"):
+        await dispatcher.updates_queue.put((
+            raw.types.UpdateNewMessage(
+                message=raw.types.Message(
+                    id=1, peer_id=raw.types.PeerUser(user_id=1), date=0, message=text
+                ),
+                pts=1,
+                pts_count=1,
+            ),
+            {},
+            {},
+        ))
+
+    await dispatcher.updates_queue.join()
+    await dispatcher.stop()
+
+    assert len(parsed) == 1
+    assert handled == [["start", "now"]]
+    assert dispatcher.skipped_parses == 2
+
+
+@pytest.mark.asyncio
+async def test_handler_execution_options(caplog):
+    client = SimpleNamespace(
+        workers=1,
+        no_updates=False,
+        max_queued_updates=0,
+        updates_overflow_policy=enums.OverflowPolicy.BLOCK,
+        dispatch_mode=enums.DispatchMode.CONCURRENT,
+        coalesce_window=None,
+        slow_handler_threshold=0.01,
+    )
+    dispatcher = Dispatcher(client)
+    running = 0
+    parallel = 0
+
+    async def slow(_, update, __, ___):
+        await asyncio.sleep(1)
+
+    async def limited(_, update, __, ___):
+        nonlocal running, parallel
+
+        running += 1
+        parallel = max(parallel, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    slow_handler = RawUpdateHandler(slow)
+    slow_handler.timeout = 0.01
+    limited_handler = RawUpdateHandler(limited)
+    limited_handler.max_concurrency = 2
+    limited_handler.fire_and_forget = True
+
+    dispatcher.add_handler(slow_handler, 0)
+    dispatcher.add_handler(limited_handler, 1)
+    await dispatcher.start()
+
+    for i in range(6):
+        await dispatcher.updates_queue.put((
+            raw.types.UpdateChannelAvailableMessages(channel_id=1, available_min_id=i),
+            {},
+            {},
+        ))
+
+    await dispatcher.updates_queue.join()
+    await dispatcher.stop()
+
+    slow_stats = dispatcher.handler_stats[slow_handler]
+    limited_stats = dispatcher.handler_stats[limited_handler]
+
+    assert slow_stats.calls == slow_stats.timeouts == 6
+    assert slow_stats.max_time < 0.5
+    assert limited_stats.calls == 6
+    assert sum(limited_stats.histogram) == 6
+    assert parallel == 2
+    assert "Slow handler" in caplog.text
+
+
+def get_worker(client, update):
+    return client, update, os.getpid(), threading.current_thread().name
+
+
+def get_process(update):
+    return update, os.getpid()
+
+
+@pytest.mark.asyncio
+async def test_sync_callback_executors():
+    client = SimpleNamespace(
+        workers=1,
+        no_updates=True,
+        max_queued_updates=0,
+        updates_overflow_policy=enums.OverflowPolicy.BLOCK,
+        dispatch_mode=enums.DispatchMode.CONCURRENT,
+        coalesce_window=None,
+        slow_handler_threshold=None,
+        executor=ThreadPoolExecutor(1, thread_name_prefix="Handler"),
+        process_workers=1,
+    )
+    dispatcher = Dispatcher(client)
+    handler = RawUpdateHandler(get_worker)
+
+    result = await dispatcher.run_sync_callback(handler, handler.callback, client, 1)
+
+    assert result[0] is client
+    assert result[2] == os.getpid()
+    assert result[3].startswith("Handler")
+
+    handler = RawUpdateHandler(get_process)
+    handler.in_process = True
+    result = await dispatcher.run_sync_callback(handler, handler.callback, client, 1)
+
+    assert result[0] == 1
+    assert result[1] != os.getpid()
+
+    dispatcher.process_executor.shutdown()
+    client.executor.shutdown()
+
+
+def test_in_process_callbacks():
+    client = SimpleNamespace(dispatcher=SimpleNamespace(add_handler=lambda handler, group: None))
+
+    async def coroutine(_, __):
+        pass
+
+    for callback in (coroutine, lambda _: None):
+        with pytest.raises(ValueError):
+            AddHandler.add_handler(client, MessageHandler(callback), in_process=True)
+
+    handler, _ = AddHandler.add_handler(client, MessageHandler(get_process), in_process=True)
+
+    assert handler.in_process
+
+
+@pytest.mark.asyncio
+async def test_handler_snapshots():
+    client = SimpleNamespace(
+        workers=1,
+        no_updates=True,
+        max_queued_updates=0,
+        updates_overflow_policy=enums.OverflowPolicy.BLOCK,
+        dispatch_mode=enums.DispatchMode.CONCURRENT,
+        coalesce_window=None,
+        slow_handler_threshold=None,
+    )
+    dispatcher = Dispatcher(client)
+    first, second, third = (RawUpdateHandler(get_worker) for _ in range(3))
+    await dispatcher.start()
+
+    dispatcher.add_handler(first, 1)
+    dispatcher.add_handler(second, -1)
+    snapshot = dispatcher.groups
+    routes = dispatcher._get_routes(RawUpdateHandler)
+
+    dispatcher.add_handler(third, 1)
+
+    assert snapshot == {-1: (second,), 1: (first,)}
+    assert dispatcher.groups == {-1: (second,), 1: (first, third)}
+    assert list(dispatcher.groups) == [-1, 1]
+    assert dispatcher._get_routes(RawUpdateHandler) is not routes
+
+    dispatcher.remove_handler(first, 1)
+
+    assert dispatcher.groups[1] == (third,)
+
+    with pytest.raises(ValueError):
+        dispatcher.remove_handler(first, 2)
+
+    await dispatcher.stop()
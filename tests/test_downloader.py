@@ -0,0 +1,186 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import os
+import random
+from hashlib import sha256
+
+import pytest
+
+from hydrogram import raw
+from hydrogram.crypto import aes
+from hydrogram.downloader import CdnDownloader, CdnRedirectError, Downloader
+from hydrogram.errors import CDNFileHashMismatch
+
+CHUNK_SIZE = Downloader.CHUNK_SIZE
+
+
+class FakeSession:
+    def __init__(self, data: bytes, redirect_at: int = -1):
+        self.data = data
+        self.redirect_at = redirect_at
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.rng = random.Random(0)
+
+    async def invoke(self, query, sleep_threshold=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        # Responses come back out of order
+        await asyncio.sleep(self.rng.random() * 0.005)
+
+        self.in_flight -= 1
+
+        if query.offset // CHUNK_SIZE == self.redirect_at:
+            return raw.types.upload.FileCdnRedirect(
+                dc_id=203, file_token=b"", encryption_key=b"", encryption_iv=b"", file_hashes=[]
+            )
+
+        return raw.types.upload.File(
+            type=raw.types.storage.FilePartial(),
+            mtime=0,
+            bytes=self.data[query.offset : query.offset + query.limit],
+        )
+
+
+async def download(downloader: Downloader) -> list[bytes]:
+    return [chunk async for chunk in downloader.chunks()]
+
+
+@pytest.mark.asyncio
+async def test_chunks_in_order():
+    data = bytes(range(256)) * (CHUNK_SIZE * 10 // 256 + 100)
+    sessions = [FakeSession(data), FakeSession(data)]
+    location = raw.types.InputDocumentFileLocation(
+        id=1, access_hash=1, file_reference=b"", thumb_size=""
+    )
+
+    chunks = await download(Downloader(sessions, location, len(data), max_window=4))
+
+    assert b"".join(chunks) == data
+    assert len(chunks) == 11
+    assert sum(session.max_in_flight for session in sessions) > 2
+    assert max(session.max_in_flight for session in sessions) <= 4
+
+    chunks = await download(Downloader(sessions, location, len(data), offset=2, limit=3))
+
+    assert b"".join(chunks) == data[2 * CHUNK_SIZE : 5 * CHUNK_SIZE]
+
+
+@pytest.mark.asyncio
+async def test_cdn_redirect():
+    data = bytes(CHUNK_SIZE * 4)
+    session = FakeSession(data, redirect_at=1)
+    location = raw.types.InputDocumentFileLocation(
+        id=1, access_hash=1, file_reference=b"", thumb_size=""
+    )
+    downloader = Downloader([session], location, len(data))
+    received = 0
+
+    with pytest.raises(CdnRedirectError) as e:
+        async for _ in downloader.chunks():
+            received += 1
+
+    assert received == 1
+    assert e.value.part == 1
+
+
+# Smaller chunks keep the pure Python decryption fast enough
+CDN_CHUNK_SIZE = 64 * 1024
+
+
+class FakeCdnSession:
+    def __init__(self, data: bytes, key: bytes, iv: bytes):
+        self.data = data
+        self.key = key
+        self.iv = iv
+        self.reuploaded = False
+
+    async def invoke(self, query, sleep_threshold=None):
+        await asyncio.sleep(0.001)
+
+        # The file is not on the CDN yet when its second chunk is requested
+        if query.offset == CDN_CHUNK_SIZE and not self.reuploaded:
+            return raw.types.upload.CdnFileReuploadNeeded(request_token=b"token")
+
+        chunk = self.data[query.offset : query.offset + query.limit]
+        iv = bytearray(self.iv[:-4] + (query.offset // 16).to_bytes(4, "big"))
+
+        return raw.types.upload.CdnFile(bytes=aes.ctr256_encrypt(chunk, self.key, iv))
+
+
+class FakeMainSession:
+    HASH_SIZE = 8 * 1024
+
+    def __init__(self, data: bytes, cdn_session: FakeCdnSession):
+        self.cdn_session = cdn_session
+        self.hashes = [
+            raw.types.FileHash(
+                offset=offset,
+                limit=len(data[offset : offset + self.HASH_SIZE]),
+                hash=sha256(data[offset : offset + self.HASH_SIZE]).digest(),
+            )
+            for offset in range(0, len(data), self.HASH_SIZE)
+        ]
+        self.hash_requests = 0
+
+    async def invoke(self, query, sleep_threshold=None):
+        await asyncio.sleep(0.001)
+
+        if isinstance(query, raw.functions.upload.ReuploadCdnFile):
+            self.cdn_session.reuploaded = True
+            return []
+
+        self.hash_requests += 1
+        start = query.offset // self.HASH_SIZE
+
+        # Each response covers 2 chunks
+        return self.hashes[start : start + 16]
+
+
+@pytest.mark.asyncio
+async def test_cdn_download(monkeypatch):
+    monkeypatch.setattr(CdnDownloader, "CHUNK_SIZE", CDN_CHUNK_SIZE)
+
+    data = os.urandom(CDN_CHUNK_SIZE * 3 + 1000)
+    key, iv = os.urandom(32), os.urandom(16)
+    cdn_session = FakeCdnSession(data, key, iv)
+    session = FakeMainSession(data, cdn_session)
+    redirect = raw.types.upload.FileCdnRedirect(
+        dc_id=203, file_token=b"", encryption_key=key, encryption_iv=iv, file_hashes=[]
+    )
+
+    chunks = await download(CdnDownloader([cdn_session], session, redirect, len(data)))
+
+    assert b"".join(chunks) == data
+    assert cdn_session.reuploaded
+    # The hashes of each chunk are requested only when not covered by a previous response
+    assert session.hash_requests == 2
+
+    chunks = await download(
+        CdnDownloader([cdn_session], session, redirect, len(data), offset=1, limit=2)
+    )
+
+    assert b"".join(chunks) == data[CDN_CHUNK_SIZE : 3 * CDN_CHUNK_SIZE]
+
+    session.hashes[9].hash = bytes(32)
+
+    with pytest.raises(CDNFileHashMismatch):
+        await download(CdnDownloader([cdn_session], session, redirect, len(data)))
@@ -0,0 +1,99 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+
+import pytest
+
+from hydrogram.file_io import FileReader, FileWriter
+
+DATA = os.urandom(10_000)
+
+
+async def read_all(reader: FileReader) -> list[bytes]:
+    parts = []
+
+    while chunk := await reader.read():
+        parts.append(chunk)
+
+    await reader.close()
+
+    return parts
+
+
+@pytest.mark.asyncio
+async def test_read_parts(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(DATA)
+
+    with path.open("rb") as fp:
+        parts = await read_all(FileReader(fp, 1024, offset=2048))
+
+    assert b"".join(parts) == DATA[2048:]
+    assert all(len(part) == 1024 for part in parts[:-1])
+
+    assert b"".join(await read_all(FileReader(io.BytesIO(DATA), 1024))) == DATA
+
+
+@pytest.mark.asyncio
+async def test_write_out_of_order(tmp_path):
+    path = tmp_path / "file"
+    offsets = list(range(0, len(DATA), 1000))[::-1]
+
+    with path.open("wb") as fp:
+        writer = FileWriter(fp, write_behind=2)
+        await writer.allocate(len(DATA))
+
+        for offset in offsets:
+            await writer.write(DATA[offset : offset + 1000], offset)
+
+        await writer.flush()
+
+    assert path.read_bytes() == DATA
+
+    fp = io.BytesIO()
+    writer = FileWriter(fp)
+
+    for offset in offsets:
+        await writer.write(DATA[offset : offset + 1000], offset)
+
+    await writer.flush()
+
+    assert fp.getvalue() == DATA
+
+
+@pytest.mark.asyncio
+async def test_read_mapped(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(DATA)
+
+    with path.open("rb") as fp:
+        reader = FileReader(fp, 1024, offset=2048, use_mmap=True)
+        parts = await read_all(reader)
+
+        assert reader.map is not None
+
+    assert all(isinstance(part, memoryview) for part in parts)
+    assert b"".join(parts) == DATA[2048:]
+
+    # Empty files can't be mapped and are read as usual
+    path.write_bytes(b"")
+
+    with path.open("rb") as fp:
+        assert await read_all(FileReader(fp, 1024, use_mmap=True)) == []
@@ -0,0 +1,150 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+
+import pytest
+
+from hydrogram.media_reader import MediaReader
+
+CHUNK_SIZE = 1024
+DATA = os.urandom(CHUNK_SIZE * 20 + 100)
+
+
+class FakeClient:
+    def __init__(self, fail_at: int = -1, error: Exception | None = None):
+        self.fail_at = fail_at
+        self.error = error
+        self.requested: list[int] = []
+        self.downloads = 0
+
+    async def get_file(self, file_id, file_size=0, limit=0, offset=0):
+        self.downloads += 1
+
+        for index in range(offset, offset + limit):
+            if index == self.fail_at and self.error:
+                raise self.error
+
+            # Like get_file, stop at the end of the file or when the download fails
+            if index * CHUNK_SIZE >= len(DATA) or index == self.fail_at:
+                return
+
+            await asyncio.sleep(0.001)
+
+            self.requested.append(index)
+
+            yield DATA[index * CHUNK_SIZE : (index + 1) * CHUNK_SIZE]
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(MediaReader, "CHUNK_SIZE", CHUNK_SIZE)
+
+
+@pytest.mark.asyncio
+async def test_read_ranges():
+    client = FakeClient()
+    rng = random.Random(0)
+
+    async with MediaReader(client, None, len(DATA), cache_size=4) as reader:
+        for _ in range(50):
+            start = rng.randrange(len(DATA))
+            length = rng.randrange(CHUNK_SIZE * 3)
+
+            assert await reader.seek(start) == start
+            assert await reader.read(length) == DATA[start : start + length]
+            assert reader.tell() == min(start + length, len(DATA))
+
+        await reader.seek(-100, os.SEEK_END)
+
+        assert await reader.read() == DATA[-100:]
+        assert reader.at_eof()
+        assert await reader.read(10) == b""
+
+        await reader.seek(-10, os.SEEK_END)
+
+        with pytest.raises(asyncio.IncompleteReadError):
+            await reader.readexactly(20)
+
+
+@pytest.mark.asyncio
+async def test_cached_chunks():
+    client = FakeClient()
+
+    async with MediaReader(client, None, len(DATA), cache_size=4, read_ahead=1) as reader:
+        assert await reader.read(CHUNK_SIZE + 10) == DATA[: CHUNK_SIZE + 10]
+
+        requested = len(client.requested)
+
+        # Reading the same range again doesn't download it again
+        await reader.seek(5)
+
+        assert await reader.read(CHUNK_SIZE) == DATA[5 : CHUNK_SIZE + 5]
+        assert len(client.requested) == requested
+
+        # Sequential reads download each chunk once
+        chunks = [chunk async for chunk in reader]
+
+        assert b"".join(chunks) == DATA[CHUNK_SIZE + 5 :]
+        assert sorted(client.requested) == list(range(21))
+
+
+@pytest.mark.asyncio
+async def test_chunks_read_ahead_together():
+    client = FakeClient()
+
+    async with MediaReader(client, None, len(DATA), read_ahead=3) as reader:
+        assert b"".join([chunk async for chunk in reader]) == DATA
+
+    assert sorted(client.requested) == list(range(21))
+    assert client.downloads <= 6
+
+
+@pytest.mark.asyncio
+async def test_unknown_size():
+    async with MediaReader(FakeClient(), None, 0) as reader:
+        await reader.seek(CHUNK_SIZE * 3 + 7)
+
+        assert await reader.read() == DATA[CHUNK_SIZE * 3 + 7 :]
+        assert reader.at_eof()
+
+
+@pytest.mark.asyncio
+async def test_failed_download():
+    async with MediaReader(FakeClient(fail_at=2), None, len(DATA)) as reader:
+        assert await reader.read(CHUNK_SIZE * 2) == DATA[: CHUNK_SIZE * 2]
+
+        with pytest.raises(ConnectionError):
+            await reader.read(CHUNK_SIZE)
+
+
+@pytest.mark.asyncio
+async def test_download_error():
+    client = FakeClient(fail_at=3, error=RuntimeError("flood"))
+
+    async with MediaReader(client, None, len(DATA), read_ahead=3) as reader:
+        assert await reader.read(CHUNK_SIZE * 3) == DATA[: CHUNK_SIZE * 3]
+
+        with pytest.raises(RuntimeError, match="flood"):
+            await reader.read(CHUNK_SIZE)
+
+    assert not reader.tasks
@@ -0,0 +1,75 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+import pytest
+
+from hydrogram import Client
+
+
+class FakeSession:
+    def __init__(self):
+        self.is_started = True
+
+    async def stop(self):
+        self.is_started = False
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_expire():
+    client = Client("test", in_memory=True, media_sessions_idle_timeout=0.01)
+    session = client.media_sessions[2] = FakeSession()
+
+    async with client.use_media_sessions(2) as sessions:
+        assert sessions == [session]
+
+        # Sessions in use are never closed
+        await asyncio.sleep(0.02)
+        await client.expire_media_sessions()
+
+        assert session.is_started
+
+    async with client.use_media_sessions(2) as sessions:
+        assert sessions == [session]
+
+    await client.expire_media_sessions()
+
+    assert session.is_started
+
+    await asyncio.sleep(0.02)
+    await client.expire_media_sessions()
+
+    assert not session.is_started
+    assert 2 not in client.media_sessions
+
+
+@pytest.mark.asyncio
+async def test_sessions_handed_out_are_kept():
+    client = Client("test", in_memory=True, media_sessions_idle_timeout=0.01)
+    session = client.media_sessions[2] = FakeSession()
+
+    async with client.use_media_sessions(2):
+        pass
+
+    assert await client.get_media_sessions(2) == [session]
+
+    await asyncio.sleep(0.02)
+    await client.expire_media_sessions()
+
+    assert session.is_started
@@ -0,0 +1,78 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+import pytest
+
+from hydrogram import Client
+from hydrogram.downloader import Downloader
+from hydrogram.file_id import FileId, FileType
+
+CHUNK_SIZE = Downloader.CHUNK_SIZE
+DATA = os.urandom(3 * CHUNK_SIZE + 100)
+
+
+class FlakyClient(Client):
+    def __init__(self, fail_at: int = -1):
+        super().__init__("test", in_memory=True)
+        self.fail_at = fail_at
+        self.offsets = []
+
+    async def get_file(self, file_id, file_size, limit, offset, progress, progress_args):
+        self.offsets.append(offset)
+
+        for part in range(offset, -(-len(DATA) // CHUNK_SIZE)):
+            if part == self.fail_at:
+                raise ConnectionError
+
+            yield DATA[part * CHUNK_SIZE : (part + 1) * CHUNK_SIZE]
+
+
+def get_packet(directory, file_id: FileId):
+    return (file_id, directory, "file.bin", False, len(DATA), None, (), True)
+
+
+@pytest.mark.asyncio
+async def test_resume_download(tmp_path):
+    file_id = FileId(
+        major=4, minor=30, file_type=FileType.DOCUMENT, dc_id=2, media_id=1, access_hash=1
+    )
+
+    client = FlakyClient(fail_at=2)
+    assert await client.handle_download(get_packet(tmp_path, file_id)) is None
+    assert (tmp_path / "file.bin.temp").stat().st_size == 2 * CHUNK_SIZE
+    assert (tmp_path / "file.bin.journal").exists()
+
+    # A different file doesn't continue the download
+    other_id = FileId(
+        major=4, minor=30, file_type=FileType.DOCUMENT, dc_id=2, media_id=2, access_hash=1
+    )
+    client = FlakyClient(fail_at=1)
+    assert await client.handle_download(get_packet(tmp_path, other_id)) is None
+    assert client.offsets == [0]
+
+    client = FlakyClient(fail_at=2)
+    assert await client.handle_download(get_packet(tmp_path, file_id)) is None
+
+    client = FlakyClient()
+    path = await client.handle_download(get_packet(tmp_path, file_id))
+
+    assert client.offsets == [2]
+    assert path.read_bytes() == DATA
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["file.bin"]
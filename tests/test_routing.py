@@ -0,0 +1,121 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2017-2023 Dan <https://github.com/delivrance>
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+from __future__ import annotations
+
+import re
+from types import SimpleNamespace
+
+from hydrogram import filters
+from hydrogram.handlers import MessageHandler
+from hydrogram.routing import HandlerIndex, get_requirement
+
+client = SimpleNamespace(me=SimpleNamespace(username="MyBot"))
+
+
+def message(text: str | None = None, chat_id: int = 1, user_id: int = 1) -> SimpleNamespace:
+    return SimpleNamespace(
+        text=text,
+        caption=None,
+        chat=SimpleNamespace(id=chat_id),
+        from_user=SimpleNamespace(id=user_id),
+    )
+
+
+async def callback(_, __):
+    pass
+
+
+def names(handlers: list[MessageHandler]) -> list[str]:
+    return [handler.name for handler in handlers]
+
+
+def make_index(**filters_by_name) -> HandlerIndex:
+    handlers = []
+
+    for name, flt in filters_by_name.items():
+        handler = MessageHandler(callback, flt)
+        handler.name = name
+        handlers.append(handler)
+
+    return HandlerIndex(handlers)
+
+
+def test_candidates_keep_group_order():
+    index = make_index(
+        start=filters.command("start") & filters.private,
+        any_text=filters.text,
+        help=filters.command(["help", "h"], prefixes=["/", "!"]) | filters.command("about"),
+        chat=filters.chat([10, 20]) & filters.text,
+        user=filters.user(5),
+        prefix=filters.regex(r"^hello\s"),
+        not_indexed=filters.regex(r"hello") | filters.command("x"),
+    )
+
+    assert names(index.candidates(client, message("/start@MyBot now"), False)) == [
+        "start",
+        "any_text",
+        "not_indexed",
+    ]
+    assert names(index.candidates(client, message("!h"), False)) == [
+        "any_text",
+        "help",
+        "not_indexed",
+    ]
+    assert names(index.candidates(client, message("hello there", 20, 5), False)) == [
+        "any_text",
+        "chat",
+        "user",
+        "prefix",
+        "not_indexed",
+    ]
+    assert len(index.candidates(client, message("/start"), True)) == 7
+
+
+def test_set_filters_changes():
+    chat = filters.chat(10)
+    index = make_index(chat=chat)
+
+    assert not index.candidates(client, message("text", 20), False)
+
+    version = filters.Filter.version
+    chat.add("username")
+
+    assert filters.Filter.version == version + 1
+    assert names(make_index(chat=chat).candidates(client, message("text", 20), False)) == ["chat"]
+
+
+def test_filters_changes():
+    command = filters.command("start")
+    regex = filters.regex("^a")
+    handler = MessageHandler(callback, command)
+
+    for change in (
+        lambda: command.commands.add("help"),
+        lambda: command.prefixes.discard("/"),
+        lambda: setattr(command, "commands", {"help"}),
+        lambda: setattr(regex, "p", re.compile(r"^b")),
+        lambda: setattr(handler, "filters", regex),
+    ):
+        version = filters.Filter.version
+        change()
+
+        assert filters.Filter.version > version
+
+    # Plain sets assigned to a command filter can change unnoticed, the handler isn't indexed
+    assert get_requirement(command) is None
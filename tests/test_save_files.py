@@ -0,0 +1,74 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+import pytest
+
+from hydrogram.methods.advanced.save_files import SaveFiles
+
+
+class FakeClient(SaveFiles):
+    def __init__(self, max_concurrent_uploads: int):
+        self.loop = asyncio.get_running_loop()
+        self.save_file_semaphore = asyncio.Semaphore(max_concurrent_uploads)
+        self.uploading = 0
+        self.max_uploading = 0
+        self.uploaded = 0
+
+    async def save_file(self, path):
+        async with self.save_file_semaphore:
+            if path is None:
+                return None
+
+            self.uploading += 1
+            self.max_uploading = max(self.max_uploading, self.uploading)
+
+            try:
+                if path == "broken":
+                    raise ValueError(path)
+
+                await asyncio.sleep(0.01)
+
+                self.uploaded += 1
+
+                return path.upper()
+            finally:
+                self.uploading -= 1
+
+
+@pytest.mark.asyncio
+async def test_uploads_in_order_within_budget():
+    client = FakeClient(3)
+
+    files = await client.save_files(["a", None, "b", "c", "d", "e", None])
+
+    assert files == ["A", None, "B", "C", "D", "E", None]
+    assert client.max_uploading == 3
+
+
+@pytest.mark.asyncio
+async def test_failure_cancels_other_uploads():
+    client = FakeClient(2)
+
+    with pytest.raises(ValueError, match="broken"):
+        await client.save_files(["broken", "a", "b", "c"])
+
+    # The other uploads are already over
+    assert client.uploaded == 0
+    assert client.uploading == 0
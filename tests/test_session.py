@@ -0,0 +1,190 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+from time import perf_counter
+from types import SimpleNamespace
+
+import pytest
+
+from hydrogram import raw
+from hydrogram.raw.core import Message
+from hydrogram.session import Session
+from hydrogram.session.internals import MsgId
+
+
+@pytest.mark.asyncio
+async def test_pipeline_keeps_order_and_bounds_updates():
+    handled = []
+    depths = []
+
+    async def handle_updates(updates):
+        depths.append(session.updates.qsize())
+        await asyncio.sleep(0.001)
+        handled.append(updates.update.available_min_id)
+
+    session = Session(SimpleNamespace(handle_updates=handle_updates), 2, bytes(256), False)
+    session.UPDATES_QUEUE_SIZE = 2
+    session.packets = asyncio.Queue(session.PACKETS_QUEUE_SIZE)
+    session.updates = asyncio.Queue()
+
+    process_task = asyncio.create_task(session.process_worker())
+    update_task = asyncio.create_task(session.update_worker(session.updates))
+
+    for i in range(10):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(
+            Message(
+                body=raw.types.UpdateShort(
+                    update=raw.types.UpdateChannelAvailableMessages(
+                        channel_id=1, available_min_id=i
+                    ),
+                    date=0,
+                ),
+                msg_id=MsgId(),
+                seq_no=0,
+                length=0,
+            )
+        )
+        await session.packets.put((perf_counter(), future))
+
+    await session.packets.put(None)
+    await process_task
+
+    session.updates.put_nowait(None)
+    await update_task
+
+    assert handled == list(range(10))
+    assert max(depths) <= session.UPDATES_QUEUE_SIZE
+    assert session.stats["decrypt"]["count"] == session.stats["update"]["count"] == 10
+
+
+def channel_update(channel_id: int, pts: int) -> raw.types.UpdateShort:
+    return raw.types.UpdateShort(
+        update=raw.types.UpdateDeleteChannelMessages(
+            channel_id=channel_id, messages=[], pts=pts, pts_count=1
+        ),
+        date=0,
+    )
+
+
+@pytest.mark.asyncio
+async def test_update_workers_keep_order_of_each_box():
+    handled = []
+    running = set()
+    parallel = 0
+
+    async def handle_updates(updates):
+        nonlocal parallel
+
+        running.add(updates.update.channel_id)
+        parallel = max(parallel, len(running))
+        await asyncio.sleep(0.001)
+        running.discard(updates.update.channel_id)
+        handled.append((updates.update.channel_id, updates.update.pts))
+
+    session = Session(SimpleNamespace(handle_updates=handle_updates), 2, bytes(256), False)
+    session.updates = asyncio.Queue()
+    session.update_tasks = [
+        asyncio.create_task(session.update_worker(session.updates))
+        for _ in range(session.UPDATE_WORKERS)
+    ]
+
+    for pts in range(10):
+        for channel_id in (1, 1, 2):
+            session.updates.put_nowait((perf_counter(), channel_update(channel_id, pts)))
+
+    for _ in session.update_tasks:
+        session.updates.put_nowait(None)
+
+    await asyncio.gather(*session.update_tasks)
+
+    for channel_id in (1, 2):
+        ptss = [pts for i, pts in handled if i == channel_id]
+        assert ptss == sorted(ptss)
+
+    assert len(handled) == 30
+    assert parallel == 2
+    assert not session.update_backlogs
+
+
+@pytest.mark.asyncio
+async def test_stop_with_full_queues():
+    session = Session(
+        SimpleNamespace(handle_updates=None, disconnect_handler=None), 2, bytes(256), False
+    )
+    session.UPDATES_QUEUE_SIZE = 1
+    session.PACKETS_QUEUE_SIZE = 1
+    session.packets = asyncio.Queue(session.PACKETS_QUEUE_SIZE)
+    session.updates = asyncio.Queue()
+    session.connection = SimpleNamespace(close=lambda: asyncio.sleep(0))
+
+    async def recv_worker():
+        # Like the receiving, which only stops once every packet is queued
+        try:
+            for i in range(5):
+                future = asyncio.get_running_loop().create_future()
+                future.set_result(
+                    Message(body=channel_update(1, i), msg_id=MsgId(), seq_no=0, length=0)
+                )
+                await session.packets.put((perf_counter(), future))
+        finally:
+            await session.packets.put(None)
+
+    # Nothing takes the updates, the processing waits for room
+    session.process_task = asyncio.create_task(session.process_worker())
+    session.recv_task = asyncio.create_task(recv_worker())
+    await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(session.stop(), 1)
+
+    assert session.updates.qsize() == 5
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_update_workers():
+    handled = []
+
+    async def handle_updates(updates):
+        await asyncio.sleep(0.01 if updates.update.pts < 3 else 10)
+        handled.append(updates.update.pts)
+
+    session = Session(
+        SimpleNamespace(handle_updates=handle_updates, disconnect_handler=None),
+        2,
+        bytes(256),
+        False,
+    )
+    session.UPDATES_STOP_TIMEOUT = 0.1
+    session.packets = asyncio.Queue()
+    session.updates = asyncio.Queue()
+    session.connection = SimpleNamespace(close=lambda: asyncio.sleep(0))
+    session.update_tasks = [
+        asyncio.create_task(session.update_worker(session.updates))
+        for _ in range(session.UPDATE_WORKERS)
+    ]
+
+    for pts in range(4):
+        session.updates.put_nowait((perf_counter(), channel_update(1, pts)))
+
+    await asyncio.wait_for(session.stop(), 1)
+
+    # The updates handled in time are over, the stuck one is given up
+    assert handled == [0, 1, 2]
+    assert not session.update_tasks
+    assert not session.update_backlogs
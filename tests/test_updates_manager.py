@@ -0,0 +1,169 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from hydrogram import raw
+from hydrogram.storage import BaseStorage, SQLiteStorage
+from hydrogram.updates_manager import COMMON, UpdatesManager
+
+
+class FakeClient:
+    def __init__(self, difference=None):
+        self.storage = SQLiteStorage("test", use_memory=True)
+        self.dispatcher = SimpleNamespace(updates_queue=asyncio.Queue())
+        self.catch_up = False
+        self.me = None
+        self.difference = difference
+        self.requests = []
+
+    async def invoke(self, query):
+        self.requests.append(query)
+
+        if isinstance(query, raw.functions.updates.GetState):
+            return raw.types.updates.State(pts=10, qts=0, date=0, seq=1, unread_count=0)
+
+        return self.difference
+
+    @staticmethod
+    async def fetch_peers(peers):
+        return False
+
+    def dispatched(self):
+        items = []
+
+        while not self.dispatcher.updates_queue.empty():
+            items.append(self.dispatcher.updates_queue.get_nowait()[0])
+
+        return items
+
+
+def new_message(message_id: int, pts: int) -> raw.types.UpdateNewMessage:
+    return raw.types.UpdateNewMessage(
+        message=raw.types.MessageEmpty(id=message_id), pts=pts, pts_count=1
+    )
+
+
+@pytest.mark.asyncio
+async def test_duplicates_and_reordering():
+    client = FakeClient()
+    await client.storage.open()
+
+    manager = UpdatesManager(client)
+    await manager.start()
+
+    await manager.feed(new_message(2, 12), {}, {})
+    await manager.feed(new_message(1, 11), {}, {})
+    await manager.feed(new_message(1, 11), {}, {})
+
+    assert [u.message.id for u in client.dispatched()] == [1, 2]
+    assert manager.pts == 12
+    assert manager.stats["duplicates"] == 1
+
+    await manager.stop()
+
+    assert (await client.storage.update_state())[0][:2] == (COMMON, 12)
+
+    await client.storage.close()
+
+
+@pytest.mark.asyncio
+async def test_gap_is_recovered():
+    client = FakeClient(
+        raw.types.updates.Difference(
+            new_messages=[raw.types.MessageEmpty(id=1)],
+            new_encrypted_messages=[],
+            other_updates=[],
+            chats=[],
+            users=[],
+            state=raw.types.updates.State(pts=11, qts=0, date=1, seq=1, unread_count=0),
+        )
+    )
+    await client.storage.open()
+
+    manager = UpdatesManager(client)
+    manager.GAP_TIMEOUT = 0.01
+    await manager.start()
+
+    await manager.feed(new_message(2, 12), {}, {})
+
+    assert not client.dispatched()
+
+    await asyncio.sleep(0.05)
+
+    assert [u.message.id for u in client.dispatched()] == [1, 2]
+    assert isinstance(client.requests[-1], raw.functions.updates.GetDifference)
+    assert manager.pts == 12
+    assert manager.stats["gaps"] == manager.stats["recoveries"] == 1
+
+    await manager.stop()
+    await client.storage.close()
+
+
+def updates(seq: int) -> raw.types.Updates:
+    return raw.types.Updates(updates=[], users=[], chats=[], date=0, seq=seq)
+
+
+@pytest.mark.asyncio
+async def test_filled_seq_gap_is_not_recovered():
+    client = FakeClient()
+    await client.storage.open()
+
+    manager = UpdatesManager(client)
+    manager.GAP_TIMEOUT = 0.01
+    await manager.start()
+
+    # Seq 2 arrives after seq 3, within the gap timeout
+    for seq in (3, 2):
+        manager.check_seq(updates(seq))
+        manager.commit_seq(updates(seq))
+
+    await asyncio.sleep(0.05)
+
+    assert manager.seq == 3
+    assert manager.stats["gaps"] == 0
+    assert not any(isinstance(r, raw.functions.updates.GetDifference) for r in client.requests)
+
+    await manager.stop()
+    await client.storage.close()
+
+
+@pytest.mark.asyncio
+async def test_start_without_saved_states():
+    client = FakeClient()
+    # Not opened, SQLiteStorage returns no states at all
+    manager = UpdatesManager(client)
+
+    await manager.start()
+
+    assert manager.pts == 10
+
+    manager.save_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_default_update_state_without_init():
+    # A storage engine that doesn't call BaseStorage.__init__
+    storage = SimpleNamespace()
+
+    await BaseStorage.update_state(storage, (COMMON, 1, 2, 3, 4))
+
+    assert await BaseStorage.update_state(storage) == [(COMMON, 1, 2, 3, 4)]
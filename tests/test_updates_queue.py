@@ -0,0 +1,184 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+from operator import itemgetter
+
+import pytest
+
+from hydrogram import enums
+from hydrogram.updates_queue import UpdatesQueue
+
+
+def priority(item: str) -> int:
+    return {"callback": UpdatesQueue.HIGH, "post": UpdatesQueue.LOW}.get(item[:-1], 1)
+
+
+def drain(queue: UpdatesQueue) -> list:
+    items = []
+
+    while not queue.empty():
+        items.append(queue.get_nowait())
+
+    return items
+
+
+@pytest.mark.asyncio
+async def test_priority_order():
+    queue = UpdatesQueue(priority=priority)
+
+    for item in ("post1", "message1", "callback1", "message2", "callback2"):
+        await queue.put(item)
+
+    queue.put_nowait(None)
+
+    assert drain(queue) == ["callback1", "callback2", "message1", "message2", "post1", None]
+    assert queue.stats["served"] == 5
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest():
+    queue = UpdatesQueue(2, enums.OverflowPolicy.DROP_OLDEST, priority)
+
+    for item in ("message1", "message2", "message3"):
+        await queue.put(item)
+
+    queue.put_nowait(None)  # The stop signal is never bounded
+
+    assert drain(queue) == ["message2", "message3", None]
+    assert queue.stats["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_shed():
+    queue = UpdatesQueue(2, enums.OverflowPolicy.SHED, priority)
+
+    for item in ("post1", "message1", "callback1", "post2"):
+        await queue.put(item)
+
+    assert drain(queue) == ["callback1", "message1"]
+    assert queue.stats["dropped_by_type"] == {"str": 2}
+
+
+@pytest.mark.asyncio
+async def test_block():
+    queue = UpdatesQueue(1, priority=priority)
+    await queue.put("message1")
+
+    task = asyncio.create_task(queue.put("message2"))
+    await asyncio.sleep(0)
+
+    assert not task.done()
+    assert queue.get_nowait() == "message1"
+
+    await task
+
+    assert queue.get_nowait() == "message2"
+    assert queue.stats["blocked"] == 1
+
+
+def coalesce(item: str) -> str | None:
+    return item[:-1] if item.startswith("status") else None
+
+
+@pytest.mark.asyncio
+async def test_coalesce():
+    queue = UpdatesQueue(coalesce=coalesce)
+
+    for item in ("statusA1", "message1", "statusB1", "statusA2", "statusA3"):
+        await queue.put(item)
+
+    assert drain(queue) == ["statusA3", "message1", "statusB1"]
+
+    await queue.put("statusA4")
+
+    assert drain(queue) == ["statusA4"]
+    assert queue.stats["coalesced"] == 2
+
+
+@pytest.mark.asyncio
+async def test_debounce():
+    queue = UpdatesQueue(coalesce=coalesce, debounce=0.01)
+
+    for item in ("statusA1", "message1", "statusA2"):
+        await queue.put(item)
+
+    assert drain(queue) == ["message1"]
+
+    await asyncio.sleep(0.02)
+    await queue.put("statusB1")
+    queue.put_nowait(None)
+
+    assert drain(queue) == ["statusA2", "statusB1", None]
+    assert queue.stats["coalesced_by_type"] == {"str": 1}
+
+
+@pytest.mark.asyncio
+async def test_held_updates_are_bounded():
+    queue = UpdatesQueue(2, enums.OverflowPolicy.DROP_OLDEST, coalesce=coalesce, debounce=0.01)
+
+    for item in ("statusA1", "statusB1", "message1"):
+        await queue.put(item)
+
+    assert queue.qsize() == 2
+    assert queue.stats["dropped"] == 1
+
+    await asyncio.sleep(0.02)
+
+    assert drain(queue) == ["message1", "statusB1"]
+
+
+@pytest.mark.asyncio
+async def test_join():
+    queue = UpdatesQueue(coalesce=coalesce, debounce=0.01)
+
+    for item in ("message1", "statusA1", "statusA2"):
+        await queue.put(item)
+
+    join = asyncio.create_task(queue.join())
+
+    assert await queue.get() == "message1"
+    queue.task_done()
+
+    assert await asyncio.wait_for(queue.get(), 1) == "statusA2"
+    await asyncio.sleep(0)
+
+    assert not join.done()
+
+    queue.task_done()
+    await asyncio.wait_for(join, 1)
+
+
+@pytest.mark.asyncio
+async def test_priority_keeps_chat_order():
+    # Items are "<kind><chat>"
+    queue = UpdatesQueue(priority=priority, ordering=itemgetter(-1))
+
+    for item in ("messageA", "messageB", "callbackA", "callbackC", "postA", "messageA"):
+        await queue.put(item)
+
+    assert drain(queue) == [
+        "callbackC",
+        "messageA",
+        "messageB",
+        "callbackA",
+        "postA",
+        "messageA",
+    ]
@@ -0,0 +1,224 @@
+#  Hydrogram - Telegram MTProto API Client Library for Python
+#  Copyright (C) 2023-present Hydrogram <https://hydrogram.org>
+#
+#  This file is part of Hydrogram.
+#
+#  Hydrogram is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published
+#  by the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  Hydrogram is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with Hydrogram.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+from hashlib import sha256
+from types import SimpleNamespace
+
+import pytest
+
+from hydrogram import Client, raw
+from hydrogram.crypto import aes, mtproto
+from hydrogram.errors import FloodWait
+from hydrogram.file_io import UploadManifest
+from hydrogram.session.internals import MsgFactory
+from hydrogram.uploader import Uploader
+
+PART_SIZE = 512 * 1024
+
+
+class FakeSession:
+    def __init__(self, failures: dict[int, int] | None = None):
+        # Amount of times each part fails before being saved
+        self.failures = failures or {}
+        # Amount of times each part raises a flood wait before being saved
+        self.flood_waits: dict[int, int] = {}
+        self.flood_wait = 0
+        self.saved: dict[int, bytes] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def invoke(self, query):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            await asyncio.sleep(0.001)
+
+            if self.flood_waits.get(query.file_part, 0):
+                self.flood_waits[query.file_part] -= 1
+                raise FloodWait(value=self.flood_wait)
+
+            if self.failures.get(query.file_part, 0):
+                self.failures[query.file_part] -= 1
+                raise ConnectionError
+
+            self.saved[query.file_part] = query.bytes
+
+            return True
+        finally:
+            self.in_flight -= 1
+
+
+async def parts(count: int):
+    for part in range(count):
+        await asyncio.sleep(0)
+        yield part, bytes([part]) * 10
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(Uploader, "RETRY_DELAY", 0)
+
+
+@pytest.mark.asyncio
+async def test_retries_failed_parts():
+    session = FakeSession({3: 2})
+    acked = []
+
+    async def on_ack(uploader: Uploader):
+        acked.append(uploader.acked)
+        await asyncio.sleep(0)
+
+    uploader = Uploader([session], 1, 8, True, max_window=3, done=[5], on_ack=on_ack)
+    await uploader.upload(parts(8))
+
+    assert sorted(session.saved) == [0, 1, 2, 3, 4, 6, 7]
+    assert 1 < session.max_in_flight <= 3
+    assert acked == list(range(10, 80, 10))
+
+
+@pytest.mark.asyncio
+async def test_failing_part_stops_upload():
+    session = FakeSession({1: Uploader.MAX_RETRIES + 1})
+    uploader = Uploader([session], 1, 100, True, max_window=2)
+
+    with pytest.raises(ConnectionError):
+        await uploader.upload(parts(100))
+
+    assert 1 not in uploader.done
+    assert len(uploader.done) < 10
+
+
+@pytest.mark.asyncio
+async def test_flood_waits_are_not_failures():
+    session = FakeSession({1: Uploader.MAX_RETRIES})
+    session.flood_waits[1] = Uploader.MAX_RETRIES + 1
+    uploader = Uploader([session], 1, 2, True)
+
+    await uploader.upload(parts(2))
+
+    assert sorted(session.saved) == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_long_flood_wait_stops_upload():
+    session = FakeSession()
+    session.flood_waits[1] = 1
+    session.flood_wait = 100
+    uploader = Uploader([session], 1, 2, True, sleep_threshold=10)
+
+    with pytest.raises(FloodWait):
+        await asyncio.wait_for(uploader.upload(parts(2)), 1)
+
+    assert 1 not in uploader.done
+
+
+class UploadClient(Client):
+    def __init__(self, session: FakeSession):
+        super().__init__("test", in_memory=True, resumable_uploads=True)
+        self.me = SimpleNamespace(is_premium=False)
+        self.fake_session = session
+
+    @contextlib.asynccontextmanager
+    async def use_media_sessions(self, dc_id):
+        yield [self.fake_session]
+
+
+@pytest.mark.asyncio
+async def test_resume_upload(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(os.urandom(24 * PART_SIZE))
+
+    session = FakeSession({20: Uploader.MAX_RETRIES + 1})
+    client = UploadClient(session)
+    await client.storage.open()
+
+    assert await client.save_file(str(path)) is None
+    assert (tmp_path / "file.bin.upload").exists()
+
+    session.saved.clear()
+    progress = []
+
+    file = await client.save_file(
+        str(path), progress=lambda current, total: progress.append(current)
+    )
+
+    assert isinstance(file, raw.types.InputFileBig)
+    assert 0 not in session.saved
+    assert 20 in session.saved
+    assert progress[-1] == 24 * PART_SIZE
+    assert not (tmp_path / "file.bin.upload").exists()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_manifest_saves(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(bytes(10))
+    manifest = UploadManifest(tmp_path / "file.bin.upload")
+
+    await asyncio.gather(*(manifest.save(path, 1, 1, set(range(i))) for i in range(10)))
+
+    assert await manifest.load(path, 1) == (1, list(range(9)))
+
+
+def test_part_size():
+    assert Uploader.get_part_size(1000) == 32 * 1024
+    assert Uploader.get_part_size(200 * 1024) == 64 * 1024
+    assert Uploader.get_part_size(1024 * 1024) == 256 * 1024
+    assert Uploader.get_part_size(2000 * 1024 * 1024) == 512 * 1024
+
+
+def test_window_adapts_to_latency():
+    uploader = Uploader([FakeSession()], 1, 100, True, max_window=16)
+
+    for _ in range(20):
+        uploader.record(0.01)
+
+    assert uploader.window == 16
+
+    uploader.record(0.05)
+    uploader.record(0.05)
+
+    assert uploader.window == 8
+
+
+def test_part_from_memoryview():
+    chunk = os.urandom(PART_SIZE)
+    query = raw.functions.upload.SaveFilePart(file_id=1, file_part=0, bytes=chunk)
+    view_query = raw.functions.upload.SaveFilePart(file_id=1, file_part=0, bytes=memoryview(chunk))
+
+    assert view_query.write() == query.write()
+
+    message = MsgFactory()(view_query)
+
+    assert message.length == len(query.write())
+    assert message.write()[16:] == query.write()
+
+    auth_key = os.urandom(256)
+    packed = mtproto.pack(message, 1, bytes(8), auth_key, bytes(8))
+    msg_key = packed[8:24]
+    aes_key, aes_iv = mtproto.kdf(auth_key, msg_key, True)
+    data = aes.ige256_decrypt(packed[24:], aes_key, aes_iv)
+
+    assert sha256(auth_key[88:120] + data).digest()[8:24] == msg_key
+    assert data[16 : 16 + len(message.write())] == message.write()